@@ -0,0 +1,183 @@
+# app/api_client.py
+import hashlib
+import json as jsonlib
+import os
+import random
+import time
+import uuid
+from typing import Any, Optional, Union
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE = os.getenv("API_BASE", "http://api:8000")
+
+# (connect, read) seconds – connect fails fast, read allows slow reports
+DEFAULT_TIMEOUT = (3.05, float(os.getenv("API_TIMEOUT", "20")))
+POOL_CONNECTIONS = int(os.getenv("API_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("API_POOL_MAXSIZE", "32"))
+# attempts for keyed (idempotent) POSTs; the key makes a resend safe
+WRITE_ATTEMPTS = int(os.getenv("API_WRITE_ATTEMPTS", "3"))
+WRITE_BACKOFF = 0.5
+# seconds a keyed POST may take in total, every attempt and backoff included
+WRITE_DEADLINE = float(os.getenv("API_WRITE_DEADLINE", "20"))
+
+Timeout = Union[float, tuple[float, float], None]
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    # One keep-alive pool per server process, shared by every page and session.
+    # Only idempotent methods are retried after a read or status error; a failed
+    # connect is retried for any method (the request never left). Keyed POSTs use
+    # get_write_session() instead.
+    retry = Retry(
+        total=2,
+        connect=2,
+        read=1,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+    s = requests.Session()
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update({"Accept": "application/json", "Connection": "keep-alive"})
+    return s
+
+
+@st.cache_resource
+def get_write_session() -> requests.Session:
+    # Keyed POSTs: no urllib3 retries at all, api_post_idempotent decides every
+    # resend itself so the whole write stays inside its deadline.
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+
+    s = requests.Session()
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update({"Accept": "application/json", "Connection": "keep-alive"})
+    return s
+
+
+def api_request(
+    method: str,
+    path: str,
+    *,
+    params: Optional[dict] = None,
+    json: Any = None,
+    headers: Optional[dict] = None,
+    timeout: Timeout = None,
+) -> requests.Response:
+    return get_session().request(
+        method,
+        f"{API_BASE}{path}",
+        params=params,
+        json=json,
+        headers=headers,
+        timeout=timeout or DEFAULT_TIMEOUT,
+    )
+
+
+def api_get(path: str, params: Optional[dict] = None, timeout: Timeout = None) -> Any:
+    r = api_request("GET", path, params=params, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def api_post(path: str, payload: Any, timeout: Timeout = None) -> Any:
+    r = api_request("POST", path, json=payload, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def api_patch(path: str, payload: Any, timeout: Timeout = None) -> Any:
+    r = api_request("PATCH", path, json=payload, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def api_delete(path: str, timeout: Timeout = None) -> Any:
+    r = api_request("DELETE", path, timeout=timeout)
+    r.raise_for_status()
+    return r.json() if r.content else None
+
+
+# -------------------- Idempotent writes --------------------
+def new_idempotency_key() -> str:
+    return uuid.uuid4().hex
+
+
+def inflight_key(path: str, payload: Any) -> str:
+    """Idempotency key for this request body, held in session state until release_key().
+
+    A rerun or a double click re-sends the same body with the same key, so the API
+    answers with the first result instead of recording the write twice.
+    """
+    body = jsonlib.dumps([path, payload], sort_keys=True, default=str)
+    fingerprint = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    keys = st.session_state.setdefault("inflight_keys", {})
+    if fingerprint not in keys:
+        keys[fingerprint] = new_idempotency_key()
+    return keys[fingerprint]
+
+
+def release_key(key: str):
+    # the write is settled (accepted, refused or journaled): the same body again is a new write
+    keys = st.session_state.get("inflight_keys") or {}
+    for fingerprint in [f for f, k in keys.items() if k == key]:
+        del keys[fingerprint]
+
+
+def _split_timeout(timeout: Timeout) -> tuple[float, float]:
+    timeout = timeout or DEFAULT_TIMEOUT
+    if isinstance(timeout, tuple):
+        return float(timeout[0]), float(timeout[1])
+    return float(timeout), float(timeout)
+
+
+def api_post_idempotent(
+    path: str,
+    payload: Any,
+    key: str,
+    timeout: Timeout = None,
+    attempts: int = WRITE_ATTEMPTS,
+    deadline: float = WRITE_DEADLINE,
+) -> requests.Response:
+    """POST with an Idempotency-Key, retried with jittered backoff on connection errors and 5xx.
+
+    Every attempt and backoff fits in `deadline` seconds: timeouts are cut to the
+    time left and no attempt starts once it is spent. Returns the first non-5xx
+    response (or the last 5xx); raises the last connection error when no attempt
+    got an answer.
+    """
+    connect, read = _split_timeout(timeout)
+    end = time.monotonic() + deadline
+    last: Optional[requests.Response] = None
+    error: Optional[requests.RequestException] = None
+    for attempt in range(max(1, attempts)):
+        if attempt:
+            pause = WRITE_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            if end - time.monotonic() - pause < connect:
+                break
+            time.sleep(pause)
+        left = end - time.monotonic()
+        try:
+            last = get_write_session().post(
+                f"{API_BASE}{path}",
+                json=payload,
+                headers={"Idempotency-Key": key},
+                timeout=(min(connect, left), min(read, left)),
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+            continue
+        if last.status_code < 500:
+            return last
+    if last is not None:
+        return last
+    raise error
@@ -0,0 +1,130 @@
+# app/cache.py
+import functools
+import inspect
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+import streamlit as st
+
+# Tags used across pages:
+#   "products"          – product master data (name, price, barcode, ...)
+#   "stock:{location}"  – on-hand quantities for one location
+#   "locations"         – location list
+#   "sales", "sale:{id}" – sales history / a single sale document
+#   "company"           – company settings (branding, logo, footer)
+
+
+class TaggedCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[float, Any, frozenset]] = {}
+        self._by_tag: dict[str, set[tuple]] = {}
+        self._inflight: dict[tuple, threading.Lock] = {}
+        self._listeners: list[Callable[[frozenset], None]] = []
+        self._versions: dict[str, int] = {}
+
+    def get(self, key: tuple):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return False, None
+            expires, value, _ = hit
+            if expires < time.monotonic():
+                self._drop(key)
+                return False, None
+            return True, value
+
+    def set(self, key: tuple, value, ttl: float, tags: Iterable[str]):
+        tags = frozenset(tags)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for t in tags:
+                self._by_tag.setdefault(t, set()).add(key)
+
+    def key_lock(self, key: tuple) -> threading.Lock:
+        # one loader per key at a time: concurrent misses wait for the first fetch
+        with self._lock:
+            return self._inflight.setdefault(key, threading.Lock())
+
+    def drop_key_lock(self, key: tuple, lock: threading.Lock):
+        # after the fill: waiters already hold `lock`, later callers hit the entry
+        with self._lock:
+            if self._inflight.get(key) is lock:
+                del self._inflight[key]
+
+    def version(self, tag: str) -> int:
+        # bumped on every invalidation of `tag`; lets callers key derived data on it
+        return self._versions.get(tag, 0)
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            for t in tags:
+                self._versions[t] = self._versions.get(t, 0) + 1
+                for key in list(self._by_tag.get(t, ())):
+                    self._drop(key)
+            listeners = list(self._listeners)
+        for cb in listeners:
+            cb(frozenset(tags))
+
+    def on_invalidate(self, callback: Callable[[frozenset], None]):
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _drop(self, key: tuple):
+        hit = self._entries.pop(key, None)
+        if hit is None:
+            return
+        for t in hit[2]:
+            keys = self._by_tag.get(t)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[t]
+
+
+@st.cache_resource
+def get_cache() -> TaggedCache:
+    return TaggedCache()
+
+
+def invalidate(*tags: str):
+    get_cache().invalidate(*tags)
+
+
+def cached(ttl: float, tags: Iterable[str] = ()):
+    """Process-wide memoization; tags may reference arguments, e.g. "stock:{location_id}"."""
+    tag_templates = tuple(tags)
+
+    def decorator(fn):
+        sig = inspect.signature(fn)
+        # page scripts all run as __main__, so the file keeps same-named loaders apart
+        fn_id = (fn.__code__.co_filename, fn.__qualname__)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = fn_id + tuple(sorted(bound.arguments.items()))
+
+            store = get_cache()
+            found, value = store.get(key)
+            if found:
+                return value
+            lock = store.key_lock(key)
+            try:
+                with lock:
+                    found, value = store.get(key)
+                    if found:
+                        return value
+                    value = fn(*args, **kwargs)
+                    entry_tags = [t.format(**bound.arguments) for t in tag_templates]
+                    store.set(key, value, ttl, entry_tags)
+                    return value
+            finally:
+                store.drop_key_lock(key, lock)
+
+        return wrapper
+
+    return decorator
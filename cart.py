@@ -0,0 +1,170 @@
+# app/cart.py
+# Cart engine for the POS: plain Python (no Streamlit) so it can be exercised on its own.
+from decimal import ROUND_FLOOR, ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Iterator, Optional
+
+DEFAULT_STEP = 0.5
+PESEWA = Decimal("0.01")
+ZERO = Decimal("0")
+
+
+def get_step_for_unit(unit: str) -> float:
+    u = (unit or "").strip().lower()
+    if u in ["kg", "g", "gram", "grams", "l", "litre", "liter", "ml"]:
+        return 0.1
+    if u in ["piece", "pcs", "box", "bag", "bottle", "sachet", "tin", "gallon"]:
+        return 0.5  # business default
+    return DEFAULT_STEP
+
+
+def clamp_to_step(x: float, step: float) -> float:
+    if step <= 0:
+        return float(x)
+    return round(float(x) / step) * step
+
+
+def to_decimal(x) -> Decimal:
+    try:
+        return Decimal(str(x)) if x is not None else ZERO
+    except (InvalidOperation, ValueError):
+        return ZERO
+
+
+def _available(x) -> Optional[Decimal]:
+    # None / NaN / junk mean "stock unknown": no cap
+    try:
+        d = Decimal(str(x)) if x is not None else None
+    except (InvalidOperation, ValueError):
+        return None
+    return d if d is not None and d.is_finite() else None
+
+
+def _qty(x: float, step: float) -> Decimal:
+    # quantities live on the unit's step grid; 3 dp matches the qty inputs
+    return to_decimal(clamp_to_step(max(0.0, float(x)), step)).quantize(Decimal("0.001"), ROUND_HALF_UP)
+
+
+def _floor_qty(cap: Decimal, step: float) -> Decimal:
+    # largest qty on the step grid that does not exceed `cap`
+    if step <= 0:
+        return cap.quantize(Decimal("0.001"), ROUND_FLOOR)
+    d = to_decimal(step)
+    return ((cap / d).to_integral_value(ROUND_FLOOR) * d).quantize(Decimal("0.001"), ROUND_HALF_UP)
+
+
+class InsufficientStock(Exception):
+    def __init__(self, name: str, unit: str, available: float):
+        super().__init__(f"Not enough stock for {name} — Available: {available:.2f} {unit}")
+        self.name = name
+        self.unit = unit
+        self.available = available
+
+
+class CartLine:
+    __slots__ = ("sku", "name", "unit", "step", "qty", "unit_price", "tax_rate", "line_total", "line_tax")
+
+    def __init__(self, sku: str, name: str, unit: str, unit_price, tax_rate=0):
+        self.sku = sku
+        self.name = name
+        self.unit = unit
+        self.step = get_step_for_unit(unit)
+        self.qty = ZERO
+        self.unit_price = to_decimal(unit_price)
+        self.tax_rate = to_decimal(tax_rate)
+        self.line_total = ZERO
+        self.line_tax = ZERO
+
+    def as_payload(self) -> dict:
+        return {"sku": self.sku, "qty": float(self.qty), "unit_price": float(self.unit_price)}
+
+
+class Cart:
+    """SKU-keyed ordered cart; subtotal and tax are kept up to date on every write.
+
+    Prices are tax-inclusive (the API charges qty × unit_price), so `tax_total` is
+    the tax contained in `subtotal`, not an extra charge.
+    """
+
+    __slots__ = ("_lines", "subtotal", "tax_total")
+
+    def __init__(self):
+        self._lines: dict[str, CartLine] = {}
+        self.subtotal = ZERO
+        self.tax_total = ZERO
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __bool__(self) -> bool:
+        return bool(self._lines)
+
+    def __iter__(self) -> Iterator[CartLine]:
+        return iter(list(self._lines.values()))
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self._lines
+
+    def get(self, sku: str) -> Optional[CartLine]:
+        return self._lines.get(sku)
+
+    @property
+    def total(self) -> Decimal:
+        return self.subtotal
+
+    def add(self, sku: str, name: str, unit: str, unit_price, qty: float, available=None, tax_rate=0) -> Optional[CartLine]:
+        if not sku:
+            return None
+        line = self._lines.get(sku)
+        step = line.step if line else get_step_for_unit(unit)
+        add = _qty(qty, step)
+        if add <= 0:
+            return None
+
+        already = line.qty if line else ZERO
+        cap = _available(available)
+        if cap is not None and already + add > cap:
+            raise InsufficientStock(name, unit, float(cap))
+
+        if line is None:
+            line = self._lines[sku] = CartLine(sku, name, unit, unit_price, tax_rate)
+        self._write(line, _qty(float(already + add), step))
+        return line
+
+    def set_qty(self, sku: str, qty: float, available=None) -> Decimal:
+        """Set a line's qty (clamped to its step, capped at `available`); 0 removes it."""
+        line = self._lines.get(sku)
+        if line is None:
+            return ZERO
+        new_qty = _qty(qty, line.step)
+        cap = _available(available)
+        if cap is not None and new_qty > cap:
+            new_qty = _floor_qty(cap, line.step)
+        if new_qty <= 0:
+            self.remove(sku)
+            return ZERO
+        self._write(line, new_qty)
+        return new_qty
+
+    def remove(self, sku: str):
+        line = self._lines.pop(sku, None)
+        if line is not None:
+            self.subtotal -= line.line_total
+            self.tax_total -= line.line_tax
+
+    def clear(self):
+        self._lines.clear()
+        self.subtotal = ZERO
+        self.tax_total = ZERO
+
+    def payload_lines(self) -> list[dict]:
+        return [ln.as_payload() for ln in self._lines.values()]
+
+    def _write(self, line: CartLine, qty: Decimal):
+        self.subtotal -= line.line_total
+        self.tax_total -= line.line_tax
+        line.qty = qty
+        line.line_total = (qty * line.unit_price).quantize(PESEWA, ROUND_HALF_UP)
+        if line.tax_rate:
+            line.line_tax = (line.line_total * line.tax_rate / (100 + line.tax_rate)).quantize(PESEWA, ROUND_HALF_UP)
+        self.subtotal += line.line_total
+        self.tax_total += line.line_tax
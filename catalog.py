@@ -0,0 +1,214 @@
+# app/catalog.py
+import os
+import threading
+import time
+from typing import Optional
+
+import requests
+import streamlit as st
+
+from api_client import api_get
+from cache import get_cache
+from catalog_sync import StockSnapshot
+from health import get_health_monitor
+
+REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "10"))
+# a read older than this refreshes inline (e.g. after the server sat idle)
+MAX_STALENESS = float(os.getenv("CATALOG_MAX_STALENESS", "60"))
+# locations nobody has looked at for this long stop being refreshed
+LOCATION_IDLE_AFTER = 600.0
+
+
+class CatalogService:
+    """One shared copy of the product list and per-location stock for the whole server.
+
+    Reads never fail once something has been loaded: while the API is unreachable
+    the last good snapshot is served (the POS keeps selling offline).
+    """
+
+    def __init__(self, interval: float = REFRESH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.RLock()
+        # per location: serializes applying a sync with local adjustments (never
+        # held across a fetch, so a checkout does not wait on the network)
+        self._location_locks: dict[int, threading.Lock] = {}
+        self._products: Optional[list] = None
+        self._products_at = 0.0
+        self.products_version = 0
+        self._stock: dict[int, list] = {}
+        self._snapshots: dict[int, StockSnapshot] = {}
+        self._stock_at: dict[int, float] = {}
+        self._stock_read_at: dict[int, float] = {}
+        self.stock_versions: dict[int, int] = {}
+        self._locations: Optional[list] = None
+        self._locations_at = 0.0
+        self.last_error: Optional[str] = None
+
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mxp-catalog", daemon=True)
+        self._thread.start()
+        get_cache().on_invalidate(self._on_invalidate)
+
+    # ---- reads ----
+    def products(self) -> list:
+        if self._products is None or time.monotonic() - self._products_at > MAX_STALENESS:
+            self._refresh_inline(self.refresh_products, have_data=self._products is not None)
+        return self._products or []
+
+    def products_with_stock(self, location_id: int) -> list:
+        location_id = int(location_id)
+        self._stock_read_at[location_id] = time.monotonic()
+        if location_id not in self._stock or time.monotonic() - self._stock_at.get(location_id, 0.0) > MAX_STALENESS:
+            self._refresh_inline(lambda: self.refresh_stock(location_id), have_data=location_id in self._stock)
+        return self._stock.get(location_id, [])
+
+    def locations(self) -> list:
+        if self._locations is None or time.monotonic() - self._locations_at > MAX_STALENESS:
+            self._refresh_inline(self.refresh_locations, have_data=self._locations is not None)
+        return self._locations or []
+
+    def products_snapshot(self) -> tuple[int, list]:
+        # (version, rows) read together, for caches keyed by catalog version
+        rows = self.products()
+        with self._lock:
+            return self.products_version, self._products or rows
+
+    def stock_snapshot(self, location_id: int) -> tuple[int, list]:
+        rows = self.products_with_stock(location_id)
+        with self._lock:
+            location_id = int(location_id)
+            return self.stock_versions.get(location_id, 0), self._stock.get(location_id, rows)
+
+    # memory-only reads: None when the data would have to be fetched first
+    def peek_locations(self) -> Optional[list]:
+        if self._locations is None or time.monotonic() - self._locations_at > MAX_STALENESS:
+            return None
+        return self._locations
+
+    def peek_products(self) -> Optional[list]:
+        if self._products is None or time.monotonic() - self._products_at > MAX_STALENESS:
+            return None
+        return self._products
+
+    def peek_stock(self, location_id: int, max_age: Optional[float] = MAX_STALENESS) -> Optional[tuple[int, list]]:
+        """(version, rows) already held for the location; max_age=None accepts any age."""
+        location_id = int(location_id)
+        self._stock_read_at[location_id] = time.monotonic()
+        with self._lock:
+            if location_id not in self._stock:
+                return None
+            if max_age is not None and time.monotonic() - self._stock_at.get(location_id, 0.0) > max_age:
+                return None
+            return self.stock_versions.get(location_id, 0), self._stock[location_id]
+
+    # ---- writes ----
+    def adjust_stock(self, location_id: int, deltas: dict[str, float], resync: bool = True):
+        """Apply stock changes locally (qty per SKU, negative for sales) without a fetch."""
+        location_id = int(location_id)
+        with self._location_lock(location_id):
+            snap = self._snapshots.get(location_id)
+            if snap is None or not snap.adjust(deltas, resync=resync):
+                return
+            with self._lock:
+                self._stock[location_id] = snap.as_list()
+                self.stock_versions[location_id] = self.stock_versions.get(location_id, 0) + 1
+
+    def _location_lock(self, location_id: int) -> threading.Lock:
+        with self._lock:
+            return self._location_locks.setdefault(location_id, threading.Lock())
+
+    # ---- refresh ----
+    def _refresh_inline(self, refresh, have_data: bool):
+        # with a snapshot in hand, a down API means "serve stale", not "fail the page"
+        if have_data and not get_health_monitor().is_available():
+            return
+        try:
+            refresh()
+        except Exception as e:
+            if not have_data:
+                raise
+            self.last_error = str(e)
+
+    def refresh_locations(self):
+        data = api_get("/locations", timeout=15)
+        with self._lock:
+            self._locations = data if isinstance(data, list) else []
+            self._locations_at = time.monotonic()
+
+    def refresh_products(self):
+        data = api_get("/products", timeout=20)
+        data = data if isinstance(data, list) else []
+        with self._lock:
+            self._products_at = time.monotonic()
+            if data == self._products:
+                # same list: the search index and frames keyed on the version stay valid
+                return
+            self._products = data
+            self.products_version += 1
+
+    def refresh_stock(self, location_id: int):
+        # delta sync against the local snapshot; only changed rows cross the wire
+        snap = self._snapshots.setdefault(location_id, StockSnapshot(location_id))
+        lock = self._location_lock(location_id)
+        try:
+            with lock:
+                params, headers = snap.request()
+                adjustments = snap.adjustments
+            r = snap.fetch(params, headers)
+            with lock:
+                if snap.adjustments != adjustments:
+                    # a sale was applied locally mid-fetch and the response may predate
+                    # it: keep the local numbers and fetch again on the next pass
+                    self._wake.set()
+                    return
+                changed = snap.apply_response(r)
+                data = snap.as_list()
+        except requests.HTTPError:
+            # older backends: plain product list, stock unknown
+            changed = True
+            data = [{**p, "available_qty": None} for p in self.products()]
+
+        with self._lock:
+            self._stock_at[location_id] = time.monotonic()
+            if changed or location_id not in self._stock:
+                self._stock[location_id] = data
+                self.stock_versions[location_id] = self.stock_versions.get(location_id, 0) + 1
+
+    def _watched_locations(self) -> list[int]:
+        now = time.monotonic()
+        return [loc for loc, at in list(self._stock_read_at.items()) if now - at < LOCATION_IDLE_AFTER]
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not get_health_monitor().is_available():
+                continue
+            try:
+                if self._products is not None:
+                    self.refresh_products()
+                for loc in self._watched_locations():
+                    self.refresh_stock(loc)
+                self.last_error = None
+            except Exception as e:
+                # keep serving the last good snapshot
+                self.last_error = str(e)
+
+    def _on_invalidate(self, tags: frozenset):
+        # the mutating session pays one fetch so its next rerun sees its own change
+        try:
+            if "products" in tags:
+                self.refresh_products()
+                for loc in list(self._stock):
+                    self._stock_at[loc] = 0.0
+                self._wake.set()
+            for t in tags:
+                if t.startswith("stock:") and int(t.split(":", 1)[1]) in self._stock:
+                    self.refresh_stock(int(t.split(":", 1)[1]))
+        except Exception as e:
+            self.last_error = str(e)
+
+
+@st.cache_resource
+def get_catalog() -> CatalogService:
+    return CatalogService()
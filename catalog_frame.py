@@ -0,0 +1,83 @@
+# app/catalog_frame.py
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+TEXT_COLUMNS = ["sku", "name", "unit", "barcode"]
+NUMERIC_COLUMNS = ["selling_price", "tax_rate", "available_qty"]
+
+
+def normalize_products(rows: list[dict]) -> pd.DataFrame:
+    """Whole-column type coercion for product / product-with-stock payloads."""
+    df = pd.DataFrame(rows)
+    for c in TEXT_COLUMNS + NUMERIC_COLUMNS + ["id"]:
+        if c not in df.columns:
+            df[c] = None
+
+    for c in TEXT_COLUMNS:
+        df[c] = df[c].fillna("").astype(str).str.strip()
+    for c in NUMERIC_COLUMNS:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    # price / tax default to 0; available_qty stays NaN when stock is unknown
+    df["selling_price"] = df["selling_price"].fillna(0.0)
+    df["tax_rate"] = df["tax_rate"].fillna(0.0)
+    df["id"] = pd.to_numeric(df["id"], errors="coerce").astype("Int64")
+    return df.reset_index(drop=True)
+
+
+def money_col(s: pd.Series) -> pd.Series:
+    return s.map("₵ {:,.2f}".format)
+
+
+class CatalogFrame:
+    """Normalized catalog plus array-backed lookups (SKU -> row position)."""
+
+    __slots__ = ("df", "skus", "price", "tax_rate", "available", "_pos", "_memo")
+
+    def __init__(self, rows: list[dict]):
+        self.df = normalize_products(rows)
+        self.skus = self.df["sku"].to_numpy(dtype=object)
+        self.price = self.df["selling_price"].to_numpy(dtype=float)
+        self.tax_rate = self.df["tax_rate"].to_numpy(dtype=float)
+        self.available = self.df["available_qty"].to_numpy(dtype=float)
+        # first occurrence wins, blank SKUs are not addressable
+        sku = self.df["sku"]
+        keep = ((sku != "") & ~sku.duplicated()).to_numpy()
+        self._pos: dict[str, int] = dict(zip(self.skus[keep].tolist(), np.flatnonzero(keep).tolist()))
+        self._memo: dict[Any, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self._pos
+
+    def position(self, sku: str) -> Optional[int]:
+        return self._pos.get(sku)
+
+    def get(self, sku: str, default=None) -> Optional[dict]:
+        # same shape the POS used for its per-rerun stock_map entries
+        i = self._pos.get(sku)
+        if i is None:
+            return default
+        avail = self.available[i]
+        return {
+            "available_qty": None if np.isnan(avail) else float(avail),
+            "unit": self.df["unit"].iat[i],
+            "name": self.df["name"].iat[i],
+            "selling_price": float(self.price[i]),
+            "tax_rate": float(self.tax_rate[i]),
+        }
+
+    def memo(self, key, build: Callable[["CatalogFrame"], Any]):
+        # derived structures (labels, maps) built once per catalog version
+        if key not in self._memo:
+            self._memo[key] = build(self)
+        return self._memo[key]
+
+
+@st.cache_resource(max_entries=16)
+def get_catalog_frame(kind: str, version: int, _rows: list[dict]) -> CatalogFrame:
+    return CatalogFrame(_rows)
@@ -0,0 +1,132 @@
+# app/catalog_sync.py
+from typing import Optional
+
+import requests
+
+from api_client import api_request
+
+# Delta protocol for GET /products/with_stock (all optional on the server side):
+#   request   ?since=<version>  and/or  If-None-Match: <etag>
+#   304       nothing changed since the ETag
+#   dict      {"version": v, "changed": [rows], "deleted": [skus], "full": bool}
+#   list      plain full snapshot (backends without delta support)
+# A list response may carry its version in the X-Catalog-Version header; without
+# it we never send `since` and every sync is a full (or ETag-skipped) reload.
+
+
+def _row_key(row: dict) -> str:
+    return str(row.get("sku") or row.get("id") or "")
+
+
+class StockSnapshot:
+    """Versioned local copy of /products/with_stock for one location."""
+
+    def __init__(self, location_id: int):
+        self.location_id = int(location_id)
+        self.rows: dict[str, dict] = {}
+        self.version: Optional[str] = None
+        self.etag: Optional[str] = None
+        self.full_reloads = 0
+        self.delta_syncs = 0
+        self.not_modified = 0
+        self._list: list = []
+        # local adjustments the server may never echo back: next sync is a full one
+        self._dirty = False
+        # bumped by every adjust(); tells a caller whether one landed during its fetch
+        self.adjustments = 0
+
+    def as_list(self) -> list:
+        return self._list
+
+    def sync(self) -> bool:
+        """Bring the snapshot up to date; returns True when any row changed."""
+        return self.apply_response(self.fetch(*self.request()))
+
+    # sync() in steps, for callers that must not hold a lock across the network
+    def request(self) -> tuple[dict, dict]:
+        """(params, headers) for the next GET /products/with_stock."""
+        params = {"location_id": self.location_id}
+        headers = {}
+        if self.version is not None and not self._dirty:
+            params["since"] = self.version
+        if self.etag and not self._dirty:
+            headers["If-None-Match"] = self.etag
+        return params, headers
+
+    def fetch(self, params: dict, headers: dict) -> requests.Response:
+        return api_request("GET", "/products/with_stock", params=params, headers=headers or None)
+
+    def apply_response(self, r: requests.Response) -> bool:
+        if r.status_code == 304:
+            self.not_modified += 1
+            return False
+        r.raise_for_status()
+        data = r.json()
+        self.etag = r.headers.get("ETag")
+        self._dirty = False
+
+        if isinstance(data, dict) and "changed" in data:
+            if data.get("full"):
+                self._replace(data.get("changed") or [])
+            else:
+                changed = self._apply(data.get("changed") or [], data.get("deleted") or [])
+                self.delta_syncs += 1
+                if not changed:
+                    self.version = _str_or_none(data.get("version")) or self.version
+                    return False
+            self.version = _str_or_none(data.get("version"))
+        elif isinstance(data, list):
+            self.version = _str_or_none(r.headers.get("X-Catalog-Version"))
+            if not self._replace(data):
+                return False
+        else:
+            raise ValueError("unexpected /products/with_stock payload")
+
+        self._list = list(self.rows.values())
+        return True
+
+    def adjust(self, deltas: dict[str, float], resync: bool = True) -> bool:
+        """Apply local stock changes (e.g. a sale this till just made) ahead of the server.
+
+        With `resync` the next sync ignores since/ETag, so the server's numbers win
+        even for rows it does not report as changed.
+        """
+        changed = False
+        for sku, delta in deltas.items():
+            row = self.rows.get(str(sku))
+            if row is None or row.get("available_qty") is None:
+                continue
+            try:
+                qty = float(row["available_qty"])
+            except (TypeError, ValueError):
+                continue
+            # new row objects: frames built from the old list stay untouched
+            self.rows[str(sku)] = {**row, "available_qty": qty + float(delta)}
+            changed = True
+        if changed:
+            self._list = list(self.rows.values())
+            self._dirty = self._dirty or resync
+            self.adjustments += 1
+        return changed
+
+    def _replace(self, rows: list) -> bool:
+        self.full_reloads += 1
+        new_rows = {_row_key(r): r for r in rows if _row_key(r)}
+        if new_rows == self.rows:
+            # same content: keep the old objects so downstream caches stay valid
+            return False
+        self.rows = new_rows
+        return True
+
+    def _apply(self, changed: list, deleted: list) -> bool:
+        for sku in deleted:
+            self.rows.pop(str(sku), None)
+        for row in changed:
+            key = _row_key(row)
+            if key:
+                self.rows[key] = {**self.rows.get(key, {}), **row}
+        return bool(changed or deleted)
+
+
+def _str_or_none(v) -> Optional[str]:
+    return None if v is None else str(v)
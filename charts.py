@@ -0,0 +1,90 @@
+# app/charts.py
+# Time-series charts whose size does not grow with the range: the series is
+# binned at a resolution picked from the range, then thinned with LTTB
+# (largest triangle three buckets) to at most CHART_MAX_POINTS points.
+import os
+from datetime import date
+from typing import Optional
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))
+
+# resolution -> (pandas resample rule, axis time format)
+RESOLUTIONS = {
+    "hour": ("h", "%d %b %H:%M"),
+    "day": ("D", "%d %b %Y"),
+    "week": ("W-MON", "%d %b %Y"),
+    "month": ("MS", "%b %Y"),
+}
+
+
+def pick_resolution(start: date, end: date) -> str:
+    days = (end - start).days + 1
+    if days <= 3:
+        return "hour"
+    if days <= 120:
+        return "day"
+    if days <= 730:
+        return "week"
+    return "month"
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points LTTB keeps; the first and last point always stay."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets over the interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (the last point for the final one)
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def bin_series(values: pd.Series, resolution: str) -> pd.Series:
+    """Sum a datetime-indexed series into resolution bins (empty bins are 0)."""
+    rule = RESOLUTIONS[resolution][0]
+    values = values[values.index.notna()].sort_index()
+    return values.resample(rule, label="left", closed="left").sum()
+
+
+def downsample(values: pd.Series, max_points: int = CHART_MAX_POINTS) -> pd.Series:
+    if len(values) <= max_points:
+        return values
+    x = values.index.asi8.astype(float)
+    keep = lttb(x, values.to_numpy(dtype=float), max_points)
+    return values.iloc[keep]
+
+
+def trend_chart(
+    values: pd.Series,
+    resolution: str,
+    title: str = "Sales",
+    max_points: Optional[int] = None,
+) -> alt.Chart:
+    """Line chart of a datetime-indexed series, binned and capped at max_points."""
+    points = downsample(bin_series(values, resolution), max_points or CHART_MAX_POINTS)
+    fmt = RESOLUTIONS[resolution][1]
+    df = pd.DataFrame({"when": points.index, "value": points.to_numpy()})
+    return (
+        alt.Chart(df)
+        .mark_line(point=len(df) <= 60)
+        .encode(
+            x=alt.X("when:T", title=None, axis=alt.Axis(format=fmt)),
+            y=alt.Y("value:Q", title=title),
+            tooltip=[alt.Tooltip("when:T", format=fmt, title=resolution.title()), alt.Tooltip("value:Q", format=",.2f", title=title)],
+        )
+    )
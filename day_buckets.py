@@ -0,0 +1,155 @@
+# app/day_buckets.py
+# Per-day sales totals for the dashboard. A day that is over never changes, so
+# its bucket is stored once (SQLite, keyed by day / location / payment method)
+# and every range is summed from buckets; only today is asked for again.
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from api_client import api_get
+from cache import cached, get_cache
+from sales_mirror import get_sales_mirror
+from storage import DATA_DIR
+
+BUCKETS_DB = os.getenv("DAY_BUCKETS_DB", os.path.join(DATA_DIR, "day_buckets.db"))
+# a day counts as closed this long after midnight (late syncs, offline replays)
+CLOSE_GRACE = timedelta(minutes=int(os.getenv("DAY_BUCKETS_GRACE_MINUTES", "15")))
+TODAY_TTL = 15
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS day_totals (
+    day TEXT NOT NULL,
+    location_id INTEGER NOT NULL,   -- 0 = all locations
+    payment_method TEXT NOT NULL,   -- '' = all methods
+    total REAL NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (day, location_id, payment_method)
+) WITHOUT ROWID;
+"""
+
+
+def _days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _runs(days: list[date]) -> list[tuple[date, date]]:
+    """Sorted days grouped into (first, last) runs of consecutive days."""
+    runs: list[tuple[date, date]] = []
+    for d in days:
+        if runs and d == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], d)
+        else:
+            runs.append((d, d))
+    return runs
+
+
+def last_closed_day(now: Optional[datetime] = None) -> date:
+    return ((now or datetime.now()) - CLOSE_GRACE).date() - timedelta(days=1)
+
+
+def _load_days(start: date, end: date, location_id: Optional[int], method: Optional[str]) -> tuple[dict[date, float], set]:
+    """(totals per day, days not final yet) from the local mirror when it has the range, else the API."""
+    mirror = get_sales_mirror()
+    unsettled: set = set()
+    if mirror.covers(start):
+        df = mirror.daily(start, end, location_id, method)
+        found = {date.fromisoformat(d): float(t) for d, t in zip(df["date"], df["total"])}
+        # a sale whose document is still to be re-read may carry an old total, and a
+        # day that ended after the last sync pass may still be missing sales
+        unsettled = mirror.unsettled_days(start, end)
+        pulled_at = mirror.pulled_at()
+        unsettled |= {d for d in _days(start, end) if pulled_at is None or d >= (pulled_at - CLOSE_GRACE).date()}
+    else:
+        # the API summary is for all locations and methods
+        summary = api_get(
+            "/reports/sales_summary",
+            params={"start_date": start.isoformat(), "end_date": end.isoformat()},
+            timeout=15,
+        )
+        found = {}
+        for row in (summary or {}).get("daily", []):
+            day = date.fromisoformat(str(row["date"])[:10])
+            found[day] = found.get(day, 0.0) + float(row.get("total") or 0.0)
+    # days without sales are buckets too (0.0), so they are not asked for again
+    return {d: found.get(d, 0.0) for d in _days(start, end)}, unsettled
+
+
+@cached(ttl=TODAY_TTL, tags=("sales",))
+def _open_days(start: date, end: date, location_id: Optional[int], method: Optional[str]) -> dict[date, float]:
+    return _load_days(start, end, location_id, method)[0]
+
+
+class DayBuckets:
+    def __init__(self, path: str = BUCKETS_DB):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        get_cache().on_invalidate(self._on_invalidate)
+
+    def daily(self, start: date, end: date, location_id: Optional[int] = None, method: Optional[str] = None) -> pd.DataFrame:
+        """One row per day in [start, end]: date, total."""
+        loc_key, method_key = int(location_id or 0), method or ""
+        closed_end = min(end, last_closed_day())
+        totals: dict[date, float] = {}
+
+        if start <= closed_end:
+            totals.update(self._stored(start, closed_end, loc_key, method_key))
+            missing = [d for d in _days(start, closed_end) if d not in totals]
+            # one request per run of missing days (stored days in between are not
+            # fetched again), stored for good
+            for first, last in _runs(missing):
+                fetched, unsettled = _load_days(first, last, location_id, method)
+                self._store({d: t for d, t in fetched.items() if d not in unsettled}, loc_key, method_key)
+                totals.update(fetched)
+
+        open_start = max(start, closed_end + timedelta(days=1))
+        if open_start <= end:
+            totals.update(_open_days(open_start, end, location_id, method))
+
+        return pd.DataFrame(
+            [{"date": d.isoformat(), "total": totals.get(d, 0.0)} for d in _days(start, end)],
+            columns=["date", "total"],
+        )
+
+    def _stored(self, start: date, end: date, loc_key: int, method_key: str) -> dict[date, float]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT day, total FROM day_totals WHERE location_id = ? AND payment_method = ? AND day BETWEEN ? AND ?",
+                (loc_key, method_key, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        return {date.fromisoformat(d): t for d, t in rows}
+
+    def _store(self, totals: dict[date, float], loc_key: int, method_key: str):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO day_totals (day, location_id, payment_method, total, stored_at) VALUES (?, ?, ?, ?, ?)",
+                [(d.isoformat(), loc_key, method_key, float(t), now) for d, t in totals.items()],
+            )
+
+    def forget(self, day: date):
+        with self._lock:
+            self._db.execute("DELETE FROM day_totals WHERE day = ?", (day.isoformat(),))
+
+    def _on_invalidate(self, tags: frozenset):
+        # lines added to an old sale: its day is recomputed on the next read
+        mirror = get_sales_mirror()
+        for t in tags:
+            if t.startswith("sale:") and t.split(":", 1)[1].isdigit():
+                day = mirror.sale_day(int(t.split(":", 1)[1]))
+                if day is not None:
+                    self.forget(day)
+
+
+@st.cache_resource
+def get_day_buckets() -> DayBuckets:
+    return DayBuckets()
@@ -0,0 +1,253 @@
+# app/documents.py
+# Printable sale documents (Receipt / Proforma / Waybill) shared by the POS print
+# area and the Invoice page. Templates are compiled once at import; the company
+# header is rendered once per company settings snapshot.
+import html
+import threading
+from datetime import datetime
+from string import Template
+
+from api_client import api_get
+from cache import cached
+from health import get_health_monitor
+from logo import receipt_logo
+
+DOC_TYPES = ["Receipt", "Proforma", "Waybill"]
+RECEIPT_WIDTH = "80mm"
+INVOICE_WIDTH = "700px"
+
+_CELL = "padding:6px 0;border-bottom:1px solid #eee;"
+_HEAD = "border-bottom:2px solid #111;padding-bottom:6px;"
+
+_PAGE = Template("""<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8"/>
+  <style>
+    body { font-family: Arial, sans-serif; font-size: 12px; color: #111; margin: 0; padding: 0; background: #fff; }
+    .wrap { width: $width; max-width: $width; margin: 0 auto; padding: 10px; background: #fff;
+            border: 1px solid #e5e7eb; border-radius: 8px; }
+    table { width: 100%; border-collapse: collapse; font-size: 11px; }
+    th, td { padding: 4px 0; }
+    button { border: 1px solid #111; background: #111; color: #fff; padding: 6px 10px; border-radius: 6px;
+             cursor: pointer; font-weight: 700; font-size: 11px; }
+    .muted { color:#6b7280; }
+    @media print {
+      body { margin: 0; }
+      .no-print { display:none !important; }
+      @page { size: auto; margin: 5mm; }
+    }
+  </style>
+</head>
+<body>
+  <div class="wrap">
+    $header
+        <div class="muted" style="font-size:12px;margin-top:6px;font-weight:800;">$doc_type</div>
+        $doc_note
+      </div>
+    </div>
+
+    <hr style="margin:10px 0;" />
+
+    <div style="display:flex;justify-content:space-between;gap:10px;">
+      <div>
+        <div><b>Customer:</b> $customer</div>
+        <div><b>Location:</b> $location</div>
+        $served_by
+      </div>
+      <div style="text-align:right;">
+        <div><b>Sale ID:</b> $sale_id</div>
+        <div><b>Date:</b> $created</div>
+      </div>
+    </div>
+
+    <div style="margin-top:10px;">
+      <table>
+        $head_cols
+        $rows
+      </table>
+    </div>
+
+    $totals
+
+    <div style="text-align:center;color:#6b7280;font-size:11px;margin-top:12px;">$footer</div>
+
+    <div class="no-print" style="margin-top:12px;text-align:center;">
+      <button onclick="window.print()">🖨 Print</button>
+    </div>
+  </div>
+</body>
+</html>
+""")
+
+# left open: the page template closes it after the document title block
+_COMPANY = Template("""<div style="display:flex;gap:12px;align-items:flex-start;">
+      <div>$logo</div>
+      <div style="flex:1;">
+        <div style="font-weight:900;font-size:16px;line-height:1.1;">$name</div>
+        $contact""")
+
+_PRICED_HEAD = (
+    f"<tr><th style='text-align:left;{_HEAD}'>Item</th><th style='text-align:right;{_HEAD}'>Qty</th>"
+    f"<th style='text-align:right;{_HEAD}'>Price</th><th style='text-align:right;{_HEAD}'>Total</th></tr>"
+)
+_WAYBILL_HEAD = f"<tr><th style='text-align:left;{_HEAD}'>Item</th><th style='text-align:right;{_HEAD}'>Qty</th></tr>"
+_PRICED_ROW = Template(
+    f"<tr><td style='{_CELL}'>$item</td><td style='{_CELL}text-align:right;'>$qty</td>"
+    f"<td style='{_CELL}text-align:right;'>$price</td><td style='{_CELL}text-align:right;'>$total</td></tr>"
+)
+_WAYBILL_ROW = Template(f"<tr><td style='{_CELL}'>$item</td><td style='{_CELL}text-align:right;'>$qty</td></tr>")
+_NO_ROWS = "<tr><td colspan='4' style='padding:8px 0;'>No line items</td></tr>"
+
+_PROFORMA_NOTE = (
+    "<div style='text-align:center;color:#6b7280;font-size:11px;margin-top:4px;'>"
+    "This is a Proforma document (not a tax invoice).</div>"
+)
+_PRINT_SCRIPT = "<script>window.print();</script></body>"
+
+_e = html.escape
+
+
+def _num(x, default=0.0) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return default
+
+
+def money(x) -> str:
+    return f"₵ {_num(x):,.2f}"
+
+
+# last settings the API returned, so prints keep their branding while it is down
+_company_fallback: dict = {}
+
+
+@cached(ttl=60, tags=("company",))
+def load_company():
+    # circuit open: the last settings seen, without waiting on connect timeouts
+    if not get_health_monitor().is_available():
+        data = dict(_company_fallback)
+    else:
+        try:
+            data = api_get("/settings/company", timeout=15) or {}
+            _company_fallback.clear()
+            _company_fallback.update(data)
+        except Exception:
+            data = dict(_company_fallback)
+
+    # receipts embed the small processed variant, never the raw upload
+    logo = receipt_logo(data["logo_base64"]) if data.get("logo_base64") else None
+    return {
+        "company_name": data.get("company_name", "Marvenixx POS (MXP)"),
+        "address": data.get("address", ""),
+        "phone": data.get("phone", ""),
+        "website": data.get("website", ""),
+        "footer": data.get("footer", "Thank you for your business."),
+        "logo_base64": logo.b64 if logo else "",
+        "logo_hash": logo.digest if logo else "",
+        "logo_png": logo.png if logo else b"",
+        "currency_symbol": data.get("currency_symbol", "₵"),
+    }
+
+
+# load_company() hands out the same dict until "company" is invalidated, so the
+# header is keyed on that object: one render per settings snapshot
+_headers_lock = threading.Lock()
+_headers: dict[int, tuple[dict, str]] = {}
+
+
+def company_header(company: dict) -> str:
+    hit = _headers.get(id(company))
+    if hit is not None and hit[0] is company:
+        return hit[1]
+
+    logo = ""
+    if company.get("logo_base64"):
+        logo = f'<img src="data:image/png;base64,{_e(company["logo_base64"])}" style="height:60px;object-fit:contain;" />'
+
+    address = str(company.get("address") or "").strip()
+    phone = str(company.get("phone") or "").strip()
+    website = str(company.get("website") or "").strip()
+    contact = ""
+    if address:
+        contact += f"<div style='font-size:11px;color:#111;'>{_e(address)}</div>"
+    if phone or website:
+        sep = " • " if phone and website else ""
+        contact += f"<div style='font-size:11px;color:#111;'>{_e(phone)}{sep}{_e(website)}</div>"
+
+    out = _COMPANY.substitute(logo=logo, name=_e(str(company.get("company_name") or "")), contact=contact)
+    with _headers_lock:
+        if len(_headers) >= 8:
+            _headers.clear()
+        _headers[id(company)] = (company, out)
+    return out
+
+
+def _rows(lines: list, waybill: bool) -> str:
+    out = []
+    for ln in lines:
+        item = _e(str(ln.get("product_name") or ln.get("name") or ln.get("item") or ""))
+        qty = _num(ln.get("qty", 0))
+        if waybill:
+            out.append(_WAYBILL_ROW.substitute(item=item, qty=f"{qty:.2f}"))
+            continue
+        price = _num(ln.get("unit_price", 0))
+        total = _num(ln.get("line_total", qty * price), qty * price)
+        out.append(_PRICED_ROW.substitute(item=item, qty=f"{qty:.2f}", price=money(price), total=money(total)))
+    return "".join(out) or _NO_ROWS
+
+
+def render_document(
+    company: dict,
+    doc_type: str,
+    sale_id,
+    created,
+    customer,
+    location_label,
+    lines: list,
+    total_amount,
+    receipt_no=None,
+    payment_method=None,
+    cash_received=None,
+    change_due=None,
+    served_by=None,
+    width: str = RECEIPT_WIDTH,
+) -> str:
+    waybill = doc_type == "Waybill"
+
+    note = _PROFORMA_NOTE if doc_type == "Proforma" else ""
+    if receipt_no:
+        note += f"<div class='muted' style='font-size:11px;margin-top:2px;'><b>Receipt No:</b> {_e(str(receipt_no))}</div>"
+
+    totals = ""
+    if not waybill:
+        totals = f"<hr style='margin:10px 0;' /><div style='text-align:right;font-weight:900;font-size:14px;'>TOTAL: {money(total_amount)}</div>"
+        if payment_method:
+            totals += f"<div style='margin-top:8px;font-size:12px;'><b>Payment:</b> {_e(str(payment_method))}</div>"
+        if cash_received is not None:
+            totals += f"<div style='font-size:12px;'><b>Cash Received:</b> {money(cash_received)}</div>"
+        if change_due is not None:
+            totals += f"<div style='font-size:12px;'><b>Change:</b> {money(change_due)}</div>"
+
+    created_txt = str(created)[:19].replace("T", " ") if created else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    return _PAGE.substitute(
+        width=width,
+        header=company_header(company),
+        doc_type=_e(doc_type),
+        doc_note=note,
+        customer=_e(str(customer or "")),
+        location=_e(str(location_label or "")),
+        served_by=f"<div><b>Served by:</b> {_e(str(served_by))}</div>" if served_by else "",
+        sale_id=_e(str(sale_id)),
+        created=_e(created_txt),
+        head_cols=_WAYBILL_HEAD if waybill else _PRICED_HEAD,
+        rows=_rows(lines, waybill),
+        totals=totals,
+        footer=_e(str(company.get("footer") or "").strip() or "Thank you for your business."),
+    )
+
+
+def with_auto_print(doc_html: str) -> str:
+    return doc_html.replace("</body>", _PRINT_SCRIPT)
@@ -0,0 +1,224 @@
+# app/escpos.py
+# Raw ESC/POS output for thermal receipt printers: no browser, no print dialog.
+# ESCPOS_PRINTER selects the target:
+#   tcp://host[:port]   network printer (raw socket, port 9100 by default)
+#   /dev/usb/lp0        device file (USB / parallel printers)
+import io
+import os
+import socket
+import threading
+from datetime import datetime
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+PRINTER_TARGET = os.getenv("ESCPOS_PRINTER", "")
+# characters per line in font A: 48 on 80 mm paper, 32 on 58 mm
+PRINTER_COLUMNS = int(os.getenv("ESCPOS_COLUMNS", "48"))
+PRINTER_TIMEOUT = float(os.getenv("ESCPOS_TIMEOUT", "5"))
+DEFAULT_PORT = 9100
+
+ESC = b"\x1b"
+GS = b"\x1d"
+INIT = ESC + b"@"
+CODEPAGE_PC437 = ESC + b"t\x00"
+BOLD_ON = ESC + b"E\x01"
+BOLD_OFF = ESC + b"E\x00"
+DOUBLE_ON = GS + b"!\x11"
+DOUBLE_OFF = GS + b"!\x00"
+ALIGN_LEFT = ESC + b"a\x00"
+ALIGN_CENTER = ESC + b"a\x01"
+FEED_CUT = GS + b"V\x42\x03"  # feed 3 lines, then partial cut
+
+ENCODING = "cp437"
+
+
+def is_configured() -> bool:
+    return bool(PRINTER_TARGET)
+
+
+def _num(x, default=0.0) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return default
+
+
+def money(x) -> str:
+    # the cedi sign is not in any printer code page
+    return f"GHS {_num(x):,.2f}"
+
+
+class EscPosDoc:
+    """Byte-stream builder; text is wrapped / padded to the printer's column count."""
+
+    __slots__ = ("columns", "_buf")
+
+    def __init__(self, columns: int = PRINTER_COLUMNS):
+        self.columns = columns
+        self._buf = bytearray(INIT + CODEPAGE_PC437)
+
+    def raw(self, data: bytes) -> "EscPosDoc":
+        self._buf += data
+        return self
+
+    def line(self, text: str = "", bold: bool = False, center: bool = False, double: bool = False) -> "EscPosDoc":
+        width = self.columns // 2 if double else self.columns
+        out = bytearray(ALIGN_CENTER if center else ALIGN_LEFT)
+        out += (BOLD_ON if bold else b"") + (DOUBLE_ON if double else b"")
+        for chunk in _wrap(str(text), width):
+            out += chunk.encode(ENCODING, "replace") + b"\n"
+        out += (DOUBLE_OFF if double else b"") + (BOLD_OFF if bold else b"")
+        self._buf += out
+        return self
+
+    def columns_line(self, left: str, right: str, bold: bool = False) -> "EscPosDoc":
+        # left text wraps, right text is aligned to the last column of the final row
+        left_rows = _wrap(str(left), self.columns)
+        last = left_rows[-1]
+        if len(last) + 1 + len(right) > self.columns:
+            left_rows.append("")
+            last = ""
+        left_rows[-1] = last + " " * (self.columns - len(last) - len(right)) + right
+        return self.line("\n".join(left_rows), bold=bold)
+
+    def rule(self, char: str = "-") -> "EscPosDoc":
+        return self.line(char * self.columns)
+
+    def image(self, raster: bytes) -> "EscPosDoc":
+        self._buf += ALIGN_CENTER + raster + b"\n" + ALIGN_LEFT
+        return self
+
+    def cut(self) -> "EscPosDoc":
+        self._buf += FEED_CUT
+        return self
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buf)
+
+
+def _wrap(text: str, width: int) -> list[str]:
+    rows = []
+    for para in text.split("\n"):
+        while len(para) > width:
+            cut = para.rfind(" ", 0, width + 1)
+            cut = cut if cut > 0 else width
+            rows.append(para[:cut].rstrip())
+            para = para[cut:].lstrip()
+        rows.append(para)
+    return rows
+
+
+# -------------------- logo --------------------
+_raster_lock = threading.Lock()
+_rasters: dict[str, bytes] = {}
+
+
+def raster_logo(png: bytes, digest: str, max_width: int = 384) -> bytes:
+    """GS v 0 raster command for a (monochrome) PNG, built once per logo hash."""
+    hit = _rasters.get(digest)
+    if hit is not None:
+        return hit
+
+    img = Image.open(io.BytesIO(png)).convert("L")
+    if img.width > max_width:
+        img.thumbnail((max_width, img.height), Image.LANCZOS)
+    # PIL "1": 1 = white; ESC/POS raster: 1 = black. Rows are padded to whole bytes.
+    bits = ImageOps.invert(img).convert("1")
+    width_bytes = (bits.width + 7) // 8
+    data = GS + b"v0\x00" + width_bytes.to_bytes(2, "little") + bits.height.to_bytes(2, "little") + bits.tobytes()
+
+    with _raster_lock:
+        if len(_rasters) >= 8:
+            _rasters.clear()
+        _rasters[digest] = data
+    return data
+
+
+# -------------------- documents --------------------
+def render_escpos(
+    company: dict,
+    doc_type: str,
+    sale_id,
+    created,
+    customer,
+    location_label,
+    lines: list,
+    total_amount,
+    receipt_no=None,
+    payment_method=None,
+    cash_received=None,
+    change_due=None,
+    columns: int = PRINTER_COLUMNS,
+) -> bytes:
+    """Same document as documents.render_document, as printer bytes."""
+    waybill = doc_type == "Waybill"
+    doc = EscPosDoc(columns)
+
+    if company.get("logo_png") and company.get("logo_hash"):
+        doc.image(raster_logo(company["logo_png"], company["logo_hash"]))
+    doc.line(company.get("company_name") or "", bold=True, center=True, double=True)
+    address = str(company.get("address") or "").strip()
+    if address:
+        doc.line(address, center=True)
+    contact = " - ".join(x for x in (str(company.get("phone") or "").strip(), str(company.get("website") or "").strip()) if x)
+    if contact:
+        doc.line(contact, center=True)
+
+    doc.line(doc_type.upper(), bold=True, center=True)
+    if doc_type == "Proforma":
+        doc.line("This is a Proforma document (not a tax invoice).", center=True)
+    if receipt_no:
+        doc.line(f"Receipt No: {receipt_no}", center=True)
+    doc.rule()
+
+    created_txt = str(created)[:19].replace("T", " ") if created else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    doc.columns_line(f"Sale ID: {sale_id}", created_txt)
+    doc.line(f"Customer: {customer or ''}")
+    doc.line(f"Location: {location_label or ''}")
+    doc.rule()
+
+    if waybill:
+        doc.columns_line("Item", "Qty", bold=True)
+    for ln in lines:
+        item = str(ln.get("product_name") or ln.get("name") or ln.get("item") or "")
+        qty = _num(ln.get("qty", 0))
+        if waybill:
+            doc.columns_line(item, f"{qty:.2f}")
+            continue
+        price = _num(ln.get("unit_price", 0))
+        total = _num(ln.get("line_total", qty * price), qty * price)
+        doc.line(item)
+        doc.columns_line(f"  {qty:.2f} x {money(price)}", money(total))
+    if not lines:
+        doc.line("No line items")
+
+    if not waybill:
+        doc.rule()
+        doc.columns_line("TOTAL", money(total_amount), bold=True)
+        if payment_method:
+            doc.columns_line("Payment", str(payment_method))
+        if cash_received is not None:
+            doc.columns_line("Cash Received", money(cash_received))
+        if change_due is not None:
+            doc.columns_line("Change", money(change_due))
+
+    doc.line()
+    doc.line(str(company.get("footer") or "").strip() or "Thank you for your business.", center=True)
+    return doc.cut().getvalue()
+
+
+# -------------------- transport --------------------
+def send(data: bytes, target: Optional[str] = None, timeout: float = PRINTER_TIMEOUT):
+    """Write a job to a tcp://host:port printer or a device file; raises OSError on failure."""
+    target = target or PRINTER_TARGET
+    if not target:
+        raise OSError("No ESC/POS printer configured (set ESCPOS_PRINTER)")
+
+    if target.startswith("tcp://"):
+        host, _, port = target[len("tcp://"):].partition(":")
+        with socket.create_connection((host, int(port or DEFAULT_PORT)), timeout=timeout) as sock:
+            sock.sendall(data)
+    else:
+        with open(target, "wb") as dev:
+            dev.write(data)
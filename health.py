@@ -0,0 +1,92 @@
+# app/health.py
+import os
+import threading
+import time
+from typing import Optional
+
+import streamlit as st
+
+from api_client import api_request
+
+CLOSED = "closed"        # API healthy – calls go through
+OPEN = "open"            # API down – pages fail fast without calling it
+HALF_OPEN = "half_open"  # cool-down elapsed – next probe decides
+
+PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))
+PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "3"))
+FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "2"))
+OPEN_COOLDOWN = float(os.getenv("HEALTH_OPEN_COOLDOWN", "10"))
+
+
+class HealthMonitor:
+    def __init__(self, interval: float = PROBE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._last_checked: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mxp-health", daemon=True)
+        self._thread.start()
+
+    # ---- read side (never blocks on the network) ----
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= OPEN_COOLDOWN:
+                self._state = HALF_OPEN
+                self._wake.set()
+            return self._state
+
+    def is_available(self) -> bool:
+        # half-open lets traffic through; the next probe confirms or re-opens
+        return self.state != OPEN
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._last_error
+
+    @property
+    def last_checked(self) -> Optional[float]:
+        return self._last_checked
+
+    # ---- write side (probe thread, or callers reporting real request outcomes) ----
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._last_error = None
+            self._last_checked = time.time()
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self._failures += 1
+            self._last_error = error
+            self._last_checked = time.time()
+            if self._state == HALF_OPEN or self._failures >= FAILURE_THRESHOLD:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def probe(self):
+        try:
+            r = api_request("GET", "/health", timeout=PROBE_TIMEOUT)
+            if r.status_code >= 500:
+                self.record_failure(f"HTTP {r.status_code}")
+            else:
+                self.record_success()
+        except Exception as e:
+            self.record_failure(str(e))
+
+    def _run(self):
+        while True:
+            if self.state != OPEN:
+                self.probe()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+@st.cache_resource
+def get_health_monitor() -> HealthMonitor:
+    return HealthMonitor()
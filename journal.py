@@ -0,0 +1,243 @@
+# app/journal.py
+# Offline sale journal: when the API is unreachable the POS appends the POST /sales
+# body here (SQLite, WAL) and a background replayer posts the entries in order,
+# each with its Idempotency-Key, once the health monitor sees the API again.
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+import streamlit as st
+
+from api_client import api_post_idempotent, new_idempotency_key
+from cache import invalidate
+from health import get_health_monitor
+from storage import DATA_DIR
+
+JOURNAL_DB = os.getenv("SALE_JOURNAL_DB", os.path.join(DATA_DIR, "sale_journal.db"))
+TERMINAL_ID = os.getenv("POS_TERMINAL_ID", socket.gethostname().split(".")[0][:12]).upper()
+REPLAY_INTERVAL = float(os.getenv("JOURNAL_REPLAY_INTERVAL", "5"))
+REPLAY_BACKOFF_MAX = 60.0
+# attempts after which an entry the API keeps answering 5xx / 408 / 429 for is rejected
+MAX_SERVER_ERRORS = int(os.getenv("JOURNAL_MAX_SERVER_ERRORS", "12"))
+
+PENDING = "pending"      # waiting to be posted
+SYNCED = "synced"        # accepted by the API (sale_id / receipt_no filled in)
+REJECTED = "rejected"    # API refused it (4xx, or 5xx MAX_SERVER_ERRORS times): needs a decision in Offline Sales
+DISCARDED = "discarded"  # rejected and written off by an admin
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offline_sales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    provisional_no TEXT,
+    location_id INTEGER,
+    payload TEXT NOT NULL,
+    document TEXT,
+    total REAL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    sale_id INTEGER,
+    receipt_no TEXT,
+    created_at REAL NOT NULL,
+    synced_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_offline_sales_status ON offline_sales (status, id);
+"""
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    id: int
+    idempotency_key: str
+    provisional_no: str
+
+
+class SaleJournal:
+    def __init__(self, path: str = JOURNAL_DB, interval: float = REPLAY_INTERVAL):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # every append is fsynced before the cashier sees a receipt
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(_SCHEMA)
+        self.last_error: Optional[str] = None
+
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mxp-journal", daemon=True)
+        self._thread.start()
+
+    # ---- till side ----
+    def append(self, payload: dict, total: float, key: Optional[str] = None) -> JournalEntry:
+        """Journal a sale; appending the same key twice returns the first entry."""
+        key = key or new_idempotency_key()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, provisional_no FROM offline_sales WHERE idempotency_key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                return JournalEntry(row["id"], key, row["provisional_no"])
+            cur = self._db.execute(
+                "INSERT INTO offline_sales (idempotency_key, location_id, payload, total, status, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, payload.get("location_id"), json.dumps(payload), float(total), PENDING, time.time()),
+            )
+            entry_id = cur.lastrowid
+            provisional_no = f"OFF-{TERMINAL_ID}-{entry_id:05d}"
+            self._db.execute("UPDATE offline_sales SET provisional_no = ? WHERE id = ?", (provisional_no, entry_id))
+        return JournalEntry(entry_id, key, provisional_no)
+
+    def set_document(self, entry_id: int, sale: dict, lines: list):
+        # what was printed, so the receipt can be reprinted / reconciled later
+        with self._lock:
+            self._db.execute(
+                "UPDATE offline_sales SET document = ? WHERE id = ?",
+                (json.dumps({"sale": sale, "lines": lines}, default=str), int(entry_id)),
+            )
+
+    def document(self, entry_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT document FROM offline_sales WHERE id = ?", (int(entry_id),)).fetchone()
+        return json.loads(row["document"]) if row and row["document"] else None
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM offline_sales WHERE status = ?", (PENDING,)).fetchone()[0]
+
+    # ---- reconciliation ----
+    def entries(self, status: Optional[str] = None, limit: int = 500) -> list[dict]:
+        sql = (
+            "SELECT id, provisional_no, location_id, total, status, attempts, last_error, sale_id, receipt_no,"
+            " created_at, synced_at, idempotency_key FROM offline_sales"
+        )
+        args: tuple = ()
+        if status:
+            sql += " WHERE status = ?"
+            args = (status,)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY id DESC LIMIT ?", args + (int(limit),)).fetchall()
+        return [dict(r) for r in rows]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM offline_sales GROUP BY status").fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    def retry(self, entry_id: int):
+        # a fresh run of attempts, or a 5xx-rejected entry would be rejected again at once
+        with self._lock:
+            self._db.execute(
+                "UPDATE offline_sales SET status = ?, attempts = 0 WHERE id = ? AND status = ?",
+                (PENDING, int(entry_id), REJECTED),
+            )
+        self._wake.set()
+
+    def discard(self, entry_id: int):
+        self._set_status(entry_id, DISCARDED, REJECTED)
+
+    def sync_now(self):
+        self._wake.set()
+
+    def _set_status(self, entry_id: int, status: str, only_from: str):
+        with self._lock:
+            self._db.execute(
+                "UPDATE offline_sales SET status = ? WHERE id = ? AND status = ?", (status, int(entry_id), only_from)
+            )
+
+    # ---- replay ----
+    def replay(self) -> bool:
+        """Post pending entries oldest first; stops at the first transient failure.
+
+        An entry still failing with a server error after MAX_SERVER_ERRORS attempts is
+        marked REJECTED so it does not hold back the entries behind it.
+
+        Returns False after a failure, so the caller can back off.
+        """
+        health = get_health_monitor()
+        while health.is_available():
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT id, idempotency_key, location_id, payload, attempts FROM offline_sales"
+                    " WHERE status = ? ORDER BY id LIMIT 1",
+                    (PENDING,),
+                ).fetchone()
+            if row is None:
+                return True
+
+            try:
+                # one attempt per pass: the replay loop does its own backoff
+                r = api_post_idempotent(
+                    "/sales",
+                    json.loads(row["payload"]),
+                    row["idempotency_key"],
+                    timeout=(3.05, 25),
+                    attempts=1,
+                    deadline=30,
+                )
+            except requests.RequestException as e:
+                health.record_failure(str(e))
+                self._failed(row, str(e))
+                return False
+
+            if r.status_code >= 500 or r.status_code in (408, 429):
+                if row["attempts"] + 1 >= MAX_SERVER_ERRORS:
+                    # the API answers but keeps failing on this body: stop blocking the queue
+                    self._failed(row, f"HTTP {r.status_code} after {row['attempts'] + 1} attempts: {r.text[:200]}", status=REJECTED)
+                    continue
+                self._failed(row, f"HTTP {r.status_code}: {r.text[:200]}")
+                return False
+            if r.status_code >= 400:
+                # the API will never accept this body as-is (e.g. stock, unknown SKU)
+                self._failed(row, f"HTTP {r.status_code}: {r.text[:500]}", status=REJECTED)
+                continue
+
+            data = r.json() if r.content else {}
+            with self._lock:
+                self._db.execute(
+                    "UPDATE offline_sales SET status = ?, sale_id = ?, receipt_no = ?, synced_at = ?, last_error = NULL,"
+                    " attempts = attempts + 1 WHERE id = ?",
+                    (SYNCED, data.get("sale_id") or data.get("id"), data.get("receipt_no"), time.time(), row["id"]),
+                )
+            invalidate("sales", f"stock:{row['location_id']}")
+        return True
+
+    def _failed(self, row, error: str, status: str = PENDING):
+        self.last_error = error
+        with self._lock:
+            self._db.execute(
+                "UPDATE offline_sales SET status = ?, attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (status, error, row["id"]),
+            )
+
+    def _run(self):
+        wait = self.interval
+        while True:
+            self._wake.wait(wait)
+            self._wake.clear()
+            if not get_health_monitor().is_available():
+                # the health probe decides when the API is back
+                wait = self.interval
+                continue
+            try:
+                ok = self.replay()
+            except Exception as e:
+                self.last_error = str(e)
+                ok = False
+            # back off while posts keep failing, straight back to normal after a good pass
+            wait = self.interval if ok else min(REPLAY_BACKOFF_MAX, wait * 2) * random.uniform(0.8, 1.2)
+
+
+@st.cache_resource
+def get_journal() -> SaleJournal:
+    return SaleJournal()
@@ -0,0 +1,72 @@
+# app/logo.py
+# Logo pipeline: uploads are shrunk once to a receipt-sized, 1-bit, optimized PNG
+# and stored with a content hash; renderers use the small decoded variant below.
+import base64
+import binascii
+import hashlib
+import io
+import threading
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+# 58 mm thermal heads are 384 dots wide; the receipt shows the logo at 60 px tall
+LOGO_MAX_SIZE = (384, 160)
+_MEMO_SIZE = 8
+
+
+@dataclass(frozen=True)
+class Logo:
+    digest: str
+    png: bytes
+    b64: str
+
+
+def process_logo(raw: bytes, max_size: tuple[int, int] = LOGO_MAX_SIZE) -> bytes:
+    """Any PIL-readable image -> white-backed, dithered monochrome PNG within max_size."""
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(raw)))
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        # flatten onto white so transparent areas don't print black
+        img = img.convert("RGBA")
+        bg = Image.new("RGBA", img.size, "white")
+        bg.alpha_composite(img)
+        img = bg
+    img = img.convert("L")
+    img.thumbnail(max_size, Image.LANCZOS)
+    img = img.convert("1")
+
+    out = io.BytesIO()
+    img.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+_lock = threading.Lock()
+_memo: dict[str, Logo] = {}
+
+
+def receipt_logo(logo_base64: str) -> Logo:
+    """Small variant of a stored logo, processed and decoded once per process.
+
+    Logos saved before the pipeline existed are converted here on first use.
+    """
+    key = content_hash(logo_base64.encode("ascii", "ignore"))
+    hit = _memo.get(key)
+    if hit is not None:
+        return hit
+
+    try:
+        png = process_logo(base64.b64decode(logo_base64))
+        logo = Logo(content_hash(png), png, base64.b64encode(png).decode("ascii"))
+    except (OSError, ValueError, binascii.Error):
+        # not an image we can read: pass it through untouched
+        logo = Logo(key, b"", logo_base64)
+
+    with _lock:
+        if len(_memo) >= _MEMO_SIZE:
+            _memo.clear()
+        _memo[key] = logo
+    return logo
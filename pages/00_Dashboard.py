@@ -1,19 +1,22 @@
 # app/pages/05_Dashboard.py
 
-import os
-import requests
+import altair as alt
 import pandas as pd
 import streamlit as st
 from datetime import date
 
 from auth import require_login
+from catalog import get_catalog
+from charts import RESOLUTIONS, pick_resolution, trend_chart
+from day_buckets import get_day_buckets
+from rollups import get_sales_cube
+from sales_mirror import get_sales_mirror
 require_login()
 
 st.set_page_config(page_title="MXP Dashboard", layout="wide")
 st.title("📊 Marvenixx POS – Dashboard")
 
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
 # --- Date range controls ---
 today = date.today()
 default_start = today.replace(day=1)
@@ -22,16 +25,35 @@ c1, c2 = st.columns(2)
 start_date = c1.date_input("From date", default_start)
 end_date = c2.date_input("To date", today)
 
-summary = None
+mirror = get_sales_mirror()
+year_start = today.replace(month=1, day=1)
+location_id = None
+method = None
+locations = {}
+
+if mirror.covers(min(start_date, year_start)):
+    # sales are mirrored locally, so they can be sliced by location / method too
+    locations = {"All locations": None}
+    try:
+        locations.update({str(loc.get("name") or f"Location {loc.get('id')}"): loc.get("id") for loc in get_catalog().locations()})
+    except Exception:
+        pass
+    f1, f2 = st.columns(2)
+    location_id = locations[f1.selectbox("Location", list(locations.keys()))]
+    method = f2.selectbox("Payment method", ["All"] + mirror.payment_methods())
+    method = None if method == "All" else method
 
+summary = None
 try:
-    params = {
-        "start_date": start_date.isoformat(),
-        "end_date": end_date.isoformat(),
+    # closed days come from stored buckets; only today is fetched again
+    days = get_day_buckets().daily(min(start_date, year_start), max(end_date, today), location_id, method)
+    day = days["date"]
+    summary = {
+        "sales_today": days.loc[day == today.isoformat(), "total"].sum(),
+        "sales_this_month": days.loc[(day >= today.replace(day=1).isoformat()) & (day <= today.isoformat()), "total"].sum(),
+        "sales_this_year": days.loc[(day >= year_start.isoformat()) & (day <= today.isoformat()), "total"].sum(),
+        "daily": days.loc[(day >= start_date.isoformat()) & (day <= end_date.isoformat())].to_dict("records"),
     }
-    r = requests.get(f"{API_BASE}/reports/sales_summary", params=params, timeout=15)
-    r.raise_for_status()
-    summary = r.json()
 except Exception as e:
     st.error(f"Could not load sales summary: {e}")
 
@@ -47,17 +69,91 @@ if summary is not None:
 
     st.markdown("---")
 
-    # ---- Daily sales trend chart ----
-    st.subheader("📈 Daily Sales Trend")
+    # ---- Sales trend chart ----
+    local = mirror.covers(start_date)
+    t1, t2 = st.columns([3, 1])
+    options = ["Auto"] + [r for r in RESOLUTIONS if local or r != "hour"]
+    choice = t2.selectbox("Resolution", options, format_func=str.title)
+    resolution = pick_resolution(start_date, end_date) if choice == "Auto" else choice
+    if resolution == "hour" and not local:
+        # hourly needs sale timestamps, which only the local mirror has
+        resolution = "day"
+    t1.subheader(f"📈 Sales Trend ({resolution.title()})")
 
     daily = summary.get("daily", [])
-    if daily:
-        df = pd.DataFrame(daily)
-        df["date"] = pd.to_datetime(df["date"])
-        df = df.set_index("date")
-        st.line_chart(df["total"])
+    if sum(row["total"] for row in daily):
+        if resolution == "hour":
+            sales = get_sales_cube(start_date, end_date, location_id, method, mirror.version, mirror).sales
+            values = sales.set_index("created_at")["total"]
+        else:
+            df = pd.DataFrame(daily)
+            values = df.set_index(pd.to_datetime(df["date"]))["total"]
+        st.altair_chart(trend_chart(values, resolution), use_container_width=True)
     else:
         st.info("No sales in this period.")
 
-    
-    
+
+# ---- Breakdowns (local sales mirror only) ----
+if mirror.covers(start_date):
+    cube = get_sales_cube(start_date, end_date, location_id, method, mirror.version, mirror)
+    location_names = {loc_id: name for name, loc_id in locations.items() if loc_id is not None}
+
+    st.markdown("---")
+    b1, b2 = st.columns(2)
+    with b1:
+        st.subheader("🏆 Top Products")
+        top = cube.top_products(10)
+        if top.empty:
+            st.info("No line items in this period.")
+        else:
+            st.bar_chart(top.set_index("product_name")["revenue"], horizontal=True)
+            st.dataframe(
+                top.rename(columns={"sku": "SKU", "product_name": "Item", "qty": "Qty", "revenue": "Revenue"}),
+                use_container_width=True,
+                hide_index=True,
+            )
+        pending = mirror.pending_lines(start_date, end_date)
+        if pending:
+            st.caption(f"Line items of {pending:,} sales are still syncing.")
+    with b2:
+        st.subheader("📍 Revenue by Location")
+        by_loc = cube.by_location()
+        if by_loc.empty:
+            st.info("No sales in this period.")
+        else:
+            by_loc["location"] = by_loc["location_id"].map(
+                lambda x: location_names.get(x) or (f"Location {int(x)}" if pd.notna(x) else "Unknown")
+            )
+            st.bar_chart(by_loc.set_index("location")["revenue"])
+
+    b3, b4 = st.columns(2)
+    with b3:
+        st.subheader("💳 Payment Mix")
+        mix = cube.payment_mix()
+        if mix.empty:
+            st.info("No sales in this period.")
+        else:
+            st.altair_chart(
+                alt.Chart(mix)
+                .mark_arc(innerRadius=50)
+                .encode(
+                    theta="revenue:Q",
+                    color=alt.Color("payment_method:N", title="Method"),
+                    tooltip=["payment_method", "sales", alt.Tooltip("revenue:Q", format=",.2f"), alt.Tooltip("share:Q", format=".0%")],
+                ),
+                use_container_width=True,
+            )
+    with b4:
+        st.subheader("🕒 Sales by Hour and Weekday")
+        grid = cube.heatmap().rename_axis("weekday").reset_index().melt("weekday", var_name="hour", value_name="revenue")
+        st.altair_chart(
+            alt.Chart(grid)
+            .mark_rect()
+            .encode(
+                x=alt.X("hour:O", title="Hour"),
+                y=alt.Y("weekday:O", sort=list(cube.heatmap().index), title=None),
+                color=alt.Color("revenue:Q", title="Revenue"),
+                tooltip=["weekday", "hour", alt.Tooltip("revenue:Q", format=",.2f")],
+            ),
+            use_container_width=True,
+        )
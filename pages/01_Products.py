@@ -1,15 +1,15 @@
 # app/pages/01_Products.py
 
-import os
-import requests
 import pandas as pd
 import streamlit as st
 
+from api_client import api_request
 from auth import require_login
+from cache import invalidate
+from catalog import get_catalog
+from catalog_frame import get_catalog_frame
 require_login()
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
-
 st.set_page_config(page_title="Products – Marvenixx POS", layout="wide")
 st.title("Products")
 
@@ -75,10 +75,10 @@ with st.form("create_product"):
             st.error("Name is required.")
         else:
             try:
-                r = requests.post(f"{API_BASE}/products", json=payload, timeout=15)
+                r = api_request("POST", "/products", json=payload, timeout=15)
                 if r.status_code == 200:
                     st.success("Product created.")
-                    st.cache_data.clear()
+                    invalidate("products")
                     st.rerun()
                 else:
                     st.error(f"Error: {r.status_code} – {r.text}")
@@ -93,14 +93,13 @@ st.subheader("All products")
 
 items = []
 try:
-    resp = requests.get(f"{API_BASE}/products", timeout=15)
-    resp.raise_for_status()
-    items = resp.json()
+    version, items = get_catalog().products_snapshot()
 except Exception as e:
     st.error(f"Error fetching products: {e}")
 
 if items:
-    df_full = pd.DataFrame(items)
+    frame = get_catalog_frame("products", version, items)
+    df_full = frame.df
 
     # Display-friendly subset
     display_cols = [c for c in ["id", "sku", "name", "unit", "selling_price", "tax_rate"] if c in df_full.columns]
@@ -134,10 +133,11 @@ if not df_full.empty:
         df_full = df_full.sort_values("id")
 
         # Build labels like "3 – Frozen Chicken (CHICK0001)"
-        choices = [
-            f"{row['id']} – {row['name']} ({row['sku']})"
-            for _, row in df_full.iterrows()
-        ]
+        def build_choices(f):
+            d = f.df.sort_values("id")
+            return (d["id"].astype(str) + " – " + d["name"] + " (" + d["sku"] + ")").tolist()
+
+        choices = frame.memo("admin_choices", build_choices)
         selected_label = st.selectbox("Choose product", choices, key="admin_product_select")
 
         # Extract chosen id
@@ -215,10 +215,10 @@ if not df_full.empty:
                     "selling_price": float(new_price),
                 }
                 try:
-                    r = requests.patch(f"{API_BASE}/products/{selected_id}", json=payload, timeout=15)
+                    r = api_request("PATCH", f"/products/{selected_id}", json=payload, timeout=15)
                     if r.status_code == 200:
                         st.success("Product updated.")
-                        st.cache_data.clear()
+                        invalidate("products")
                         st.rerun()
                     else:
                         st.error(f"Error from API: {r.status_code} – {r.text}")
@@ -227,10 +227,10 @@ if not df_full.empty:
 
             if deactivate_clicked:
                 try:
-                    r = requests.delete(f"{API_BASE}/products/{selected_id}", timeout=15)
+                    r = api_request("DELETE", f"/products/{selected_id}", timeout=15)
                     if r.status_code == 200:
                         st.success("Product deactivated. It will no longer appear in POS / Receive Stock.")
-                        st.cache_data.clear()
+                        invalidate("products")
                         st.rerun()
                     else:
                         st.error(f"Error from API: {r.status_code} – {r.text}")
@@ -1,31 +1,25 @@
-import os
 from datetime import date
 
 import pandas as pd
-import requests
 import streamlit as st
 
+from api_client import api_get, api_post
 from auth import require_login
+from cache import cached, invalidate
+from catalog import get_catalog
 require_login()
 
 st.set_page_config(page_title="Receive Stock (GRN) – Marvenixx POS", layout="wide")
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
-
 st.title("Receive Stock (GRN)")
 
 # -------------- Helpers to load products & locations -------------- #
-@st.cache_data(ttl=60)
 def load_products():
-    r = requests.get(f"{API_BASE}/products", timeout=10)
-    r.raise_for_status()
-    return r.json()
+    return get_catalog().products()
 
-@st.cache_data(ttl=60)
+@cached(ttl=60, tags=("locations",))
 def load_locations():
-    r = requests.get(f"{API_BASE}/locations", timeout=10)
-    r.raise_for_status()
-    return r.json()
+    return api_get("/locations", timeout=10)
 
 
 # -------------- Load reference data -------------- #
@@ -162,8 +156,8 @@ if st.button("📥 Post GRN (Receive Stock)", type="primary"):
             "lines": clean_lines,
         }
         try:
-            r = requests.post(f"{API_BASE}/receipts", json=payload, timeout=15)
-            r.raise_for_status()
-            st.success(f"GRN posted successfully: {r.json()}")
+            res = api_post("/receipts", payload, timeout=15)
+            invalidate(*{f"stock:{ln['to_location_id']}" for ln in clean_lines})
+            st.success(f"GRN posted successfully: {res}")
         except Exception as e:
             st.error(f"Error sending GRN to API: {e}")
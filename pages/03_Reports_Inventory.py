@@ -1,18 +1,14 @@
 import streamlit as st
-import requests
-import os
 import pandas as pd
 
+from api_client import api_get
 from auth import require_login
 require_login()
 
 st.title("Reports — Inventory On Hand")
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
-
 try:
-    r = requests.get(f"{API_BASE}/reports/inventory")
-    data = r.json().get("items", [])
+    data = api_get("/reports/inventory").get("items", [])
     if data:
         df = pd.DataFrame(data)
         st.dataframe(df)
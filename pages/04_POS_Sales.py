@@ -1,19 +1,38 @@
 # app/pages/04_POS_Sales.py
+import math
 import os
-from datetime import datetime
 
 import pandas as pd
 import requests
 import streamlit as st
 
+import escpos
+from api_client import API_BASE, api_get, api_post_idempotent, inflight_key, release_key
 from auth import require_login
+from cache import get_cache, invalidate
+from cart import Cart, InsufficientStock, clamp_to_step, get_step_for_unit
+from catalog import get_catalog
+from catalog_frame import CatalogFrame, get_catalog_frame
+from documents import DOC_TYPES, load_company, render_document, with_auto_print
+from health import get_health_monitor
+from journal import get_journal
+from prefetch import prefetch
+from sale_docs import SaleDocs, document_from_checkout
+from search_index import get_search_index
+from spooler import get_spooler
 
 require_login()
 st.set_page_config(page_title="POS – Marvenixx POS", layout="wide")
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
-
-DEFAULT_STEP = 0.5
+# Product grid: only one page of tiles is rendered per rerun
+TILE_PAGE_SIZES = [12, 24, 48, 96]
+DEFAULT_TILE_PAGE_SIZE = int(os.getenv("POS_TILE_PAGE_SIZE", "24"))
+# sale POSTs are keyed and retried, so they can fail fast instead of hanging the till
+SALE_TIMEOUT = (3.05, float(os.getenv("POS_SALE_TIMEOUT", "8")))
+# the longest a checkout waits on the API, retries included, before journaling the sale
+SALE_DEADLINE = float(os.getenv("POS_SALE_DEADLINE", "12"))
+# with a thermal printer configured, every checkout queues its receipt
+AUTO_PRINT_RECEIPT = os.getenv("POS_AUTO_PRINT_RECEIPT", "1") == "1"
 
 # -------------------- Styling (compact UI + printing) --------------------
 st.markdown(
@@ -51,14 +70,6 @@ st.markdown(
 )
 
 # -------------------- Helpers --------------------
-def api_get(path: str, params=None):
-    r = requests.get(f"{API_BASE}{path}", params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
-
-def api_post(path: str, payload: dict):
-    return requests.post(f"{API_BASE}{path}", json=payload, timeout=25)
-
 def money(x) -> str:
     try:
         return f"₵ {float(x):,.2f}"
@@ -71,273 +82,56 @@ def safe_float(x, default=None):
     except Exception:
         return default
 
-def get_step_for_unit(unit: str) -> float:
-    u = (unit or "").strip().lower()
-    if u in ["kg", "g", "gram", "grams", "l", "litre", "liter", "ml"]:
-        return 0.1
-    if u in ["piece", "pcs", "box", "bag", "bottle", "sachet", "tin", "gallon"]:
-        return 0.5  # business default
-    return DEFAULT_STEP
-
-def clamp_to_step(x: float, step: float) -> float:
-    if step <= 0:
-        return float(x)
-    return round(float(x) / step) * step
-
-@st.cache_data(ttl=60)
-def load_company():
-    try:
-        r = requests.get(f"{API_BASE}/settings/company", timeout=15)
-        r.raise_for_status()
-        data = r.json() or {}
-    except Exception:
-        data = {}
-
-    return {
-        "company_name": data.get("company_name", "Marvenixx POS (MXP)"),
-        "address": data.get("address", ""),
-        "phone": data.get("phone", ""),
-        "website": data.get("website", ""),
-        "footer": data.get("footer", "Thank you for your business."),
-        "logo_base64": data.get("logo_base64", "") or "",
-        "currency_symbol": data.get("currency_symbol", "₵"),
-    }
-
-def parse_sale_response(data):
-    sale = None
-    lines = []
-    if isinstance(data, dict) and "sale" in data:
-        sale = data.get("sale") or {}
-        lines = data.get("lines") or []
-    elif isinstance(data, dict):
-        sale = data
-        lines = data.get("lines") or []
-    if not isinstance(lines, list):
-        lines = []
-    return sale, lines
-
-def build_print_html(
-    company,
-    doc_type,
-    sale_id,
-    created,
-    customer,
-    location_label,
-    lines,
-    total_amount,
-    receipt_no=None,
-    payment_method=None,
-    cash_received=None,
-    change_due=None,
-):
-    # rows
-    rows_html = ""
-    if doc_type == "Waybill":
-        for ln in lines:
-            item = ln.get("product_name") or ln.get("name") or ln.get("item") or ""
-            qty = safe_float(ln.get("qty", 0), 0.0)
-            rows_html += f"""
-              <tr>
-                <td style="padding:6px 0;border-bottom:1px solid #eee;">{item}</td>
-                <td style="padding:6px 0;border-bottom:1px solid #eee;text-align:right;">{qty:.2f}</td>
-              </tr>
-            """
-        header_cols = """
-          <tr>
-            <th style="text-align:left;border-bottom:2px solid #111;padding-bottom:6px;">Item</th>
-            <th style="text-align:right;border-bottom:2px solid #111;padding-bottom:6px;">Qty</th>
-          </tr>
-        """
-    else:
-        for ln in lines:
-            item = ln.get("product_name") or ln.get("name") or ln.get("item") or ""
-            qty = safe_float(ln.get("qty", 0), 0.0)
-            unit_price = safe_float(ln.get("unit_price", 0), 0.0)
-            line_total = safe_float(ln.get("line_total", qty * unit_price), qty * unit_price)
-            rows_html += f"""
-              <tr>
-                <td style="padding:6px 0;border-bottom:1px solid #eee;">{item}</td>
-                <td style="padding:6px 0;border-bottom:1px solid #eee;text-align:right;">{qty:.2f}</td>
-                <td style="padding:6px 0;border-bottom:1px solid #eee;text-align:right;">{money(unit_price)}</td>
-                <td style="padding:6px 0;border-bottom:1px solid #eee;text-align:right;">{money(line_total)}</td>
-              </tr>
-            """
-        header_cols = """
-          <tr>
-            <th style="text-align:left;border-bottom:2px solid #111;padding-bottom:6px;">Item</th>
-            <th style="text-align:right;border-bottom:2px solid #111;padding-bottom:6px;">Qty</th>
-            <th style="text-align:right;border-bottom:2px solid #111;padding-bottom:6px;">Price</th>
-            <th style="text-align:right;border-bottom:2px solid #111;padding-bottom:6px;">Total</th>
-          </tr>
-        """
-
-    logo_html = ""
-    if company.get("logo_base64"):
-        logo_html = f"""<img src="data:image/png;base64,{company['logo_base64']}" style="height:60px;object-fit:contain;" />"""
-
-    proforma_note = ""
-    if doc_type == "Proforma":
-        proforma_note = """
-          <div style="text-align:center;color:#6b7280;font-size:11px;margin-top:4px;">
-            This is a Proforma document (not a tax invoice).
-          </div>
-        """
-
-    address = company.get("address", "").strip()
-    phone = company.get("phone", "").strip()
-    website = company.get("website", "").strip()
-
-    contact_lines = ""
-    if address:
-        contact_lines += f"<div style='font-size:11px;color:#111;'>{address}</div>"
-    if phone or website:
-        contact_lines += f"<div style='font-size:11px;color:#111;'>{phone}{' • ' if phone and website else ''}{website}</div>"
-
-    created_txt = str(created)[:19].replace("T", " ") if created else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    total_html = ""
-    if doc_type != "Waybill":
-        total_html = f"""
-          <hr style="margin:10px 0;" />
-          <div style="text-align:right;font-weight:900;font-size:14px;">
-            TOTAL: {money(total_amount)}
-          </div>
-        """
-
-    pay_html = ""
-    if payment_method and doc_type != "Waybill":
-        pay_html += f"<div style='margin-top:8px;font-size:12px;'><b>Payment:</b> {payment_method}</div>"
-    if cash_received is not None and doc_type != "Waybill":
-        pay_html += f"<div style='font-size:12px;'><b>Cash Received:</b> {money(cash_received)}</div>"
-    if change_due is not None and doc_type != "Waybill":
-        pay_html += f"<div style='font-size:12px;'><b>Change:</b> {money(change_due)}</div>"
-
-    footer = company.get("footer", "").strip() or "Thank you for your business."
-    rn = receipt_no or ""
-
-    html = f"""
-    <!doctype html>
-    <html>
-    <head>
-      <meta charset="utf-8"/>
-      <style>
-        body {{
-          font-family: Arial, sans-serif;
-          font-size: 12px;
-          color: #111;
-          margin: 0;
-          padding: 0;
-          background: #fff;
-        }}
-        .wrap {{
-          width: 80mm;
-          max-width: 80mm;
-          margin: 0 auto;
-          padding: 10px;
-          background: #fff;
-          border: 1px solid #e5e7eb;
-          border-radius: 8px;
-        }}
-        table {{
-          width: 100%;
-          border-collapse: collapse;
-          font-size: 11px;
-        }}
-        th, td {{ padding: 4px 0; }}
-        button {{
-          border: 1px solid #111;
-          background: #111;
-          color: #fff;
-          padding: 6px 10px;
-          border-radius: 6px;
-          cursor: pointer;
-          font-weight: 700;
-          font-size: 11px;
-        }}
-        .muted {{ color:#6b7280; }}
-        @media print {{
-          body {{ margin: 0; }}
-          .no-print {{display:none !important; }}
-          @page {{ size: auto; margin: 5mm; }}
-        }}
-      </style>
-    </head>
-    <body>
-      <div class="wrap">
-        <div style="display:flex;gap:12px;align-items:flex-start;">
-          <div>{logo_html}</div>
-          <div style="flex:1;">
-            <div style="font-weight:900;font-size:16px;line-height:1.1;">{company.get('company_name','')}</div>
-            {contact_lines}
-            <div class="muted" style="font-size:12px;margin-top:6px;font-weight:800;">{doc_type}</div>
-            {proforma_note}
-            {"<div class='muted' style='font-size:11px;margin-top:2px;'><b>Receipt No:</b> " + rn + "</div>" if rn else ""}
-          </div>
-        </div>
-
-        <hr style="margin:10px 0;" />
-
-        <div style="display:flex;justify-content:space-between;gap:10px;">
-          <div>
-            <div><b>Customer:</b> {customer}</div>
-            <div><b>Location:</b> {location_label}</div>
-          </div>
-          <div style="text-align:right;">
-            <div><b>Sale ID:</b> {sale_id}</div>
-            <div><b>Date:</b> {created_txt}</div>
-          </div>
-        </div>
-
-        <div style="margin-top:10px;">
-          <table>
-            {header_cols}
-            {rows_html if rows_html else "<tr><td colspan='4' style='padding:8px 0;'>No line items</td></tr>"}
-          </table>
-        </div>
-
-        {total_html}
-        {pay_html}
-
-        <div style="text-align:center;color:#6b7280;font-size:11px;margin-top:12px;">
-          {footer}
-        </div>
-
-        <div class="no-print" style="margin-top:12px;text-align:center;">
-          <button onclick="window.print()">🖨 Print</button>
-        </div>
-      </div>
-    </body>
-    </html>
-    """
-    return html
-
-
 # -------------------- Title + Top Controls --------------------
 st.markdown("## 🧾 Point of Sale")
 
-# API quick status (helps local debugging)
-api_ok = True
-try:
-    _ = requests.get(f"{API_BASE}/health", timeout=4)
-except Exception:
-    api_ok = False
+# API quick status comes from the background health monitor (no round trip here).
+# When the circuit is open the till keeps selling from the cached catalog and
+# checkouts go to the local journal until the API is back.
+health = get_health_monitor()
+api_ok = health.is_available()
+journal = get_journal()
 
 if not api_ok:
-    st.error(
-        f"API not reachable at API_BASE={API_BASE}\n\n"
-        "For local testing set:\n"
-        "- PowerShell: $env:API_BASE='http://127.0.0.1:8000'\n"
-        "- CMD: set API_BASE=http://127.0.0.1:8000\n"
-        "and ensure FastAPI is running on port 8000."
+    st.warning(
+        f"Offline: API not reachable at API_BASE={API_BASE} ({health.last_error or 'no response'}). "
+        "Sales are saved on this till with provisional receipt numbers and sync automatically."
     )
-    st.stop()
+unsynced = journal.pending_count()
+if unsynced:
+    st.caption(f"⏳ {unsynced} offline sale(s) waiting to sync — see Offline Sales.")
+
+# -------------------- Prefetch (parallel startup calls) --------------------
+# These calls are independent, so they run together and the page waits for the
+# slowest one (bounded by its deadline) instead of their sum. What the shared
+# catalog already holds is read inline and never waits for a pool worker. Stock is
+# loaded for the location chosen on the previous run; a location switch loads below.
+catalog = get_catalog()
+guess_loc_id = st.session_state.get("pos_location_id")
+if not isinstance(st.session_state.get("sale_docs"), SaleDocs):
+    st.session_state["sale_docs"] = SaleDocs()
+prefetch_sale_id = st.session_state.get("last_sale_id")
+
+startup_tasks = {
+    "locations": catalog.locations,
+    "company": load_company,
+    # search / scan index; loaded now so it is in memory if the API drops later
+    "catalog": catalog.products,
+}
+in_memory = {"locations": catalog.peek_locations, "catalog": catalog.peek_products}
+if guess_loc_id:
+    startup_tasks["products"] = lambda: catalog.stock_snapshot(int(guess_loc_id))
+    in_memory["products"] = lambda: catalog.peek_stock(int(guess_loc_id))
+if api_ok and prefetch_sale_id and prefetch_sale_id > 0 and prefetch_sale_id not in st.session_state["sale_docs"]:
+    startup_tasks["last_sale"] = lambda: api_get(f"/sales/{int(prefetch_sale_id)}")
+
+pre = prefetch(startup_tasks, deadline=10, ready=in_memory)
 
 # Load locations
-try:
-    locs = api_get("/locations")
-except Exception as e:
-    st.error(f"Could not load locations: {e}")
+if not pre["locations"].ok:
+    st.error(f"Could not load locations: {pre['locations'].error}")
     st.stop()
+locs = pre["locations"].value
 
 if not locs:
     st.warning("No locations found. Create locations first in the backend.")
@@ -350,53 +144,39 @@ top_a, top_b = st.columns([2, 1])
 with top_a:
     location_label = st.selectbox("Sell from location", loc_labels, key="pos_location")
     location_id = loc_map[location_label]
-with top_b:
-    doc_type = st.selectbox("Print document", ["Receipt", "Proforma", "Waybill"], key="pos_doc_type")
-
-# Load products
-@st.cache_data(ttl=10)
-def load_products_with_stock(location_id: int):
-    try:
-        data = api_get("/products/with_stock", params={"location_id": location_id})
-        if isinstance(data, list):
-            return data
-    except Exception:
-        pass
 
-    data = api_get("/products")
-    if isinstance(data, list):
-        for p in data:
-            p["available_qty"] = None
-        return data
-    return []
-
-products = load_products_with_stock(location_id)
-df = pd.DataFrame(products)
+# Load products: the prefetch above already read the previously selected location
+st.session_state["pos_location_id"] = location_id
+stock = pre.get("products") if guess_loc_id and int(guess_loc_id) == location_id else None
+if stock is None:
+    stock = prefetch(
+        {"products": lambda: catalog.stock_snapshot(location_id)},
+        deadline=10,
+        ready={"products": lambda: catalog.peek_stock(location_id)},
+    )["products"]
+if stock.ok:
+    stock_version, products = stock.value
+else:
+    # slow or failing API: sell from the last snapshot instead of fetching again inline
+    last = catalog.peek_stock(location_id, max_age=None)
+    if last is None:
+        st.error(f"Could not load products: {stock.error}")
+        st.stop()
+    st.caption(f"Stock may be out of date ({stock.error}).")
+    stock_version, products = last
+
+# Normalized frame + SKU lookups, built once per stock version and shared by all tills.
+# `stock_map` answers oversell checks during typed qty / scans.
+stock_map = get_catalog_frame(f"stock:{location_id}", stock_version, products)
+df = stock_map.df
 
 if df.empty:
     st.warning("No products found yet. Create products first (Products page).")
     st.stop()
 
-for col in ["sku", "name", "unit", "selling_price", "available_qty"]:
-    if col not in df.columns:
-        df[col] = None
-
-# Oversell checks during typed qty
-stock_map = {}
-for _, r in df.iterrows():
-    sku = str(r.get("sku") or "").strip()
-    if not sku:
-        continue
-    stock_map[sku] = {
-        "available_qty": safe_float(r.get("available_qty"), None),
-        "unit": str(r.get("unit") or ""),
-        "name": str(r.get("name") or ""),
-        "selling_price": safe_float(r.get("selling_price"), 0.0),
-    }
-
 # -------------------- Cart State --------------------
-if "cart" not in st.session_state:
-    st.session_state["cart"] = []
+if not isinstance(st.session_state.get("cart"), Cart):
+    st.session_state["cart"] = Cart()
 if "last_sale_id" not in st.session_state:
     st.session_state["last_sale_id"] = None
 if "print_now" not in st.session_state:
@@ -416,318 +196,454 @@ if "last_cash_received" not in st.session_state:
 if "last_receipt_no" not in st.session_state:
     st.session_state["last_receipt_no"] = None
 
-def cart_find(sku: str):
-    return next((x for x in st.session_state.get("cart", []) if x["sku"] == sku), None)
-
 def cart_set_qty(sku: str, qty: float):
-    cart = st.session_state.get("cart", [])
-    line = cart_find(sku)
+    cart = st.session_state["cart"]
+    line = cart.get(sku)
     if not line:
         return
 
-    unit = line.get("unit", "")
-    step = get_step_for_unit(unit)
-    new_qty = clamp_to_step(max(0.0, float(qty)), step)
-
     avail_f = stock_map.get(sku, {}).get("available_qty", None)
-    if avail_f is not None and new_qty > avail_f:
-        st.warning(f"Not enough stock for {line.get('name','')} — Available: {avail_f:.2f} {unit}")
-        new_qty = avail_f
-
-    if new_qty <= 0:
-        st.session_state["cart"] = [x for x in cart if x["sku"] != sku]
-    else:
-        line["qty"] = float(new_qty)
-        st.session_state["cart"] = cart
+    if avail_f is not None and clamp_to_step(max(0.0, float(qty)), line.step) > avail_f:
+        st.warning(f"Not enough stock for {line.name} — Available: {avail_f:.2f} {line.unit}")
+    cart.set_qty(sku, qty, available=avail_f)
 
 def cart_remove(sku: str):
-    st.session_state["cart"] = [x for x in st.session_state.get("cart", []) if x["sku"] != sku]
+    st.session_state["cart"].remove(sku)
 
-def cart_add_qty(sku: str, name: str, unit: str, unit_price: float, available_qty, qty_to_add: float):
-    if not sku:
+def cart_add_qty(sku: str, name: str, unit: str, unit_price: float, available_qty, qty_to_add: float) -> bool:
+    try:
+        line = st.session_state["cart"].add(
+            sku,
+            name,
+            unit,
+            unit_price,
+            qty_to_add,
+            available=safe_float(available_qty, None),
+            tax_rate=stock_map.get(sku, {}).get("tax_rate", 0.0),
+        )
+    except InsufficientStock as e:
+        st.warning(f"Not enough stock. Available: {e.available:.2f} {unit}")
+        return False
+    return line is not None
+
+# -------------------- Barcode scan --------------------
+def parse_scan(raw: str):
+    # "3*6001234567890" -> (3.0, "6001234567890"); plain code -> (1.0, code)
+    raw = (raw or "").strip()
+    if "*" not in raw:
+        return 1.0, raw
+    qty_txt, _, code = raw.partition("*")
+    return safe_float(qty_txt.strip(), None), code.strip()
+
+def on_scan(stock_map: CatalogFrame):
+    # Runs as the input's on_change callback: a wedge scanner types the code + Enter,
+    # the line goes straight into the cart and the box is cleared for the next item.
+    raw = st.session_state.get("pos_scan", "")
+    st.session_state["pos_scan"] = ""
+    qty, code = parse_scan(raw)
+    if not code:
         return
-
-    step = get_step_for_unit(unit)
-    qty_to_add = clamp_to_step(max(0.0, float(qty_to_add)), step)
-    if qty_to_add <= 0:
+    if qty is None or qty <= 0:
+        st.session_state["pos_scan_msg"] = ("error", f"Bad quantity in '{raw}'. Use e.g. 3*{code}")
         return
 
-    cart = st.session_state.get("cart", [])
-    existing = next((x for x in cart if x["sku"] == sku), None)
-    already = safe_float(existing["qty"], 0.0) if existing else 0.0
-
-    avail_f = safe_float(available_qty, None)
-    if avail_f is not None and already + qty_to_add > avail_f:
-        st.warning(f"Not enough stock. Available: {avail_f:.2f} {unit}")
+    sku = get_search_index(*get_catalog().products_snapshot()).lookup(code)
+    if sku is None and code in stock_map:
+        sku = code
+    info = stock_map.get(sku) if sku else None
+    if info is None:
+        st.session_state["pos_scan_msg"] = ("error", f"No product with barcode / SKU '{code}'")
         return
 
-    if existing:
-        existing["qty"] = clamp_to_step(already + qty_to_add, step)
+    added = cart_add_qty(
+        sku=sku,
+        name=info["name"],
+        unit=info["unit"],
+        unit_price=float(info["selling_price"] or 0.0),
+        available_qty=info["available_qty"],
+        qty_to_add=float(qty),
+    )
+    if added:
+        st.session_state["pos_scan_msg"] = ("success", f"Added {qty:g} × {info['name']}")
     else:
-        cart.append({"sku": sku, "name": name, "unit": unit, "qty": qty_to_add, "unit_price": float(unit_price)})
+        st.session_state["pos_scan_msg"] = ("warning", f"Could not add {info['name']} (check stock / qty)")
 
-    st.session_state["cart"] = cart
 
+# -------------------- Widget callbacks --------------------
+# Callbacks update the cart before the owning fragment re-executes, so edits need
+# no explicit st.rerun() and only that fragment is rebuilt.
+def on_qty_change(sku: str):
+    cart_set_qty(sku, float(st.session_state.get(f"qty_input_{sku}") or 0.0))
 
-# -------------------- Layout --------------------
-left, right = st.columns([1.15, 1.85], gap="large")
+def on_clear_cart():
+    st.session_state["cart"].clear()
+    st.session_state["pending_method"] = None
+    st.session_state["cash_received"] = None
 
-# ================= LEFT: CART =================
-with left:
+def on_pay_method(method: str):
+    st.session_state["pending_method"] = method
+    if method == "CASH":
+        st.session_state["cash_received"] = None
+
+def on_print_now():
+    st.session_state["print_now"] = True
+
+def on_clear_last_sale():
+    st.session_state["last_sale_id"] = None
+    st.session_state["print_now"] = False
+    st.session_state["last_receipt_no"] = None
+    st.session_state["last_payment_method"] = None
+    st.session_state["last_cash_received"] = None
+    st.session_state["last_change_due"] = None
+
+
+# -------------------- Checkout --------------------
+def submit_sale(payload: dict, total: float):
+    """POST /sales, or journal the sale when the API is down; returns (data, error).
+
+    Offline sales come back with sale_id = -journal id and a provisional receipt number.
+    """
+    # the same cart keeps its key until the sale is settled, so a rerun / double
+    # click mid-request gets the original sale back instead of a second one
+    key = inflight_key("/sales", payload)
+    if health.is_available():
+        try:
+            r = api_post_idempotent("/sales", payload, key, timeout=SALE_TIMEOUT, deadline=SALE_DEADLINE)
+        except requests.RequestException as e:
+            health.record_failure(str(e))
+        else:
+            if r.status_code == 200:
+                release_key(key)
+                return r.json() or {}, None
+            if r.status_code < 500:
+                release_key(key)
+                return None, f"Error: {r.status_code} – {r.text}"
+            health.record_failure(f"HTTP {r.status_code}")
+
+    # same key as the live attempts: if one of them did reach the API, the replay is a no-op
+    entry = journal.append(payload, total, key)
+    release_key(key)
+    data = {"sale_id": -entry.id, "id": entry.provisional_no, "receipt_no": entry.provisional_no, "total": total, "offline": True}
+    return data, None
+
+def remember_sale(sale_id: int, data: dict, payload: dict):
+    docs: SaleDocs = st.session_state["sale_docs"]
+    docs.put(sale_id, *document_from_checkout(data, payload, st.session_state["cart"]))
+    if sale_id < 0:
+        journal.set_document(-sale_id, *docs.get(sale_id))
+
+def sale_done_message(sale_id: int, data: dict, total: float) -> str:
+    if data.get("offline"):
+        return f"Saved offline as {data['receipt_no']}. Total {money(total)} — it will sync when the API is back."
+    return f"Sale #{sale_id} recorded. Total {money(data.get('total', total))}"
+
+def checkout(method: str, total: float, customer_name: str, cash_received=None):
+    """validate -> payload -> post (or journal) -> local stock update; returns an error or None.
+
+    The only network cost is the POST itself: sold quantities come off the cached
+    stock in memory and the background refresh reconciles with the server.
+    """
+    cart: Cart = st.session_state["cart"]
+    if not cart:
+        return "Cart is empty."
+    if cash_received is not None and cash_received < total:
+        return "Cash received is less than Total. Increase cash received."
+
+    payload = {
+        "customer_name": (customer_name or None),
+        "location_id": int(location_id),
+        "payment_method": method,
+        "lines": cart.payload_lines(),
+    }
+    data, error = submit_sale(payload, total)
+    if data is None:
+        return error
+
+    sale_id = int(data.get("sale_id") or data.get("id") or 0)
+    remember_sale(sale_id, data, payload)
+    # offline sales force a full resync later; online ones are echoed by the next delta
+    get_catalog().adjust_stock(location_id, {ln.sku: -float(ln.qty) for ln in cart}, resync=bool(data.get("offline")))
+    if not data.get("offline"):
+        invalidate("sales")
+
+    st.session_state["last_sale_id"] = sale_id
+    st.session_state["last_payment_method"] = method
+    st.session_state["last_cash_received"] = cash_received
+    st.session_state["last_change_due"] = None if cash_received is None else float(cash_received) - float(total)
+    st.session_state["last_receipt_no"] = data.get("receipt_no")
+    if escpos.is_configured() and AUTO_PRINT_RECEIPT:
+        queue_thermal(sale_id)
+
+    cart.clear()
+    st.session_state["pending_method"] = None
+    st.session_state["print_now"] = False
+    st.session_state["pos_sale_msg"] = sale_done_message(sale_id, data, total)
+    return None
+
+def load_sale_document(sale_id: int):
+    # offline sales (negative ids) live in the journal until they sync
+    if sale_id < 0:
+        return journal.document(-sale_id)
+    return api_get(f"/sales/{int(sale_id)}")
+
+
+# ================= CART (fragment) =================
+@st.fragment
+def render_cart():
     st.markdown("### 🛒 Current Sale")
-    customer_name = st.text_input("Customer (optional)", key="pos_customer")
+    st.text_input("Customer (optional)", key="pos_customer")
+
+    st.text_input(
+        "Scan barcode / SKU (qty prefix: 3*code)",
+        key="pos_scan",
+        on_change=on_scan,
+        args=(stock_map,),
+        placeholder="Scan or type code, then Enter",
+    )
+    scan_msg = st.session_state.pop("pos_scan_msg", None)
+    if scan_msg:
+        getattr(st, scan_msg[0])(scan_msg[1])
+    sale_msg = st.session_state.pop("pos_sale_msg", None)
+    if sale_msg:
+        st.success(sale_msg)
 
     cart = st.session_state["cart"]
     if not cart:
         st.info("Cart is empty. Add products on the right.")
-    else:
-        total = 0.0
+        return
 
-        # ✅ BIG ➖/➕ REMOVED: only typed qty + delete
-        for line in list(cart):
-            sku = str(line["sku"])
-            unit = str(line.get("unit") or "")
-            step = get_step_for_unit(unit)
+    # ✅ BIG ➖/➕ REMOVED: only typed qty + delete
+    for line in cart:
+        sku = line.sku
+        unit = line.unit
+
+        st.markdown(
+            f"""
+            <div class="mxp-card">
+              <div class="mxp-name">{line.name}</div>
+              <div class="mxp-meta">{unit} • SKU: {sku}</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
 
-            qty = safe_float(line.get("qty"), 0.0)
-            price = safe_float(line.get("unit_price"), 0.0)
+        c2, c4 = st.columns([2.2, 0.8], gap="small")
 
-            st.markdown(
-                f"""
-                <div class="mxp-card">
-                  <div class="mxp-name">{line['name']}</div>
-                  <div class="mxp-meta">{unit} • SKU: {sku}</div>
-                </div>
-                """,
-                unsafe_allow_html=True,
+        with c2:
+            # the cart is the source of truth (scans / adds / clamping change it)
+            st.session_state[f"qty_input_{sku}"] = float(line.qty)
+            st.number_input(
+                "Qty",
+                min_value=0.0,
+                step=float(line.step),
+                format="%.3f",
+                key=f"qty_input_{sku}",
+                label_visibility="collapsed",
+                on_change=on_qty_change,
+                args=(sku,),
             )
 
-            c2, c4 = st.columns([2.2, 0.8], gap="small")
-
-            with c2:
-                typed_qty = st.number_input(
-                    "Qty",
-                    min_value=0.0,
-                    value=float(qty),
-                    step=float(step),
-                    format="%.3f",
-                    key=f"qty_input_{sku}",
-                    label_visibility="collapsed",
-                )
-                if float(typed_qty) != float(qty):
-                    cart_set_qty(sku, float(typed_qty))
-                    st.rerun()
-
-            if c4.button("🗑", key=f"rm_{sku}", use_container_width=True):
-                cart_remove(sku)
-                st.rerun()
-
-            line_now = cart_find(sku)
-            if line_now:
-                qty_now = safe_float(line_now.get("qty"), 0.0)
-                price_now = safe_float(line_now.get("unit_price"), 0.0)
-                line_total = qty_now * price_now
-                total += line_total
-                st.caption(f"{money(price_now)} each • Line: {money(line_total)}")
+        c4.button("🗑", key=f"rm_{sku}", use_container_width=True, on_click=cart_remove, args=(sku,))
 
-        st.markdown(f"### Total: {money(total)}")
+        st.caption(f"{money(line.unit_price)} each • Line: {money(line.line_total)}")
 
-        p1, p2, p3, p4 = st.columns(4)
-        pay_cash = p1.button("💵 Cash", use_container_width=True)
-        pay_card = p2.button("💳 Card", use_container_width=True)
-        pay_momo = p3.button("📱 MoMo", use_container_width=True)
+    total = float(cart.total)
+    st.markdown(f"### Total: {money(total)}")
+    if cart.tax_total:
+        st.caption(f"Includes tax: {money(cart.tax_total)}")
+    st.button("🗑 Clear All", use_container_width=True, on_click=on_clear_cart)
 
-        if p4.button("🗑 Clear All", use_container_width=True):
-            st.session_state["cart"] = []
-            st.session_state["pending_method"] = None
-            st.session_state["cash_received"] = None
-            st.rerun()
+    render_payment(total)
 
-        # ---- Cash & Change flow ----
-        if pay_cash:
-            st.session_state["pending_method"] = "CASH"
-            st.session_state["cash_received"] = None
 
-        if pay_card:
-            st.session_state["pending_method"] = "CARD"
+# ================= PAYMENT (fragment) =================
+@st.fragment
+def render_payment(total: float):
+    p1, p2, p3 = st.columns(3)
+    p1.button("💵 Cash", use_container_width=True, on_click=on_pay_method, args=("CASH",))
+    p2.button("💳 Card", use_container_width=True, on_click=on_pay_method, args=("CARD",))
+    p3.button("📱 MoMo", use_container_width=True, on_click=on_pay_method, args=("MOMO",))
 
-        if pay_momo:
-            st.session_state["pending_method"] = "MOMO"
+    customer_name = st.session_state.get("pos_customer") or ""
+    pending = st.session_state.get("pending_method")
 
-        pending = st.session_state.get("pending_method")
+    # ---- Cash & Change flow ----
+    if pending == "CASH":
+        st.markdown("#### 💵 Cash Payment")
+        cash_received = st.number_input(
+            "Cash Received",
+            min_value=0.0,
+            value=float(st.session_state.get("cash_received") or total),
+            step=1.0,
+            format="%.2f",
+            key="cash_received_input",
+        )
+        st.session_state["cash_received"] = float(cash_received)
+        change_due = float(cash_received) - float(total)
+        st.info(f"Change: {money(change_due)}")
+
+        if st.button("✅ Confirm Cash Sale", use_container_width=True):
+            error = checkout("CASH", total, customer_name, cash_received=float(cash_received))
+            if error:
+                st.error(error)
+            else:
+                st.rerun()
 
-        if pending == "CASH":
-            st.markdown("#### 💵 Cash Payment")
-            cash_received = st.number_input(
-                "Cash Received",
-                min_value=0.0,
-                value=float(st.session_state.get("cash_received") or total),
-                step=1.0,
-                format="%.2f",
-                key="cash_received_input",
-            )
-            st.session_state["cash_received"] = float(cash_received)
-            change_due = float(cash_received) - float(total)
-            st.info(f"Change: {money(change_due)}")
-
-            confirm_cash = st.button("✅ Confirm Cash Sale", use_container_width=True)
-            if confirm_cash:
-                if cash_received < total:
-                    st.error("Cash received is less than Total. Increase cash received.")
-                else:
-                    # proceed checkout
-                    method = "CASH"
-                    payload = {
-                        "customer_name": (customer_name or None),
-                        "location_id": int(location_id),
-                        "payment_method": method,
-                        "lines": [
-                            {"sku": ln["sku"], "qty": float(ln["qty"]), "unit_price": float(ln["unit_price"])}
-                            for ln in st.session_state["cart"]
-                        ],
-                    }
-                    r = api_post("/sales", payload)
-                    if r.status_code == 200:
-                        data = r.json() or {}
-                        sale_id = int(data.get("sale_id") or data.get("id") or 0)
-
-                        st.session_state["last_sale_id"] = sale_id
-                        st.session_state["last_payment_method"] = method
-                        st.session_state["last_cash_received"] = float(cash_received)
-                        st.session_state["last_change_due"] = float(change_due)
-                        st.session_state["last_receipt_no"] = data.get("receipt_no")
-
-                        st.session_state["cart"] = []
-                        st.session_state["pending_method"] = None
-                        st.session_state["print_now"] = False
-
-                        st.success(f"Sale #{sale_id} recorded. Total {money(data.get('total', total))}")
-                        st.cache_data.clear()
-                        st.rerun()
-                    else:
-                        st.error(f"Error: {r.status_code} – {r.text}")
-
-        # Card/MoMo immediate checkout
-        if pending in ["CARD", "MOMO"]:
-            method = pending
-            confirm_non_cash = st.button(f"✅ Confirm {method} Sale", use_container_width=True)
-            if confirm_non_cash:
-                payload = {
-                    "customer_name": (customer_name or None),
-                    "location_id": int(location_id),
-                    "payment_method": method,
-                    "lines": [
-                        {"sku": ln["sku"], "qty": float(ln["qty"]), "unit_price": float(ln["unit_price"])}
-                        for ln in st.session_state["cart"]
-                    ],
-                }
-                r = api_post("/sales", payload)
-                if r.status_code == 200:
-                    data = r.json() or {}
-                    sale_id = int(data.get("sale_id") or data.get("id") or 0)
-
-                    st.session_state["last_sale_id"] = sale_id
-                    st.session_state["last_payment_method"] = method
-                    st.session_state["last_cash_received"] = None
-                    st.session_state["last_change_due"] = None
-                    st.session_state["last_receipt_no"] = data.get("receipt_no")
-
-                    st.session_state["cart"] = []
-                    st.session_state["pending_method"] = None
-                    st.session_state["print_now"] = False
-
-                    st.success(f"Sale #{sale_id} recorded. Total {money(data.get('total', total))}")
-                    st.cache_data.clear()
-                    st.rerun()
-                else:
-                    st.error(f"Error: {r.status_code} – {r.text}")
+    # Card/MoMo immediate checkout
+    if pending in ["CARD", "MOMO"]:
+        if st.button(f"✅ Confirm {pending} Sale", use_container_width=True):
+            error = checkout(pending, total, customer_name)
+            if error:
+                st.error(error)
+            else:
+                st.rerun()
 
 
-# ================= RIGHT: PRODUCTS =================
-with right:
+# ================= PRODUCTS (fragment) =================
+@st.fragment
+def render_products():
     st.markdown("### 📦 Products")
-    search = st.text_input("Search product name / SKU", key="pos_search")
+    search = st.text_input("Search product name / SKU / barcode", key="pos_search")
 
-    show_df = df.copy()
+    show_df = df
     if search:
-        show_df = show_df[
-            show_df["name"].astype(str).str.contains(search, case=False, na=False)
-            | show_df["sku"].astype(str).str.contains(search, case=False, na=False)
-        ]
+        # ranked lookup on the shared index (exact code → prefix → substring → fuzzy)
+        index = get_search_index(*get_catalog().products_snapshot())
+        pos = [stock_map.position(sku) for sku in index.search(search)]
+        show_df = df.iloc[[p for p in pos if p is not None]]
 
     if show_df.empty:
         st.warning("No products match your search.")
-    else:
-        st.markdown('<div class="mxp-tiles">', unsafe_allow_html=True)
-
-        cols = st.columns(3, gap="small")
-        for i, (_, row) in enumerate(show_df.iterrows()):
-            col = cols[i % 3]
-            with col:
-                name = str(row.get("name") or "")
-                sku = str(row.get("sku") or "")
-                unit = str(row.get("unit") or "")
-                price = safe_float(row.get("selling_price"), 0.0)
-                avail = row.get("available_qty", None)
-
-                avail_txt = "—"
-                if avail is not None:
-                    af = safe_float(avail, None)
-                    avail_txt = f"{af:.2f}" if af is not None else str(avail)
-
-                st.markdown(
-                    f"""
-                    <div class="mxp-card" style="min-height:92px;">
-                      <div class="mxp-name">{name}</div>
-                      <div class="mxp-meta">SKU: {sku} • {unit}</div>
-                      <div class="mxp-price">{money(price)}</div>
-                      <div class="mxp-avail">Available: {avail_txt}</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
+        return
+
+    # ---- Paging (widget count depends on the page, not the catalog) ----
+    if st.session_state.get("pos_search_prev") != search:
+        st.session_state["pos_search_prev"] = search
+        st.session_state["pos_page"] = 1
+
+    size_opts = sorted(set(TILE_PAGE_SIZES + [DEFAULT_TILE_PAGE_SIZE]))
+    pg_a, pg_b, pg_c = st.columns([1, 1, 1.4], gap="small")
+    page_size = pg_a.selectbox(
+        "Tiles per page",
+        size_opts,
+        index=size_opts.index(DEFAULT_TILE_PAGE_SIZE),
+        key="pos_page_size",
+    )
+    n_pages = max(1, math.ceil(len(show_df) / page_size))
+    if int(st.session_state.get("pos_page") or 1) > n_pages:
+        st.session_state["pos_page"] = n_pages
+    page = pg_b.number_input("Page", min_value=1, max_value=n_pages, step=1, key="pos_page")
+
+    start = (int(page) - 1) * page_size
+    page_df = show_df.iloc[start:start + page_size]
+    pg_c.caption(f"Showing {start + 1}–{start + len(page_df)} of {len(show_df)} products")
+
+    st.markdown('<div class="mxp-tiles">', unsafe_allow_html=True)
+
+    cols = st.columns(3, gap="small")
+    for i, (_, row) in enumerate(page_df.iterrows()):
+        col = cols[i % 3]
+        with col:
+            name = row["name"]
+            sku = row["sku"]
+            unit = row["unit"]
+            price = float(row["selling_price"])
+            avail = None if pd.isna(row["available_qty"]) else float(row["available_qty"])
+            avail_txt = "—" if avail is None else f"{avail:.2f}"
+
+            st.markdown(
+                f"""
+                <div class="mxp-card" style="min-height:92px;">
+                  <div class="mxp-name">{name}</div>
+                  <div class="mxp-meta">SKU: {sku} • {unit}</div>
+                  <div class="mxp-price">{money(price)}</div>
+                  <div class="mxp-avail">Available: {avail_txt}</div>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+            step = get_step_for_unit(unit)
 
-                step = get_step_for_unit(unit)
-
-                # ✅ Robust typed add: uses expander instead of popover (popover can be flaky in some Streamlit builds)
-                with st.expander("➕ Add", expanded=False):
-                    qty_to_add = st.number_input(
-                        "Qty to add",
-                        min_value=0.0,
-                        value=float(step),
-                        step=float(step),
-                        format="%.3f",
-                        key=f"add_qty_{sku}",
+            # ✅ Robust typed add: uses expander instead of popover (popover can be flaky in some Streamlit builds)
+            with st.expander("➕ Add", expanded=False):
+                qty_to_add = st.number_input(
+                    "Qty to add",
+                    min_value=0.0,
+                    value=float(step),
+                    step=float(step),
+                    format="%.3f",
+                    key=f"add_qty_{sku}",
+                )
+                if st.button("✅ Add to Cart", key=f"confirm_add_{sku}", use_container_width=True):
+                    added = cart_add_qty(
+                        sku=sku,
+                        name=name,
+                        unit=unit,
+                        unit_price=float(price),
+                        available_qty=avail,
+                        qty_to_add=float(qty_to_add),
                     )
-                    if st.button("✅ Add to Cart", key=f"confirm_add_{sku}", use_container_width=True):
-                        cart_add_qty(
-                            sku=sku,
-                            name=name,
-                            unit=unit,
-                            unit_price=float(price),
-                            available_qty=avail,
-                            qty_to_add=float(qty_to_add),
-                        )
+                    if added:
+                        # the cart lives in another fragment
                         st.rerun()
 
-        st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+# ================= PRINT AREA (fragment) =================
+def doc_key(sale_id: int, doc_type: str) -> tuple:
+    return (int(sale_id), doc_type, get_cache().version("company"), location_label)
+
+def document_fields(sale_id: int, sale: dict, lines: list, doc_type: str, company=None) -> dict:
+    return dict(
+        company=company or load_company(),
+        doc_type=doc_type,
+        sale_id=sale.get("id", sale_id),
+        created=sale.get("created_at") or "",
+        customer=sale.get("customer_name") or "Walk-in Customer",
+        location_label=location_label,
+        lines=lines,
+        total_amount=sale.get("total") or sale.get("total_amount") or 0,
+        receipt_no=sale.get("receipt_no") or st.session_state.get("last_receipt_no"),
+        payment_method=st.session_state.get("last_payment_method"),
+        cash_received=st.session_state.get("last_cash_received"),
+        change_due=st.session_state.get("last_change_due"),
+    )
+
+def queue_thermal(sale_id: int, doc_type: str = "Receipt"):
+    # render once, then hand the bytes to the spooler; printing happens off the rerun
+    docs: SaleDocs = st.session_state["sale_docs"]
+    doc = docs.get(sale_id)
+    if doc is None:
+        return
+    fields = document_fields(sale_id, *doc, doc_type)
+    data = docs.render(doc_key(sale_id, doc_type) + ("escpos",), lambda: escpos.render_escpos(**fields))
+    get_spooler().submit(escpos.PRINTER_TARGET, data, sale_id=int(sale_id), doc_type=doc_type)
 
+@st.fragment
+def render_print_area():
+    st.markdown("---")
+    st.markdown("## 🖨 Print Area")
 
-# ================= PRINT AREA (Same POS Page) =================
-st.markdown("---")
-st.markdown("## 🖨 Print Area")
+    sale_id = st.session_state.get("last_sale_id")
+    company = pre["company"].value if pre["company"].ok else load_company()
 
-sale_id = st.session_state.get("last_sale_id")
-company = load_company()
+    if not sale_id:
+        st.info("Complete a sale first. After payment, your document will appear here.")
+        return
 
-if not sale_id:
-    st.info("Complete a sale first. After payment, your document will appear here.")
-else:
+    # checkout stored the document; older sales are fetched once and kept
+    docs: SaleDocs = st.session_state["sale_docs"]
     sale = None
     lines = []
     try:
-        data = api_get(f"/sales/{int(sale_id)}")
-        sale, lines = parse_sale_response(data)
+        if sale_id not in docs and pre.get("last_sale") is not None and pre["last_sale"].ok and prefetch_sale_id == sale_id:
+            doc = docs.get(sale_id, lambda _: pre["last_sale"].value)
+        else:
+            doc = docs.get(sale_id, load_sale_document)
+        if doc:
+            sale, lines = doc
     except Exception as e:
         st.error(f"Could not load sale #{sale_id} for printing: {e}")
         sale = None
@@ -736,52 +652,83 @@ else:
     controls = st.container()
     with controls:
         st.markdown('<div class="no-print">', unsafe_allow_html=True)
-        cpa, cpb, cpc = st.columns([1, 1, 1])
-        if cpa.button("🖨 Print Now", use_container_width=True):
-            st.session_state["print_now"] = True
-            st.rerun()
-        if cpb.button("Clear last sale", use_container_width=True):
-            st.session_state["last_sale_id"] = None
-            st.session_state["print_now"] = False
-            st.session_state["last_receipt_no"] = None
-            st.session_state["last_payment_method"] = None
-            st.session_state["last_cash_received"] = None
-            st.session_state["last_change_due"] = None
-            st.rerun()
-        if cpc.button("Refresh", use_container_width=True):
-            st.cache_data.clear()
-            st.rerun()
+        doc_type = st.selectbox("Print document", DOC_TYPES, key="pos_doc_type")
+        thermal = False
+        if escpos.is_configured():
+            cpa, cpt, cpb, cpc = st.columns([1, 1, 1, 1])
+            thermal = cpt.button("🧾 Thermal", use_container_width=True)
+        else:
+            cpa, cpb, cpc = st.columns([1, 1, 1])
+        cpa.button("🖨 Print Now", use_container_width=True, on_click=on_print_now)
+        cpb.button("Clear last sale", use_container_width=True, on_click=on_clear_last_sale)
+        cpc.button("Refresh", use_container_width=True, on_click=invalidate, args=("company", f"stock:{location_id}"))
         st.markdown("</div>", unsafe_allow_html=True)
 
     if sale:
-        created = sale.get("created_at") or ""
-        customer = sale.get("customer_name") or "Walk-in Customer"
-        total_amount = sale.get("total") or sale.get("total_amount") or 0
-
-        receipt_no = sale.get("receipt_no") or st.session_state.get("last_receipt_no")
-        payment_method = st.session_state.get("last_payment_method")
-        cash_received = st.session_state.get("last_cash_received")
-        change_due = st.session_state.get("last_change_due")
-
-        html = build_print_html(
-            company=company,
-            doc_type=doc_type,
-            sale_id=sale.get("id", sale_id),
-            created=created,
-            customer=customer,
-            location_label=location_label,
-            lines=lines,
-            total_amount=total_amount,
-            receipt_no=receipt_no,
-            payment_method=payment_method,
-            cash_received=cash_received,
-            change_due=change_due,
-        )
+        fields = document_fields(sale_id, sale, lines, doc_type, company)
+        html = docs.render(doc_key(sale_id, doc_type), lambda: render_document(**fields))
+
+        if thermal:
+            queue_thermal(sale_id, doc_type)
+            st.toast("Receipt queued for the printer.")
 
         if st.session_state.get("print_now"):
-            html = html.replace("</body>", "<script>window.print();</script></body>")
+            html = with_auto_print(html)
             st.session_state["print_now"] = False
 
         st.components.v1.html(html, height=740, scrolling=True)
     else:
         st.warning("No sale data returned. Please try again or check the sale id.")
+
+
+# ================= PRINT QUEUE (fragment) =================
+@st.fragment(run_every=5)
+def render_print_queue():
+    spooler = get_spooler()
+    with st.expander(f"🧾 Receipt printer • {spooler.pending(escpos.PRINTER_TARGET)} waiting", expanded=False):
+        jobs = spooler.jobs(limit=8)
+        if jobs:
+            view = pd.DataFrame(jobs)
+            view["created_at"] = pd.to_datetime(view["created_at"], unit="s").dt.strftime("%H:%M:%S")
+            st.dataframe(
+                view[["id", "sale_id", "doc_type", "status", "attempts", "last_error", "created_at"]],
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.caption("No print jobs yet.")
+
+        # offline sales have negative ids (see submit_sale): they are reprinted from
+        # their own button here or from Offline Sales, never typed into the box
+        last_id = int(st.session_state.get("last_sale_id") or 0)
+        r1, r2 = st.columns([2, 1])
+        reprint_id = r1.number_input("Reprint sale ID", min_value=1, step=1, value=max(last_id, 1))
+        if r2.button("Reprint", use_container_width=True):
+            if spooler.reprint(int(reprint_id)) is None:
+                st.warning(f"Sale #{int(reprint_id)} was never sent to the printer.")
+            else:
+                st.success(f"Sale #{int(reprint_id)} queued.")
+        if last_id < 0:
+            receipt_no = st.session_state.get("last_receipt_no")
+            if st.button(f"Reprint offline receipt {receipt_no}", use_container_width=True):
+                if spooler.reprint(last_id) is None:
+                    st.warning(f"{receipt_no} was never sent to the printer.")
+                else:
+                    st.success(f"{receipt_no} queued.")
+
+
+# -------------------- Layout --------------------
+# Each panel is a fragment: a cart edit reruns only the cart, a search or page
+# change only the product grid, a doc-type change only the print area.
+left, right = st.columns([1.15, 1.85], gap="large")
+
+with left:
+    render_cart()
+
+with right:
+    render_products()
+
+render_print_area()
+
+if escpos.is_configured():
+    render_print_queue()
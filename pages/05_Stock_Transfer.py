@@ -1,23 +1,20 @@
 # app/pages/03_Stock_Transfer.py
 
-import os
-import requests
 import streamlit as st
 from datetime import date
 
+from api_client import api_get, api_request
 from auth import require_login
+from cache import invalidate
+from catalog import get_catalog
 require_login()
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
-
 st.set_page_config(page_title="Stock Transfer – Marvenixx POS", layout="wide")
 st.title("🔄 Stock Transfer (Cold Room → Store)")
 
 # ========== LOAD LOCATIONS ==========
 try:
-    resp = requests.get(f"{API_BASE}/locations", timeout=10)
-    resp.raise_for_status()
-    locations = resp.json()
+    locations = api_get("/locations", timeout=10)
 except Exception as e:
     st.error(f"Error loading locations: {e}")
     locations = []
@@ -46,9 +43,7 @@ st.markdown("---")
 
 # ========== LOAD PRODUCTS (for dropdown + unit help) ==========
 try:
-    p_resp = requests.get(f"{API_BASE}/products", timeout=10)
-    p_resp.raise_for_status()
-    products = p_resp.json()
+    products = get_catalog().products()
 except Exception as e:
     st.error(f"Could not load product list: {e}")
     products = []
@@ -127,8 +122,9 @@ if st.button("Post Transfer"):
             "lines": lines,
         }
         try:
-            r = requests.post(f"{API_BASE}/stock_transfer", json=payload, timeout=15)
+            r = api_request("POST", "/stock_transfer", json=payload, timeout=15)
             if r.status_code == 200:
+                invalidate(f"stock:{from_loc_id}", f"stock:{to_loc_id}")
                 st.success("Stock transfer posted successfully.")
                 st.json(r.json())
             else:
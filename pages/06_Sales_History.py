@@ -1,35 +1,28 @@
 # app/pages/06_Sales_History.py
 
-import os
+import time
 from datetime import date
 
 import pandas as pd
 import requests
 import streamlit as st
 
+from api_client import api_get, api_post_idempotent, inflight_key, release_key
 from auth import require_login
+from cache import cached, invalidate
+from catalog import get_catalog
+from catalog_frame import get_catalog_frame, money_col
+from sale_docs import SaleDocs
+from sales_history import HISTORY_WINDOW, HistoryPager
+from sales_mirror import get_sales_mirror
 
 require_login()
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
-
 st.set_page_config(page_title="Sales History – Ateasefuor", layout="wide")
 st.markdown("## 🧾 Sales History")
 
 
 # -------------------- Helpers --------------------
-def api_get(path: str, params=None, timeout=15):
-    r = requests.get(f"{API_BASE}{path}", params=params, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
-
-
-def api_post(path: str, payload: dict, timeout=20):
-    r = requests.post(f"{API_BASE}{path}", json=payload, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
-
-
 def money(x) -> str:
     try:
         return f"₵ {float(x):,.2f}"
@@ -44,6 +37,11 @@ def safe_float(x, default=0.0):
         return default
 
 
+def restart_history():
+    # a new key for history_pager: the next run pages from the newest sale again
+    st.session_state["history_refresh"] = st.session_state.get("history_refresh", 0) + 1
+
+
 # -------------------- Filters --------------------
 col_from, col_to, col_refresh = st.columns([1, 1, 0.8])
 with col_from:
@@ -52,7 +50,8 @@ with col_to:
     end_date = st.date_input("To date", value=date.today())
 with col_refresh:
     if st.button("🔄 Refresh", use_container_width=True):
-        st.cache_data.clear()
+        invalidate("sales")
+        restart_history()
         st.rerun()
 
 if start_date > end_date:
@@ -61,25 +60,39 @@ if start_date > end_date:
 
 
 # -------------------- Loaders --------------------
-@st.cache_data(ttl=60)
-def load_sales(start_date: date, end_date: date):
-    params = {
-        "start_date": start_date.isoformat(),
-        "end_date": end_date.isoformat(),
-        "limit": 1000,
-    }
-    return api_get("/sales/history", params=params, timeout=20)
+def history_pager(start_date: date, end_date: date) -> HistoryPager:
+    # one pager per session and range, restarted only by this page's own changes:
+    # checkouts and journal replays elsewhere bump the "sales" version all day long
+    key = (start_date, end_date, st.session_state.get("history_refresh", 0))
+    hit = st.session_state.get("history_pager")
+    if hit is None or hit[0] != key:
+        hit = st.session_state["history_pager"] = (key, HistoryPager(start_date, end_date))
+    return hit[1]
+
+
+def load_more(pager: HistoryPager):
+    # on_click, so the totals drawn in this run already include the new page
+    try:
+        pager.load_more()
+    except Exception as e:
+        st.session_state["history_load_error"] = str(e)
 
 
-@st.cache_data(ttl=60)
+@cached(ttl=60, tags=("sales", "sale:{sale_id}"))
 def load_sale(sale_id: int):
     return api_get(f"/sales/{int(sale_id)}", timeout=20)
 
 
-@st.cache_data(ttl=120)
 def load_products():
-    data = api_get("/products", timeout=20)
-    return data if isinstance(data, list) else []
+    return get_catalog_frame("products", *get_catalog().products_snapshot())
+
+
+def product_labels(frame) -> dict:
+    # label -> row position, blank SKUs are not selectable
+    df = frame.df
+    labels = df["name"] + " (" + df["sku"] + ") • " + money_col(df["selling_price"])
+    keep = df["sku"] != ""
+    return dict(zip(labels[keep].tolist(), keep[keep].index.tolist()))
 
 
 # -------------------- Main Layout --------------------
@@ -87,23 +100,65 @@ left, right = st.columns([1.25, 1], gap="large")
 
 # ================= LEFT: list =================
 with left:
-    try:
-        data = load_sales(start_date, end_date)
-    except Exception as e:
-        st.error(f"Could not load sales history: {e}")
-        st.stop()
-
-    if not data:
-        st.info("No sales for this period.")
-        st.stop()
-
-    df = pd.DataFrame(data)
-
-    # Normalize types
-    if "created_at" in df.columns:
-        df["created_at"] = pd.to_datetime(df["created_at"], errors="coerce")
-    if "total" in df.columns:
-        df["total"] = df["total"].apply(lambda v: safe_float(v, 0.0))
+    search = st.text_input("Filter sales", placeholder="Receipt no, customer or sale ID").strip()
+    m1, m2, m3 = st.columns([1, 1, 1])
+    mirror = get_sales_mirror()
+
+    if mirror.covers(start_date):
+        # the whole range is mirrored locally: exact totals, search across all of it
+        count, range_total = mirror.totals(start_date, end_date)
+        df = mirror.sales(start_date, end_date, search=search, limit=HISTORY_WINDOW)
+        if not count:
+            st.info("No sales for this period.")
+            st.stop()
+        m1.metric("Sales", f"{count:,}")
+        m2.metric("Total", money(range_total))
+        synced = f"{int(time.time() - mirror.synced_at)}s ago" if mirror.synced_at else "earlier"
+        m3.caption(f"From the local sales copy, synced {synced}.")
+        if len(df) >= HISTORY_WINDOW:
+            st.caption(f"Showing the newest {HISTORY_WINDOW:,} matching sales.")
+        if df.empty:
+            st.info("No sales match.")
+            st.stop()
+    else:
+        pager = history_pager(start_date, end_date)
+        try:
+            if not pager.count and not pager.exhausted:
+                pager.load_more()
+        except Exception as e:
+            st.error(f"Could not load sales history: {e}")
+            st.stop()
+
+        if not pager.count:
+            st.info("No sales for this period.")
+            st.stop()
+
+        m1.metric("Sales loaded", f"{pager.count:,}" + ("" if pager.exhausted else "+"))
+        m2.metric("Total loaded", money(pager.total))
+        with m3:
+            st.button("⬇️ Load more", use_container_width=True, disabled=pager.exhausted, on_click=load_more, args=(pager,))
+            st.caption("All sales in range loaded." if pager.exhausted else "Older sales not loaded yet.")
+        load_error = st.session_state.pop("history_load_error", None)
+        if load_error:
+            st.error(f"Could not load more sales: {load_error}")
+        if pager.dropped:
+            st.caption(f"Showing the {len(pager):,} most recently loaded sales; {pager.dropped:,} newer ones were released.")
+        if pager.truncated:
+            st.warning("The API capped at least one day's sales; some sales of that day are missing.")
+
+        df = pager.frame()
+        if search:
+            hay = (
+                df["id"].astype(str)
+                + " "
+                + df["receipt_no"].fillna("").astype(str)
+                + " "
+                + df["customer_name"].fillna("").astype(str)
+            )
+            df = df[hay.str.contains(search, case=False, regex=False)]
+            if df.empty:
+                st.info("No loaded sales match. Load more to search further back.")
+                st.stop()
 
     # Display table nicely
     display_cols = []
@@ -130,22 +185,17 @@ with left:
     st.dataframe(df_view, use_container_width=True, hide_index=True)
 
     # Sale selector (for details panel)
-    df = df.sort_values("id", ascending=False)
-
-    def label_row(r):
-        sid = int(r.get("id") or 0)
-        rno = str(r.get("receipt_no") or "").strip()
-        cust = str(r.get("customer_name") or "Walk-in").strip()
-        when = ""
-        if pd.notna(r.get("created_at")):
-            when = pd.to_datetime(r["created_at"]).strftime("%Y-%m-%d %H:%M")
-        total = money(r.get("total", 0))
-        if rno:
-            return f"{sid} • {rno} • {when} • {cust} • {total}"
-        return f"{sid} • {when} • {cust} • {total}"
-
-    df["label"] = df.apply(label_row, axis=1)
-    label_to_id = {row["label"]: int(row["id"]) for _, row in df.iterrows()}
+    df = df.sort_values("id", ascending=False).copy()
+
+    ids = pd.to_numeric(df["id"], errors="coerce").fillna(0).astype(int)
+    rno = df.get("receipt_no", pd.Series("", index=df.index)).fillna("").astype(str).str.strip()
+    cust = df.get("customer_name", pd.Series("", index=df.index)).fillna("").astype(str).str.strip()
+    cust = cust.mask(cust == "", "Walk-in")
+    when = df["created_at"].dt.strftime("%Y-%m-%d %H:%M").fillna("") if "created_at" in df.columns else ""
+    total = money_col(df["total"]) if "total" in df.columns else money(0)
+    rno = rno.mask(rno != "", rno + " • ")
+    df["label"] = ids.astype(str) + " • " + rno + when + " • " + cust + " • " + total
+    label_to_id = dict(zip(df["label"].tolist(), ids.tolist()))
 
     default_sale_id = int(st.session_state.get("selected_sale_id") or int(df["id"].iloc[0]))
     default_label = next((lb for lb, sid in label_to_id.items() if sid == default_sale_id), df["label"].iloc[0])
@@ -218,22 +268,13 @@ with right:
     # Add-lines UI requires your API endpoint: POST /sales/{sale_id}/add_lines
     # (You already added it in your sales router.)
 
-    products = load_products()
-    if not products:
+    label_to_pos = load_products().memo("history_labels", product_labels)
+    if not label_to_pos:
         st.info("No products available.")
         st.stop()
 
-    pdf = pd.DataFrame(products)
-    for c in ["sku", "name", "unit", "selling_price"]:
-        if c not in pdf.columns:
-            pdf[c] = None
-
-    pdf["selling_price"] = pdf["selling_price"].apply(lambda v: safe_float(v, 0.0))
-    pdf["label"] = pdf.apply(lambda r: f"{str(r['name'] or '').strip()} ({str(r['sku'] or '').strip()}) • {money(r['selling_price'])}", axis=1)
-    label_to_row = {r["label"]: r for _, r in pdf.iterrows() if str(r.get("sku") or "").strip()}
-
-    chosen_prod = st.selectbox("Product", list(label_to_row.keys()))
-    pr = label_to_row[chosen_prod]
+    chosen_prod = st.selectbox("Product", list(label_to_pos.keys()))
+    pr = load_products().df.iloc[label_to_pos[chosen_prod]]
 
     sku = str(pr.get("sku") or "").strip()
     default_price = safe_float(pr.get("selling_price"), 0.0)
@@ -259,9 +300,18 @@ with right:
                     "location_id": int(loc_for_add),
                     "lines": [{"sku": sku, "qty": float(qty), "unit_price": float(unit_price)}],
                 }
-                res = api_post(f"/sales/{int(sale_id)}/add_lines", payload, timeout=25)
+                path = f"/sales/{int(sale_id)}/add_lines"
+                key = inflight_key(path, payload)
+                r = api_post_idempotent(path, payload, key, timeout=(3.05, 10))
+                if r.status_code < 500:
+                    release_key(key)
+                r.raise_for_status()
+                res = r.json()
                 st.success(f"Added. New total: {money(res.get('new_total', 0))}")
-                st.cache_data.clear()
+                invalidate("sales", f"sale:{int(sale_id)}", f"stock:{int(loc_for_add)}")
+                if isinstance(st.session_state.get("sale_docs"), SaleDocs):
+                    st.session_state["sale_docs"].forget(int(sale_id))
+                restart_history()
                 st.rerun()
             except requests.HTTPError as e:
                 try:
@@ -1,49 +1,18 @@
 # app/pages/07_Invoice_Proforma.py
 
-import os
-import requests
-import pandas as pd
 import streamlit as st
-from datetime import datetime
 
+from api_client import api_get
 from auth import require_login
+from documents import DOC_TYPES, INVOICE_WIDTH, load_company, render_document, with_auto_print
+from sale_docs import SaleDocs
 require_login()
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
-
 st.set_page_config(
     page_title="Invoice / Pro Forma – Marvenixx POS",
     layout="centered",
 )
 
-# ---------------- PRINT HELPER ----------------
-def render_print_button():
-    st.markdown(
-        """
-        <script>
-        function mxpPrint(){ window.print(); }
-        </script>
-        """,
-        unsafe_allow_html=True,
-    )
-
-    st.button("🖨 Print Receipt", use_container_width=True, key="print_btn")
-
-    st.markdown(
-        """
-        <script>
-        const btns = window.parent.document.querySelectorAll('button');
-        for (const b of btns){
-            if (b.innerText.trim() === "🖨 Print Receipt"){
-                b.onclick = () => window.print();
-            }
-        }
-        </script>
-        """,
-        unsafe_allow_html=True,
-    )
-
-
 # ---------------- GLOBAL CSS ----------------
 st.markdown(
     """
@@ -67,36 +36,14 @@ st.markdown(
             margin: 10mm;
         }
     }
-
-    .invoice-box {
-        background: #ffffff;
-        padding: 20px 30px;
-        border: 1px solid #e5e7eb;
-        border-radius: 8px;
-        font-size: 13px;
-        max-width: 700px;
-        margin: 0 auto;
-    }
-
-    .company-name {
-        font-size: 18px;
-        font-weight: 900;
-        text-align: center;
-        margin-bottom: 2px;
-    }
-
-    .company-contact {
-        font-size: 11px;
-        text-align: center;
-        line-height: 1.3;
-    }
     </style>
     """,
     unsafe_allow_html=True,
 )
 
 # ---------------- TOP CONTROLS (NOT PRINTED) ----------------
-default_sale_id = int(st.session_state.get("last_sale_id") or 1)
+# offline POS sales leave a negative id behind; they print from Offline Sales
+default_sale_id = max(int(st.session_state.get("last_sale_id") or 1), 1)
 default_doc = st.session_state.get("last_doc_type") or "Receipt"
 
 st.markdown('<div class="no-print">', unsafe_allow_html=True)
@@ -106,8 +53,8 @@ c1, c2, c3 = st.columns([2, 2, 2])
 with c1:
     doc_type = st.selectbox(
         "Document type",
-        ["Receipt", "Proforma"],
-        index=0 if default_doc == "Receipt" else 1,
+        DOC_TYPES,
+        index=DOC_TYPES.index(default_doc) if default_doc in DOC_TYPES else 0,
         key="doc_type",
     )
 with c2:
@@ -122,159 +69,57 @@ with c3:
     auto_print = st.checkbox("Auto-print after Load", value=False, key="auto_print_checkbox")
 
 load_clicked = st.button("Load document", use_container_width=True, key="load_doc_btn")
-st.caption("Tip: Click **Load document** then click **Print Receipt**.")
+st.caption("Tip: Click **Load document** then click **Print** on the document.")
 st.markdown("</div>", unsafe_allow_html=True)
 
 # ---------------- LOAD SALE ----------------
-sale = None
-lines = []
+# same per-session document cache as the POS; "Load document" always reads the sale
+# again, so lines added since it was cached show up
+if not isinstance(st.session_state.get("sale_docs"), SaleDocs):
+    st.session_state["sale_docs"] = SaleDocs()
+docs: SaleDocs = st.session_state["sale_docs"]
 
 if load_clicked:
+    docs.forget(int(sale_id))
+    st.session_state["invoice_sale_id"] = int(sale_id)
+    st.session_state["last_sale_id"] = int(sale_id)
+    st.session_state["last_doc_type"] = doc_type
+
+sale = None
+lines = []
+loaded_id = st.session_state.get("invoice_sale_id")
+if loaded_id:
     try:
-        r = requests.get(f"{API_BASE}/sales/{int(sale_id)}", timeout=15)
-        r.raise_for_status()
-        data = r.json()
-        sale = data.get("sale") or {}
-        lines = data.get("lines", []) or []
-        st.session_state["last_sale_id"] = int(sale_id)
-        st.session_state["last_doc_type"] = doc_type
+        doc = docs.get(loaded_id, lambda sid: api_get(f"/sales/{int(sid)}", timeout=15))
+        if doc:
+            sale, lines = doc
     except Exception as e:
         st.error(f"Error loading sale: {e}")
-        sale = None
-        lines = []
-
-# ---------------- COMPUTED FIELDS ----------------
-user = st.session_state.get("user") or {}
-served_by = str(user.get("full_name") or user.get("username") or "").strip()
 
-# ✅ SAFE: never crashes even if None
-payment_method = str(st.session_state.get("last_payment_method") or "Cash / MoMo").strip()
-
-# ---------------- RENDER RECEIPT ----------------
+# ---------------- RENDER DOCUMENT ----------------
 if sale is not None:
-    st.markdown('<div class="invoice-box">', unsafe_allow_html=True)
-
-    # HEADER
-    col_logo, col_text, col_empty = st.columns([1, 3, 1])
-    with col_logo:
-        try:
-            st.image("logo.png", width=90)
-        except Exception:
-            pass
-
-    with col_text:
-        st.markdown(
-            '<div class="company-name">ATEASEFUOR LIMITED COMPANY</div>',
-            unsafe_allow_html=True,
-        )
-        st.markdown(
-            """
-            <div class="company-contact">
-                Opp Redco Flat, Madina New Market, Accra, Ghana<br/>
-                Mobile: 0201497272 / 0530461935 • www.ateasefuor.com
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    st.write("---")
-
-    # META
-    raw_date = sale.get("created_at") or ""
-    if raw_date:
-        try:
-            dt = datetime.fromisoformat(raw_date.replace("Z", "+00:00"))
-            sale_date = dt.strftime("%Y-%m-%d")
-        except Exception:
-            sale_date = str(raw_date)[:10]
-    else:
-        sale_date = ""
-
-    printed_time = datetime.now().strftime("%H:%M")
-
-    # ✅ SAFE customer
-    cust_raw = sale.get("customer_name")
-    customer = str(cust_raw or "Walk-in Customer").strip()
-
-    m1, m2 = st.columns(2)
-    with m1:
-        st.write(f"**{doc_type.upper()}**")
-        st.write(f"**Customer:** {customer}")
-        if served_by:
-            st.write(f"**Served by:** {served_by}")
-    with m2:
-        st.write(f"**Date:** {sale_date} {printed_time}")
-        st.write(f"**Sale ID:** {sale.get('id', '')}")
-        # show receipt no if available
-        if sale.get("receipt_no"):
-            st.write(f"**Receipt No:** {sale.get('receipt_no')}")
-
-    st.write("")
-
-    # LINES TABLE
-    if lines:
-        df = pd.DataFrame(lines)
-
-        if "product_name" not in df.columns and "name" in df.columns:
-            df["product_name"] = df["name"]
-
-        df = df.rename(
-            columns={
-                "product_name": "Item",
-                "qty": "Qty",
-                "unit_price": "Unit Price (₵)",
-                "line_total": "Line Total (₵)",
-            }
-        )
-
-        wanted = ["Item", "Qty", "Unit Price (₵)", "Line Total (₵)"]
-        df = df[[c for c in wanted if c in df.columns]]
-
-        for col in ["Qty", "Unit Price (₵)", "Line Total (₵)"]:
-            if col in df.columns:
-                df[col] = df[col].astype(float).map(lambda x: f"{x:,.2f}")
-
-        st.table(df)
-    else:
-        st.info("No line items for this sale.")
-
-    # TOTAL
-    total = sale.get("total") or sale.get("total_amount") or 0
-    try:
-        total_val = float(total)
-    except Exception:
-        total_val = 0.0
-
-    st.write("")
-    st.write(f"### Total: ₵ {total_val:,.2f}")
-
-    # PAYMENT SUMMARY
-    st.write("")
-    st.write("#### Payment summary")
-    st.write(f"- Method: **{payment_method}**")
-    st.write(f"- Amount paid: ₵ {total_val:,.2f}")
-    st.write(f"- Balance: ₵ 0.00")
-
-    st.write("---")
-    st.caption("Thank you for your business.")
-
-    st.markdown("</div>", unsafe_allow_html=True)
-
-    # PRINT CONTROLS (NOT PRINTED)
-    st.markdown('<div class="no-print">', unsafe_allow_html=True)
-    render_print_button()
-    st.markdown("</div>", unsafe_allow_html=True)
+    user = st.session_state.get("user") or {}
+    served_by = str(user.get("full_name") or user.get("username") or "").strip()
+    payment_method = sale.get("payment_method") or st.session_state.get("last_payment_method") or "Cash / MoMo"
+
+    html = render_document(
+        company=load_company(),
+        doc_type=doc_type,
+        sale_id=sale.get("id", loaded_id),
+        created=sale.get("created_at") or "",
+        customer=str(sale.get("customer_name") or "Walk-in Customer").strip(),
+        location_label=sale.get("location_name") or sale.get("location_id") or "",
+        lines=lines,
+        total_amount=sale.get("total") or sale.get("total_amount") or 0,
+        receipt_no=sale.get("receipt_no"),
+        payment_method=payment_method,
+        served_by=served_by,
+        width=INVOICE_WIDTH,
+    )
+    if auto_print and load_clicked:
+        html = with_auto_print(html)
 
-    # OPTIONAL AUTO PRINT
-    if auto_print:
-        st.markdown(
-            """
-            <script>
-            window.setTimeout(() => { window.print(); }, 600);
-            </script>
-            """,
-            unsafe_allow_html=True,
-        )
+    st.components.v1.html(html, height=900, scrolling=True)
 
 else:
     st.info("Load a Sale ID to view and print a receipt / proforma.")
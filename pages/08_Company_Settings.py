@@ -1,13 +1,12 @@
-import os
 import base64
-import requests
 import streamlit as st
 
+from api_client import api_get, api_post
 from auth import require_login
+from cache import cached, invalidate
+from logo import content_hash, process_logo
 require_login()
 
-API_BASE = os.getenv("API_BASE", "http://api:8000")
-
 st.set_page_config(page_title="Settings – MXP", layout="centered")
 st.title("⚙️ Company Settings (Branding)")
 
@@ -19,17 +18,7 @@ if not is_admin:
     st.stop()
 
 
-def api_get(path: str):
-    r = requests.get(f"{API_BASE}{path}", timeout=20)
-    r.raise_for_status()
-    return r.json()
-
-def api_post(path: str, payload: dict):
-    r = requests.post(f"{API_BASE}{path}", json=payload, timeout=25)
-    r.raise_for_status()
-    return r.json()
-
-@st.cache_data(ttl=30)
+@cached(ttl=30, tags=("company",))
 def load_settings():
     return api_get("/settings/company")
 
@@ -50,10 +39,17 @@ with st.form("company_settings_form"):
 
 if submitted:
     logo_base64 = settings.get("logo_base64", "")
+    logo_hash = settings.get("logo_hash", "")
 
     if uploaded is not None:
-        b = uploaded.read()
-        logo_base64 = base64.b64encode(b).decode("utf-8")
+        # shrink once here so every receipt carries a few KB instead of the raw file
+        try:
+            png = process_logo(uploaded.read())
+        except OSError:
+            st.error("Could not read the uploaded logo. Please upload a PNG or JPG image.")
+            st.stop()
+        logo_base64 = base64.b64encode(png).decode("utf-8")
+        logo_hash = content_hash(png)
 
     payload = {
         "company_name": company_name.strip(),
@@ -62,10 +58,11 @@ if submitted:
         "website": website.strip(),
         "footer": footer.strip(),
         "logo_base64": logo_base64,
+        "logo_hash": logo_hash,
     }
 
-    api_post("/settings/company", payload)
-    st.cache_data.clear()
+    api_post("/settings/company", payload, timeout=25)
+    invalidate("company")
     st.success("Saved. Go to POS and print again.")
     st.rerun()
 
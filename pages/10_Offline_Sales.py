@@ -0,0 +1,100 @@
+# app/pages/10_Offline_Sales.py
+
+import pandas as pd
+import streamlit as st
+
+import escpos
+from auth import require_login
+from health import get_health_monitor
+from journal import DISCARDED, PENDING, REJECTED, SYNCED, get_journal
+from spooler import get_spooler
+
+require_login()
+
+st.set_page_config(page_title="Offline Sales – Marvenixx POS", layout="wide")
+st.markdown("## 📴 Offline Sales")
+st.caption("Sales taken while the API was unreachable. They sync automatically, oldest first.")
+
+journal = get_journal()
+health = get_health_monitor()
+is_admin = (st.session_state.get("user") or {}).get("role") == "admin"
+
+# -------------------- Summary --------------------
+counts = journal.counts()
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Waiting to sync", counts.get(PENDING, 0))
+m2.metric("Synced", counts.get(SYNCED, 0))
+m3.metric("Rejected", counts.get(REJECTED, 0))
+m4.metric("Discarded", counts.get(DISCARDED, 0))
+
+c1, c2 = st.columns([1, 3])
+with c1:
+    if st.button("🔄 Sync now", use_container_width=True, disabled=not health.is_available()):
+        journal.sync_now()
+        st.toast("Sync started.")
+with c2:
+    if not health.is_available():
+        st.warning(f"API unreachable ({health.last_error or 'no response'}). Sync resumes when it is back.")
+    elif journal.last_error and counts.get(PENDING):
+        st.caption(f"Last sync error: {journal.last_error}")
+
+# -------------------- Journal --------------------
+status = st.selectbox("Show", ["All", PENDING, REJECTED, SYNCED, DISCARDED])
+rows = journal.entries(None if status == "All" else status)
+if not rows:
+    st.info("No offline sales.")
+    st.stop()
+
+df = pd.DataFrame(rows)
+for c in ["created_at", "synced_at"]:
+    df[c] = pd.to_datetime(df[c], unit="s", errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S")
+df_view = df[["provisional_no", "created_at", "location_id", "total", "status", "sale_id", "receipt_no", "attempts", "last_error"]]
+st.dataframe(
+    df_view.rename(
+        columns={
+            "provisional_no": "Provisional No",
+            "created_at": "Taken at",
+            "location_id": "Location ID",
+            "total": "Total",
+            "status": "Status",
+            "sale_id": "Sale ID",
+            "receipt_no": "Receipt No",
+            "attempts": "Attempts",
+            "last_error": "Last error",
+        }
+    ),
+    use_container_width=True,
+    hide_index=True,
+)
+
+# -------------------- Details / reconcile --------------------
+st.markdown("### Details")
+labels = dict(zip(df["provisional_no"] + " • " + df["status"], df["id"]))
+chosen = st.selectbox("Offline sale", list(labels.keys()))
+entry_id = int(labels[chosen])
+entry = next(r for r in rows if r["id"] == entry_id)
+
+doc = journal.document(entry_id) or {}
+lines = doc.get("lines") or []
+if lines:
+    st.dataframe(
+        pd.DataFrame(lines)[[c for c in ["sku", "product_name", "qty", "unit_price", "line_total"] if c in lines[0]]],
+        use_container_width=True,
+        hide_index=True,
+    )
+# the POS spools an offline receipt under sale_id = -journal id
+if escpos.is_configured() and get_spooler().jobs(limit=1, sale_id=-entry_id):
+    if st.button(f"🧾 Reprint receipt {entry['provisional_no']}"):
+        get_spooler().reprint(-entry_id)
+        st.toast("Receipt queued for the printer.")
+if entry["status"] == SYNCED:
+    st.success(f"Synced as sale #{entry['sale_id']} ({entry['receipt_no'] or 'no receipt no'}).")
+elif entry["status"] == REJECTED:
+    st.error(f"Rejected by the API: {entry['last_error']}")
+    r1, r2 = st.columns(2)
+    if r1.button("Retry", use_container_width=True):
+        journal.retry(entry_id)
+        st.rerun()
+    if r2.button("Discard", use_container_width=True, disabled=not is_admin, help=None if is_admin else "Admin only"):
+        journal.discard(entry_id)
+        st.rerun()
@@ -0,0 +1,83 @@
+# app/prefetch.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+T = TypeVar("T")
+
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "16"))
+DEFAULT_DEADLINE = 8.0
+
+
+@dataclass
+class Prefetched(Generic[T]):
+    value: Optional[T] = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@st.cache_resource
+def _executor() -> ThreadPoolExecutor:
+    # Shared by all sessions; a slow endpoint only holds a worker, never the page.
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="mxp-prefetch")
+
+
+def prefetch(
+    tasks: dict[str, Callable[[], Any]],
+    deadline: float = DEFAULT_DEADLINE,
+    deadlines: Optional[dict[str, float]] = None,
+    ready: Optional[dict[str, Callable[[], Any]]] = None,
+) -> dict[str, Prefetched]:
+    """Run independent loaders concurrently; each result is bounded by its own deadline.
+
+    `ready[name]` is a memory-only read tried inline first; only when it returns None
+    does the task go to the pool. A worker that runs past its deadline cannot be
+    stopped, so cheap reads must never queue behind slow fetches.
+    """
+    ctx = get_script_run_ctx()
+    started = time.monotonic()
+
+    out: dict[str, Prefetched] = {}
+    for name, peek in (ready or {}).items():
+        if name in tasks:
+            value = peek()
+            if value is not None:
+                out[name] = Prefetched(value=value, elapsed=time.monotonic() - started)
+
+    def run(fn):
+        # lets st.cache_data / st.cache_resource work from the worker thread
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn()
+
+    ex = _executor()
+    futures = {name: ex.submit(run, fn) for name, fn in tasks.items() if name not in out}
+    deadlines = deadlines or {}
+
+    for name in sorted(futures, key=lambda n: deadlines.get(n, deadline)):
+        fut = futures[name]
+        remaining = started + deadlines.get(name, deadline) - time.monotonic()
+        try:
+            value = fut.result(timeout=max(0.0, remaining))
+            out[name] = Prefetched(value=value, elapsed=time.monotonic() - started)
+        except FutureTimeout:
+            # a queued task is dropped; a running one finishes in the background
+            fut.cancel()
+            out[name] = Prefetched(
+                error=TimeoutError(f"{name} did not respond within {deadlines.get(name, deadline):.0f}s"),
+                elapsed=time.monotonic() - started,
+            )
+        except Exception as e:
+            out[name] = Prefetched(error=e, elapsed=time.monotonic() - started)
+    return out
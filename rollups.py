@@ -0,0 +1,95 @@
+# app/rollups.py
+# Grouped sales aggregates for the dashboard (products, locations, payment
+# methods, hour x weekday), computed with pandas groupbys over the local sales
+# mirror and built once per (range, filters, mirror version, dimension).
+from datetime import date
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sales_mirror import SalesMirror
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+class SalesCube:
+    """Sale headers and lines for one range / filter, plus the rollups derived from them."""
+
+    __slots__ = ("sales", "lines", "_memo")
+
+    def __init__(self, sales: pd.DataFrame, lines: pd.DataFrame):
+        if "payment_method" not in sales.columns:
+            sales["payment_method"] = None
+        self.sales = sales
+        self.lines = lines
+        self.lines["qty"] = pd.to_numeric(self.lines["qty"], errors="coerce").fillna(0.0)
+        self.lines["line_total"] = pd.to_numeric(self.lines["line_total"], errors="coerce").fillna(0.0)
+        self._memo: dict[Any, Any] = {}
+
+    def memo(self, key, build: Callable[[], Any]):
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def top_products(self, n: int = 10) -> pd.DataFrame:
+        """sku, product_name, qty, revenue for the n best sellers by revenue."""
+        return self.memo(("products", n), lambda: self._top_products(n))
+
+    def _top_products(self, n: int) -> pd.DataFrame:
+        if self.lines.empty:
+            return pd.DataFrame(columns=["sku", "product_name", "qty", "revenue"])
+        g = self.lines.groupby("sku", sort=False).agg(
+            product_name=("product_name", "first"),
+            qty=("qty", "sum"),
+            revenue=("line_total", "sum"),
+        )
+        return g.nlargest(n, "revenue").reset_index()
+
+    def by_location(self) -> pd.DataFrame:
+        """location_id, sales, revenue, highest revenue first."""
+        return self.memo("location", lambda: self._by("location_id"))
+
+    def payment_mix(self) -> pd.DataFrame:
+        """payment_method, sales, revenue, share of revenue."""
+        return self.memo("payment_method", self._payment_mix)
+
+    def _payment_mix(self) -> pd.DataFrame:
+        df = self._by("payment_method")
+        total = df["revenue"].sum()
+        df["share"] = df["revenue"] / total if total else 0.0
+        return df
+
+    def _by(self, column: str) -> pd.DataFrame:
+        s = self.sales
+        keys = s[column].fillna("Unknown") if column == "payment_method" else s[column]
+        g = s.groupby(keys, sort=False, dropna=False)["total"].agg(sales="size", revenue="sum")
+        return g.sort_values("revenue", ascending=False).rename_axis(column).reset_index()
+
+    def heatmap(self) -> pd.DataFrame:
+        """7 x 24 revenue grid: weekday rows (Mon..Sun), hour-of-day columns."""
+        return self.memo("hour_weekday", self._heatmap)
+
+    def _heatmap(self) -> pd.DataFrame:
+        when = self.sales["created_at"]
+        ok = when.notna().to_numpy()
+        # flat 7*24 bincount instead of a groupby + pivot
+        cell = when.dt.dayofweek.to_numpy()[ok] * 24 + when.dt.hour.to_numpy()[ok]
+        grid = np.bincount(cell.astype(int), weights=self.sales["total"].to_numpy()[ok], minlength=7 * 24)
+        return pd.DataFrame(grid.reshape(7, 24), index=WEEKDAYS, columns=range(24))
+
+
+@st.cache_resource(max_entries=16)
+def get_sales_cube(
+    start_date: date,
+    end_date: date,
+    location_id: Optional[int],
+    payment_method: Optional[str],
+    version: int,
+    _mirror: SalesMirror,
+) -> SalesCube:
+    return SalesCube(
+        _mirror.sales(start_date, end_date, location_id, payment_method),
+        _mirror.lines(start_date, end_date, location_id, payment_method),
+    )
@@ -0,0 +1,106 @@
+# app/sale_docs.py
+# Completed-sale documents kept per session, so printing / reprinting the last
+# receipts costs no API call while the next customer is being rung up.
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Optional
+
+from cart import Cart
+
+SALE_DOCS_SIZE = 8
+
+
+def parse_sale_response(data):
+    sale = None
+    lines = []
+    if isinstance(data, dict) and "sale" in data:
+        sale = data.get("sale") or {}
+        lines = data.get("lines") or []
+    elif isinstance(data, dict):
+        sale = data
+        lines = data.get("lines") or []
+    if not isinstance(lines, list):
+        lines = []
+    return sale, lines
+
+
+def document_from_checkout(data: dict, payload: dict, cart: Cart) -> tuple[dict, list]:
+    """(sale, lines) from the POST /sales response, filling gaps from what was sent."""
+    sale, lines = parse_sale_response(data)
+    sale = dict(sale or {})
+    sale.setdefault("id", int(data.get("sale_id") or data.get("id") or 0))
+    sale.setdefault("receipt_no", data.get("receipt_no"))
+    sale.setdefault("created_at", datetime.now().isoformat(timespec="seconds"))
+    sale.setdefault("customer_name", payload.get("customer_name"))
+    sale.setdefault("location_id", payload.get("location_id"))
+    sale.setdefault("payment_method", payload.get("payment_method"))
+    sale.setdefault("total", data.get("total", float(cart.total)))
+    if not lines:
+        # the API charges qty × unit_price for what we sent, so the cart is the document
+        lines = [
+            {
+                "sku": ln.sku,
+                "product_name": ln.name,
+                "unit": ln.unit,
+                "qty": float(ln.qty),
+                "unit_price": float(ln.unit_price),
+                "line_total": float(ln.line_total),
+            }
+            for ln in cart
+        ]
+    return sale, lines
+
+
+class SaleDocs:
+    """Small LRU of sale_id -> (sale, lines), plus rendered output for those sales."""
+
+    __slots__ = ("maxsize", "_docs", "_rendered")
+
+    def __init__(self, maxsize: int = SALE_DOCS_SIZE):
+        self.maxsize = maxsize
+        self._docs: OrderedDict[int, tuple[dict, list]] = OrderedDict()
+        self._rendered: dict[tuple, object] = {}
+
+    def __contains__(self, sale_id) -> bool:
+        return int(sale_id) in self._docs
+
+    def put(self, sale_id: int, sale: dict, lines: list):
+        sale_id = int(sale_id)
+        self._drop_rendered(sale_id)
+        self._docs[sale_id] = (sale, lines)
+        self._docs.move_to_end(sale_id)
+        while len(self._docs) > self.maxsize:
+            old, _ = self._docs.popitem(last=False)
+            self._drop_rendered(old)
+
+    def forget(self, sale_id: int):
+        # the sale changed on the server (e.g. lines added): the next get() loads it again
+        sale_id = int(sale_id)
+        self._docs.pop(sale_id, None)
+        self._drop_rendered(sale_id)
+
+    def get(self, sale_id: int, load: Optional[Callable[[int], object]] = None) -> Optional[tuple[dict, list]]:
+        """Cached document, else `load(sale_id)` once (a GET /sales/{id} payload)."""
+        sale_id = int(sale_id)
+        doc = self._docs.get(sale_id)
+        if doc is not None:
+            self._docs.move_to_end(sale_id)
+            return doc
+        if load is None:
+            return None
+        sale, lines = parse_sale_response(load(sale_id))
+        if not sale:
+            return None
+        self.put(sale_id, sale, lines)
+        return sale, lines
+
+    def render(self, key: tuple, build: Callable[[], object]):
+        # key starts with the sale_id: (sale_id, doc_type, company version, ...)
+        out = self._rendered.get(key)
+        if out is None:
+            out = self._rendered[key] = build()
+        return out
+
+    def _drop_rendered(self, sale_id: int):
+        for key in [k for k in self._rendered if k[0] == sale_id]:
+            del self._rendered[key]
@@ -0,0 +1,151 @@
+# app/sales_history.py
+# Sales history in keyset pages, newest first: each request asks for the rows
+# strictly older than the last (created_at, id) seen, so nothing is skipped or
+# repeated however many sales land in the range. Only a bounded window of rows
+# is kept; counts and sums cover every page that was fetched.
+import os
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+from api_client import api_get
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "200"))
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "2000"))
+# per-day request size when the API ignores the cursor (see HistoryPager._fetch_day)
+HISTORY_DAY_LIMIT = int(os.getenv("HISTORY_DAY_LIMIT", "5000"))
+
+Cursor = tuple[str, int]
+
+
+def sale_key(row: dict) -> Cursor:
+    try:
+        sale_id = int(row.get("id") or 0)
+    except (TypeError, ValueError):
+        sale_id = 0
+    return str(row.get("created_at") or ""), sale_id
+
+
+def _day(created_at: str) -> Optional[date]:
+    try:
+        return datetime.fromisoformat(created_at[:19]).date()
+    except ValueError:
+        return None
+
+
+def normalize_sales(rows: list[dict]) -> pd.DataFrame:
+    df = pd.DataFrame(rows)
+    for c in ["id", "receipt_no", "created_at", "customer_name", "location_id", "total"]:
+        if c not in df.columns:
+            df[c] = None
+    df["id"] = pd.to_numeric(df["id"], errors="coerce").fillna(0).astype(int)
+    df["created_at"] = pd.to_datetime(df["created_at"], errors="coerce")
+    df["total"] = pd.to_numeric(df["total"], errors="coerce").fillna(0.0)
+    return df
+
+
+class HistoryPager:
+    """Lazily loaded /sales/history for one date range."""
+
+    def __init__(
+        self,
+        start_date: date,
+        end_date: date,
+        page_size: int = HISTORY_PAGE_SIZE,
+        window: int = HISTORY_WINDOW,
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.page_size = page_size
+        self.window = window
+
+        self.count = 0
+        self.total = 0.0
+        self.dropped = 0        # rows fetched but no longer held in the window
+        self.exhausted = False
+        self.truncated = False  # a day hit HISTORY_DAY_LIMIT on an API without cursors
+        self.cursor: Optional[Cursor] = None
+        self.keyset = True      # False once the API is seen to ignore the cursor
+        self._day: Optional[date] = None
+
+        self._pages: deque[pd.DataFrame] = deque()
+        self._rows = 0
+        self._frame: Optional[pd.DataFrame] = None
+
+    def __len__(self) -> int:
+        return self._rows
+
+    # ---- fetching ----
+    def load_more(self) -> int:
+        """Fetch the next page into the window; returns how many new rows arrived."""
+        rows = self.next_page()
+        if rows:
+            self._append(rows)
+        return len(rows)
+
+    def next_page(self) -> list[dict]:
+        """Fetch the next page and move the cursor past it, without keeping the rows."""
+        if self.exhausted:
+            return []
+        rows = self._fetch_page() if self.keyset else self._fetch_day()
+        if rows:
+            self.cursor = sale_key(rows[-1])
+        return rows
+
+    def _params(self, start: date, end: date, limit: int) -> dict:
+        return {"start_date": start.isoformat(), "end_date": end.isoformat(), "limit": int(limit)}
+
+    def _fetch_page(self) -> list[dict]:
+        params = self._params(self.start_date, self.end_date, self.page_size)
+        if self.cursor is not None:
+            params["before_created_at"], params["before_id"] = self.cursor
+        rows = sorted(api_get("/sales/history", params=params, timeout=20) or [], key=sale_key, reverse=True)
+
+        if self.cursor is not None and rows and sale_key(rows[0]) >= self.cursor:
+            # the API sent the newest rows again: it does not know the cursor
+            self.keyset = False
+            self._day = _day(self.cursor[0]) or self.end_date
+            return self._fetch_day()
+
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        return rows
+
+    def _fetch_day(self) -> list[dict]:
+        # one whole day per request, walking back from the cursor's day
+        while self._day is not None and self._day >= self.start_date:
+            day, self._day = self._day, self._day - timedelta(days=1)
+            rows = api_get("/sales/history", params=self._params(day, day, HISTORY_DAY_LIMIT), timeout=20) or []
+            if len(rows) >= HISTORY_DAY_LIMIT:
+                self.truncated = True
+            rows = sorted(rows, key=sale_key, reverse=True)
+            if self.cursor is not None:
+                rows = [r for r in rows if sale_key(r) < self.cursor]
+            if rows:
+                return rows
+        self.exhausted = True
+        return []
+
+    def _append(self, rows: list[dict]):
+        page = normalize_sales(rows)
+        self.count += len(page)
+        self.total += float(page["total"].sum())
+
+        self._pages.append(page)
+        self._rows += len(page)
+        # the window keeps the most recently fetched pages (the oldest sales)
+        while self._rows > self.window and len(self._pages) > 1:
+            old = self._pages.popleft()
+            self._rows -= len(old)
+            self.dropped += len(old)
+        self._frame = None
+
+    # ---- reading ----
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            self._frame = (
+                pd.concat(list(self._pages), ignore_index=True) if self._pages else normalize_sales([])
+            )
+        return self._frame
@@ -0,0 +1,431 @@
+# app/sales_mirror.py
+# Local copy of sales headers and lines (SQLite, WAL) for date / location /
+# payment-method slicing without an API round trip. A background thread pulls
+# new sales past a (created_at, id) watermark; line items are backfilled from
+# GET /sales/{id}, and a sale is re-read whenever its "sale:{id}" tag is invalidated.
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+import requests
+import streamlit as st
+
+from api_client import api_get
+from cache import get_cache
+from health import get_health_monitor
+from sale_docs import parse_sale_response
+from sales_history import HistoryPager, normalize_sales, sale_key
+from storage import DATA_DIR
+
+MIRROR_DB = os.getenv("SALES_MIRROR_DB", os.path.join(DATA_DIR, "sales_mirror.db"))
+MIRROR_INTERVAL = float(os.getenv("SALES_MIRROR_INTERVAL", "30"))
+# how far back the first sync goes
+MIRROR_DAYS = int(os.getenv("SALES_MIRROR_DAYS", "400"))
+MIRROR_PAGE_SIZE = 500
+# each pass re-reads this far behind the last one: a sale that shows up late (two
+# tills in the same second, a slow commit) can sort below one already mirrored.
+# Keep it >= DAY_BUCKETS_GRACE_MINUTES so a day is never settled without it.
+SYNC_OVERLAP = timedelta(minutes=int(os.getenv("SALES_MIRROR_OVERLAP_MINUTES", "15")))
+# sale documents fetched per pass while backfilling line items
+LINES_BATCH = int(os.getenv("SALES_MIRROR_LINES_BATCH", "50"))
+# ...and per second at most, so a first backfill of MIRROR_DAYS is a trickle, not a flood
+LINES_RATE = float(os.getenv("SALES_MIRROR_LINES_RATE", "5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    location_id INTEGER,
+    payment_method TEXT,
+    customer_name TEXT,
+    receipt_no TEXT,
+    total REAL NOT NULL DEFAULT 0,
+    lines_synced INTEGER NOT NULL DEFAULT 0
+);
+-- covering indexes: range aggregates never touch the table rows
+CREATE INDEX IF NOT EXISTS ix_sales_day ON sales (day, location_id, payment_method, total);
+CREATE INDEX IF NOT EXISTS ix_sales_location_day ON sales (location_id, day, total);
+CREATE INDEX IF NOT EXISTS ix_sales_created ON sales (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_sales_lines_todo ON sales (lines_synced, id);
+CREATE TABLE IF NOT EXISTS sale_lines (
+    sale_id INTEGER NOT NULL,
+    line_no INTEGER NOT NULL,
+    sku TEXT,
+    product_name TEXT,
+    qty REAL,
+    unit_price REAL,
+    line_total REAL,
+    PRIMARY KEY (sale_id, line_no)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_sale_lines_sku ON sale_lines (sku, sale_id, qty, line_total);
+CREATE TABLE IF NOT EXISTS mirror_state (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_UPSERT_SALE = """
+INSERT INTO sales (id, created_at, day, location_id, payment_method, customer_name, receipt_no, total)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    created_at = excluded.created_at,
+    day = excluded.day,
+    location_id = excluded.location_id,
+    payment_method = COALESCE(excluded.payment_method, sales.payment_method),
+    customer_name = excluded.customer_name,
+    receipt_no = excluded.receipt_no,
+    total = excluded.total,
+    -- a changed total means lines were added: read the document again
+    lines_synced = CASE WHEN sales.total = excluded.total THEN sales.lines_synced ELSE 0 END
+-- an unchanged row is left alone, so total_changes counts real changes only
+WHERE sales.created_at IS NOT excluded.created_at
+    OR sales.location_id IS NOT excluded.location_id
+    OR sales.payment_method IS NOT COALESCE(excluded.payment_method, sales.payment_method)
+    OR sales.customer_name IS NOT excluded.customer_name
+    OR sales.receipt_no IS NOT excluded.receipt_no
+    OR sales.total IS NOT excluded.total
+"""
+
+
+def _num(x, default=0.0) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return default
+
+
+def _when(created_at: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(created_at[:19])
+    except ValueError:
+        return None
+
+
+def _sale_row(sale: dict) -> tuple:
+    created_at, sale_id = sale_key(sale)
+    created_at = created_at.replace("T", " ")
+    return (
+        sale_id,
+        created_at,
+        created_at[:10],
+        sale.get("location_id"),
+        sale.get("payment_method"),
+        sale.get("customer_name"),
+        sale.get("receipt_no"),
+        _num(sale.get("total", sale.get("total_amount"))),
+    )
+
+
+class SalesMirror:
+    def __init__(self, path: str = MIRROR_DB, interval: float = MIRROR_INTERVAL):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self.last_error: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        # bumped on every write; keys frames / rollups built from the mirror
+        self.version = 0
+
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mxp-sales-mirror", daemon=True)
+        self._thread.start()
+        get_cache().on_invalidate(self._on_invalidate)
+
+    # ---- reads ----
+    def since(self) -> Optional[date]:
+        """First day the mirror is complete from; None until the first sync finished."""
+        value = self._state("since")
+        return date.fromisoformat(value) if value else None
+
+    def covers(self, start_date: date) -> bool:
+        since = self.since()
+        return since is not None and start_date >= since
+
+    def _where(self, start_date: date, end_date: date, location_id=None, payment_method=None) -> tuple[str, list]:
+        sql = " WHERE day BETWEEN ? AND ?"
+        args: list = [start_date.isoformat(), end_date.isoformat()]
+        if location_id is not None:
+            sql += " AND location_id = ?"
+            args.append(int(location_id))
+        if payment_method:
+            sql += " AND payment_method = ?"
+            args.append(payment_method)
+        return sql, args
+
+    def totals(self, start_date: date, end_date: date, location_id=None, payment_method=None) -> tuple[int, float]:
+        where, args = self._where(start_date, end_date, location_id, payment_method)
+        with self._lock:
+            row = self._db.execute("SELECT COUNT(*), COALESCE(SUM(total), 0) FROM sales" + where, args).fetchone()
+        return int(row[0]), float(row[1])
+
+    def daily(self, start_date: date, end_date: date, location_id=None, payment_method=None) -> pd.DataFrame:
+        where, args = self._where(start_date, end_date, location_id, payment_method)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT day AS date, SUM(total) AS total, COUNT(*) AS sales FROM sales" + where + " GROUP BY day ORDER BY day",
+                args,
+            ).fetchall()
+        return pd.DataFrame([dict(r) for r in rows], columns=["date", "total", "sales"])
+
+    def sales(
+        self,
+        start_date: date,
+        end_date: date,
+        location_id=None,
+        payment_method=None,
+        search: str = "",
+        limit: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Sale headers in the range, newest first."""
+        where, args = self._where(start_date, end_date, location_id, payment_method)
+        if search:
+            where += " AND (CAST(id AS TEXT) LIKE ? OR receipt_no LIKE ? OR customer_name LIKE ?)"
+            args += [f"%{search}%"] * 3
+        sql = (
+            "SELECT id, receipt_no, created_at, customer_name, location_id, payment_method, total FROM sales"
+            + where
+            + " ORDER BY created_at DESC, id DESC"
+        )
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return normalize_sales([dict(r) for r in rows])
+
+    def pulled_at(self) -> Optional[datetime]:
+        """Start of the last complete sync pass: every sale made before it is mirrored."""
+        value = self._state("pulled_at")
+        return datetime.fromtimestamp(float(value)) if value else None
+
+    def sale_day(self, sale_id: int) -> Optional[date]:
+        with self._lock:
+            row = self._db.execute("SELECT day FROM sales WHERE id = ?", (int(sale_id),)).fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def unsettled_days(self, start_date: date, end_date: date) -> set[date]:
+        """Days in the range with sales whose document has not been (re-)read yet."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT day FROM sales WHERE lines_synced = 0 AND day BETWEEN ? AND ?",
+                (start_date.isoformat(), end_date.isoformat()),
+            ).fetchall()
+        return {date.fromisoformat(r[0]) for r in rows if r[0]}
+
+    def lines(self, start_date: date, end_date: date, location_id=None, payment_method=None) -> pd.DataFrame:
+        """Line items of the sales in the range, with each sale's time, location and method."""
+        where, args = self._where(start_date, end_date, location_id, payment_method)
+        sql = (
+            "SELECT l.sale_id, s.created_at, s.location_id, s.payment_method, l.sku, l.product_name, l.qty, l.line_total"
+            " FROM sales s JOIN sale_lines l ON l.sale_id = s.id" + where
+        )
+        with self._lock:
+            return pd.read_sql_query(sql, self._db, params=args)
+
+    def pending_lines(self, start_date: date, end_date: date) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM sales WHERE lines_synced = 0 AND day BETWEEN ? AND ?",
+                (start_date.isoformat(), end_date.isoformat()),
+            ).fetchone()[0]
+
+    def payment_methods(self) -> list[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT payment_method FROM sales WHERE payment_method IS NOT NULL").fetchall()
+        return sorted(r[0] for r in rows)
+
+    # ---- sync ----
+    def _state(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM mirror_state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, **values):
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO mirror_state (name, value) VALUES (?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                [(k, str(v)) for k, v in values.items()],
+            )
+
+    def _upsert(self, rows: list[dict]) -> int:
+        """Insert or update sale headers (and lines when present); returns the rows changed."""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(_UPSERT_SALE, [_sale_row(r) for r in rows])
+                for r in rows:
+                    if isinstance(r.get("lines"), list):
+                        self._write_lines(int(r["id"]), r["lines"])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            changed = self._db.total_changes - before
+            if changed:
+                self.version += 1
+        return changed
+
+    def _write_lines(self, sale_id: int, lines: list):
+        # caller holds the lock (and the transaction)
+        self._db.execute("DELETE FROM sale_lines WHERE sale_id = ?", (sale_id,))
+        self._db.executemany(
+            "INSERT INTO sale_lines (sale_id, line_no, sku, product_name, qty, unit_price, line_total)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    sale_id,
+                    i,
+                    str(ln.get("sku") or ""),
+                    str(ln.get("product_name") or ln.get("name") or ""),
+                    _num(ln.get("qty")),
+                    _num(ln.get("unit_price")),
+                    _num(ln.get("line_total"), _num(ln.get("qty")) * _num(ln.get("unit_price"))),
+                )
+                for i, ln in enumerate(lines)
+            ],
+        )
+        self._db.execute("UPDATE sales SET lines_synced = 1 WHERE id = ?", (sale_id,))
+
+    def sync(self) -> int:
+        """Pull sales from shortly before the last pass; returns how many rows changed.
+
+        The window starts SYNC_OVERLAP before the older of the watermark and the
+        previous pass, so a sale that became visible after that pass is read even
+        when a newer one already moved the watermark past it. Rows that did not
+        change are no-ops in _upsert, so the overlap costs no version bump.
+        """
+        watermark = self._state("watermark")
+        mark = None
+        if watermark:
+            created_at, _, sale_id = watermark.rpartition("|")
+            mark = (created_at, int(sale_id))
+        floor = None
+        if mark and _when(mark[0]):
+            floor = _when(mark[0])
+            pulled_at = self.pulled_at()
+            if pulled_at is not None:
+                floor = min(floor, pulled_at)
+            floor -= SYNC_OVERLAP
+        started = time.time()
+        today = date.today()
+        if floor is not None:
+            start = floor.date()
+        else:
+            start = date.fromisoformat(mark[0][:10]) if mark else today - timedelta(days=MIRROR_DAYS)
+
+        def recent(row: dict) -> bool:
+            when = _when(sale_key(row)[0])
+            return floor is None or when is None or when >= floor
+
+        pager = HistoryPager(start, today, page_size=MIRROR_PAGE_SIZE, window=0)
+        newest = mark
+        written = 0
+        while True:
+            rows = pager.next_page()
+            if not rows:
+                break
+            # the pager starts at the window's day: rows older than the window are stored already
+            window = [r for r in rows if recent(r)]
+            if window:
+                written += self._upsert(window)
+                top = sale_key(window[0])
+                newest = top if newest is None or top > newest else newest
+            if not recent(rows[-1]):
+                break
+
+        # the watermark only moves once everything newer than it is stored
+        state = {"pulled_at": started}
+        if newest:
+            state["watermark"] = f"{newest[0]}|{newest[1]}"
+        if self.since() is None:
+            state["since"] = start.isoformat()
+        self._set_state(**state)
+        self.synced_at = time.time()
+        return written
+
+    def backfill_lines(self, limit: int = LINES_BATCH) -> int:
+        with self._lock:
+            ids = [
+                r[0]
+                for r in self._db.execute(
+                    "SELECT id FROM sales WHERE lines_synced = 0 ORDER BY id DESC LIMIT ?", (int(limit),)
+                )
+            ]
+        pause = 1.0 / LINES_RATE if LINES_RATE > 0 else 0.0
+        for i, sale_id in enumerate(ids):
+            if i and pause:
+                time.sleep(pause)
+            try:
+                data = api_get(f"/sales/{sale_id}", timeout=20)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                # deleted on the server
+                with self._lock:
+                    self._db.execute("DELETE FROM sale_lines WHERE sale_id = ?", (sale_id,))
+                    self._db.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
+                continue
+            sale, lines = parse_sale_response(data)
+            with self._lock:
+                self._db.execute("BEGIN")
+                try:
+                    if sale and sale.get("created_at"):
+                        self._db.execute(_UPSERT_SALE, _sale_row({**sale, "id": sale_id}))
+                    elif sale:
+                        total = sale.get("total", sale.get("total_amount"))
+                        if total is not None:
+                            self._db.execute("UPDATE sales SET total = ? WHERE id = ?", (_num(total), sale_id))
+                    self._write_lines(sale_id, lines)
+                    self._db.execute("COMMIT")
+                except Exception:
+                    self._db.execute("ROLLBACK")
+                    raise
+        if ids:
+            with self._lock:
+                self.version += 1
+        return len(ids)
+
+    def sync_now(self):
+        self._wake.set()
+
+    def _run(self):
+        wait = 0.0
+        while True:
+            self._wake.wait(wait)
+            self._wake.clear()
+            wait = self.interval
+            if not get_health_monitor().is_available():
+                continue
+            try:
+                self.sync()
+                # keep going while there is a backlog of documents to read
+                if self.backfill_lines() >= LINES_BATCH:
+                    wait = 1.0
+                self.last_error = None
+            except Exception as e:
+                # reads keep serving what is already mirrored
+                self.last_error = str(e)
+
+    def _on_invalidate(self, tags: frozenset):
+        stale = [int(t.split(":", 1)[1]) for t in tags if t.startswith("sale:") and t.split(":", 1)[1].isdigit()]
+        if stale:
+            with self._lock:
+                self._db.executemany("UPDATE sales SET lines_synced = 0 WHERE id = ?", [(s,) for s in stale])
+        if stale or "sales" in tags:
+            self._wake.set()
+
+
+@st.cache_resource
+def get_sales_mirror() -> SalesMirror:
+    return SalesMirror()
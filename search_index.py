@@ -0,0 +1,136 @@
+# app/search_index.py
+import bisect
+import re
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+import streamlit as st
+
+# Ranks (lower is better)
+RANK_EXACT = 0      # SKU / barcode equals the query
+RANK_PREFIX = 1     # a name word, the SKU or the barcode starts with the query
+RANK_SUBSTRING = 2  # query appears anywhere in name / SKU / barcode
+RANK_FUZZY = 3      # enough shared trigrams (typos), used when nothing else matched
+
+FUZZY_MIN_OVERLAP = 0.6
+_WS = re.compile(r"\s+")
+
+
+def _norm(s) -> str:
+    return _WS.sub(" ", str(s or "").strip().lower())
+
+
+def _trigrams(s: str) -> set[str]:
+    padded = f" {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Prefix + trigram index over name, SKU and barcode. Results are catalog SKUs."""
+
+    def __init__(self, products: list[dict]):
+        self.skus: list[str] = []
+        texts: list[str] = []
+        self._exact: dict[str, int] = {}
+        tokens: list[tuple[str, int]] = []
+        postings: dict[str, list[int]] = defaultdict(list)
+
+        for p in products:
+            sku = str(p.get("sku") or "").strip()
+            if not sku:
+                continue
+            i = len(self.skus)
+            self.skus.append(sku)
+
+            name = _norm(p.get("name"))
+            sku_n = _norm(sku)
+            barcode = _norm(p.get("barcode"))
+            text = " ".join(x for x in (name, sku_n, barcode) if x)
+            texts.append(text)
+
+            self._exact.setdefault(sku_n, i)
+            if barcode:
+                self._exact.setdefault(barcode, i)
+
+            for tok in set(name.split(" ")) | {sku_n, barcode, name}:
+                if tok:
+                    tokens.append((tok, i))
+            for g in _trigrams(text):
+                postings[g].append(i)
+
+        tokens.sort()
+        self._tok_keys = [t for t, _ in tokens]
+        self._tok_ids = np.asarray([i for _, i in tokens], dtype=np.int32)
+        self._text = np.asarray(texts, dtype=str)
+        # ids are appended in order, so every posting list is already sorted
+        self._grams = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+    def lookup(self, code: str) -> Optional[str]:
+        """Exact SKU / barcode match (scanner path)."""
+        i = self._exact.get(_norm(code))
+        return None if i is None else self.skus[i]
+
+    def search(self, query: str, limit: Optional[int] = None, fuzzy: bool = True) -> list[str]:
+        q = _norm(query)
+        if not q:
+            return self.skus[:limit] if limit else list(self.skus)
+
+        n = len(self.skus)
+        rank = np.full(n, 255, dtype=np.uint8)
+        score = np.zeros(n, dtype=np.float32)
+
+        # prefix: contiguous slice of the sorted token list
+        lo = bisect.bisect_left(self._tok_keys, q)
+        hi = bisect.bisect_left(self._tok_keys, q + "\uffff", lo)
+        if hi > lo:
+            rank[self._tok_ids[lo:hi]] = RANK_PREFIX
+
+        # substring: intersect trigram postings, then confirm on the candidates only
+        grams = {q[i:i + 3] for i in range(len(q) - 2)}
+        if grams:
+            lists = [self._grams.get(g) for g in grams]
+            if all(ids is not None for ids in lists):
+                lists.sort(key=len)
+                cand = lists[0]
+                for ids in lists[1:]:
+                    cand = np.intersect1d(cand, ids, assume_unique=True)
+                    if not len(cand):
+                        break
+                if len(cand):
+                    cand = cand[np.char.find(self._text[cand], q) >= 0]
+                    rank[cand] = np.minimum(rank[cand], RANK_SUBSTRING)
+        else:
+            # 1-2 characters have no trigram: scan the texts directly
+            cand = np.nonzero(np.char.find(self._text, q) >= 0)[0]
+            rank[cand] = np.minimum(rank[cand], RANK_SUBSTRING)
+
+        exact = self._exact.get(q)
+        if exact is not None:
+            rank[exact] = RANK_EXACT
+
+        # fuzzy only when nothing matched literally, so typos still find the item
+        # without padding good results with look-alikes
+        if fuzzy and len(q) >= 4 and not (rank < 255).any():
+            present = [self._grams[g] for g in grams if g in self._grams]
+            if present:
+                counts = np.bincount(np.concatenate(present), minlength=n)
+                need = max(2, int(np.ceil(len(grams) * FUZZY_MIN_OVERLAP)))
+                fz = np.nonzero((counts >= need) & (rank == 255))[0]
+                rank[fz] = RANK_FUZZY
+                score[fz] = -counts[fz] / len(grams)
+
+        ids = np.nonzero(rank < 255)[0]
+        ids = ids[np.lexsort((ids, score[ids], rank[ids]))]
+        if limit:
+            ids = ids[:limit]
+        return [self.skus[i] for i in ids.tolist()]
+
+
+@st.cache_resource(max_entries=4)
+def get_search_index(version: int, _products: list[dict]) -> SearchIndex:
+    # one index per catalog version, shared by every session
+    return SearchIndex(_products)
@@ -0,0 +1,170 @@
+# app/spooler.py
+# Print spooler: receipts are written to a SQLite queue first and printed by one
+# worker thread per printer, so checkout never waits on (or loses a job to) a
+# printer that is slow, out of paper or briefly offline.
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import streamlit as st
+
+import escpos
+from storage import DATA_DIR
+
+SPOOL_DB = os.getenv("PRINT_SPOOL_DB", os.path.join(DATA_DIR, "print_spool.db"))
+MAX_ATTEMPTS = int(os.getenv("PRINT_MAX_ATTEMPTS", "20"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+QUEUED = "queued"
+PRINTING = "printing"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS print_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    printer TEXT NOT NULL,
+    sale_id INTEGER,
+    doc_type TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_print_jobs_due ON print_jobs (printer, status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS ix_print_jobs_sale ON print_jobs (sale_id, id);
+"""
+
+
+def backoff(attempts: int) -> float:
+    # exponential with jitter so several tills don't hammer a printer in step
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, attempts - 1)) * random.uniform(0.8, 1.2)
+
+
+class PrintSpooler:
+    def __init__(self, path: str = SPOOL_DB):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        # a job that was mid-print when the process died goes back in the queue
+        self._db.execute("UPDATE print_jobs SET status = ? WHERE status = ?", (QUEUED, PRINTING))
+
+        self._workers: dict[str, tuple[threading.Thread, threading.Event]] = {}
+        for (printer,) in self._db.execute("SELECT DISTINCT printer FROM print_jobs WHERE status = ?", (QUEUED,)):
+            self._worker(printer)
+
+    # ---- API ----
+    def submit(self, printer: str, payload: bytes, sale_id: Optional[int] = None, doc_type: str = "Receipt") -> int:
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO print_jobs (printer, sale_id, doc_type, payload, status, next_attempt_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (printer, sale_id, doc_type, payload, QUEUED, now, now, now),
+            )
+            job_id = cur.lastrowid
+        self._worker(printer).set()
+        return job_id
+
+    def reprint(self, sale_id: int, printer: Optional[str] = None) -> Optional[int]:
+        """Queue the last job printed for this sale again; None when it was never spooled."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT printer, doc_type, payload FROM print_jobs WHERE sale_id = ? ORDER BY id DESC LIMIT 1",
+                (int(sale_id),),
+            ).fetchone()
+        if row is None:
+            return None
+        return self.submit(printer or row["printer"], row["payload"], int(sale_id), row["doc_type"])
+
+    def jobs(self, limit: int = 10, sale_id: Optional[int] = None) -> list[dict]:
+        sql = "SELECT id, printer, sale_id, doc_type, status, attempts, last_error, created_at, updated_at FROM print_jobs"
+        args: tuple = ()
+        if sale_id is not None:
+            sql += " WHERE sale_id = ?"
+            args = (int(sale_id),)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY id DESC LIMIT ?", args + (int(limit),)).fetchall()
+        return [dict(r) for r in rows]
+
+    def pending(self, printer: Optional[str] = None) -> int:
+        sql = "SELECT COUNT(*) FROM print_jobs WHERE status IN (?, ?)"
+        args: tuple = (QUEUED, PRINTING)
+        if printer:
+            sql += " AND printer = ?"
+            args += (printer,)
+        with self._lock:
+            return self._db.execute(sql, args).fetchone()[0]
+
+    # ---- workers ----
+    def _worker(self, printer: str) -> threading.Event:
+        with self._lock:
+            hit = self._workers.get(printer)
+            if hit is None:
+                wake = threading.Event()
+                t = threading.Thread(target=self._run, args=(printer, wake), name=f"mxp-print-{printer}", daemon=True)
+                hit = self._workers[printer] = (t, wake)
+                t.start()
+            return hit[1]
+
+    def _claim(self, printer: str) -> tuple[Optional[sqlite3.Row], float]:
+        # (next due job, seconds until the next queued one is due)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, payload, attempts FROM print_jobs WHERE printer = ? AND status = ? AND next_attempt_at <= ?"
+                " ORDER BY id LIMIT 1",
+                (printer, QUEUED, now),
+            ).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE print_jobs SET status = ?, updated_at = ? WHERE id = ?", (PRINTING, now, row["id"]))
+                return row, 0.0
+            nxt = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM print_jobs WHERE printer = ? AND status = ?", (printer, QUEUED)
+            ).fetchone()[0]
+        return None, (max(0.0, nxt - now) if nxt is not None else BACKOFF_MAX)
+
+    def _finish(self, job_id: int, status: str, attempts: int, error: Optional[str] = None, retry_in: float = 0.0):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE print_jobs SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (status, attempts, error, now + retry_in, now, job_id),
+            )
+
+    def _run(self, printer: str, wake: threading.Event):
+        while True:
+            row, wait = self._claim(printer)
+            if row is None:
+                wake.wait(wait)
+                wake.clear()
+                continue
+
+            attempts = row["attempts"] + 1
+            try:
+                escpos.send(row["payload"], target=printer)
+            except Exception as e:
+                # OSError: printer offline / out of paper; anything else (e.g. a bad
+                # ESCPOS_PRINTER) must not kill the worker and strand the job
+                if attempts >= MAX_ATTEMPTS:
+                    self._finish(row["id"], FAILED, attempts, str(e))
+                else:
+                    self._finish(row["id"], QUEUED, attempts, str(e), retry_in=backoff(attempts))
+                continue
+            self._finish(row["id"], DONE, attempts)
+
+
+@st.cache_resource
+def get_spooler() -> PrintSpooler:
+    return PrintSpooler()
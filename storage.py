@@ -0,0 +1,6 @@
+# app/storage.py
+# Where the app keeps its local SQLite files (print spool, offline journal,
+# sales mirror, dashboard buckets). Mount a volume here in production.
+import os
+
+DATA_DIR = os.getenv("MXP_DATA_DIR", "data")
@@ -0,0 +1,118 @@
+# tests/conftest.py
+# A local stand-in for the MXP API: a real HTTP server on 127.0.0.1 whose routes
+# each test defines, so the client code runs over its normal requests session.
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    params: dict
+    headers: dict
+    body: object
+
+
+@dataclass
+class Reply:
+    status: int = 200
+    body: object = None
+    headers: dict = field(default_factory=dict)
+
+
+Route = Callable[[Request], Reply]
+
+
+class StubAPI:
+    def __init__(self):
+        self.routes: dict[tuple[str, str], Route] = {}
+        self.requests: list[Request] = []
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _handle(self, method: str):
+                url = urlparse(self.path)
+                n = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(n) if n else b""
+                req = Request(
+                    method,
+                    url.path,
+                    {k: v[-1] for k, v in parse_qs(url.query).items()},
+                    {k.lower(): v for k, v in self.headers.items()},
+                    json.loads(raw) if raw else None,
+                )
+                api.requests.append(req)
+                route = api.routes.get((method, url.path))
+                reply = route(req) if route else Reply(404, {"detail": "not found"})
+                payload = b"" if reply.body is None else json.dumps(reply.body).encode()
+                try:
+                    self.send_response(reply.status)
+                    for k, v in reply.headers.items():
+                        self.send_header(k, v)
+                    if reply.status != 304:
+                        self.send_header("Content-Type", "application/json")
+                        self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    if reply.status != 304:
+                        self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out before a stalled reply
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def route(self, method: str, path: str, fn: Route):
+        self.routes[(method, path)] = fn
+
+    def calls(self, method: str, path: str) -> list[Request]:
+        return [r for r in self.requests if r.method == method and r.path == path]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_api(monkeypatch) -> StubAPI:
+    import api_client
+
+    api = StubAPI()
+    monkeypatch.setattr(api_client, "API_BASE", api.url)
+    yield api
+    api.close()
+
+
+@pytest.fixture
+def session_state(monkeypatch) -> dict:
+    # api_client keeps in-flight idempotency keys in st.session_state
+    import api_client
+
+    state: dict = {}
+
+    class _St:
+        session_state = state
+
+    monkeypatch.setattr(api_client, "st", _St)
+    return state
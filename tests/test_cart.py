@@ -0,0 +1,29 @@
+# tests/test_cart.py
+from decimal import Decimal
+
+import pytest
+
+from cart import Cart, InsufficientStock
+
+
+def test_set_qty_cap_snaps_down_to_step():
+    cart = Cart()
+    cart.add("RICE", "Rice", "kg", 12.5, 1, available=5.55)
+    assert cart.set_qty("RICE", 9, available=5.55) == Decimal("5.500")
+    assert cart.get("RICE").line_total == Decimal("68.75")
+    assert cart.total == Decimal("68.75")
+
+
+def test_set_qty_below_one_step_of_stock_removes_line():
+    cart = Cart()
+    cart.add("OIL", "Oil", "piece", 20, 0.5, available=0.5)
+    assert cart.set_qty("OIL", 2, available=0.4) == Decimal("0")
+    assert "OIL" not in cart
+
+
+def test_add_over_stock_raises():
+    cart = Cart()
+    cart.add("OIL", "Oil", "piece", 20, 1, available=1)
+    with pytest.raises(InsufficientStock):
+        cart.add("OIL", "Oil", "piece", 20, 0.5, available=1)
+    assert cart.get("OIL").qty == Decimal("1.000")
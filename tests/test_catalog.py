@@ -0,0 +1,91 @@
+# tests/test_catalog.py
+import threading
+import time
+
+import pytest
+
+import catalog
+from conftest import Reply
+
+PRODUCTS = [{"id": 1, "sku": "A1", "name": "Rice 5kg"}, {"id": 2, "sku": "B2", "name": "Oil 1L"}]
+
+
+class DownHealth:
+    # keeps the refresh thread idle; the tests refresh by hand
+    def is_available(self) -> bool:
+        return False
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(catalog, "get_health_monitor", lambda: DownHealth())
+    return catalog.CatalogService(interval=3600)
+
+
+def test_unchanged_products_keep_version(stub_api, service):
+    products = [dict(p) for p in PRODUCTS]
+    stub_api.route("GET", "/products", lambda req: Reply(200, products))
+
+    service.refresh_products()
+    version, rows = service.products_version, service._products
+    service.refresh_products()
+    service.refresh_products()
+    assert service.products_version == version
+    assert service._products is rows
+
+    products[0] = {**products[0], "name": "Rice 10kg"}
+    service.refresh_products()
+    assert service.products_version == version + 1
+    assert service._products[0]["name"] == "Rice 10kg"
+
+
+def test_adjust_stock_does_not_wait_on_a_stalled_sync(stub_api, service):
+    release = threading.Event()
+    stalled = threading.Event()
+
+    def with_stock(req):
+        if req.params["location_id"] == "2" or stalled.is_set():
+            stalled.set()
+            release.wait(5)
+        return Reply(200, [{"sku": "A1", "name": "Rice 5kg", "available_qty": 10.0}])
+
+    stub_api.route("GET", "/products/with_stock", with_stock)
+    service.refresh_stock(1)
+
+    slow = threading.Thread(target=service.refresh_stock, args=(2,))
+    slow.start()
+    assert stalled.wait(2)
+    try:
+        t = time.monotonic()
+        service.adjust_stock(1, {"A1": -2.0})
+        assert time.monotonic() - t < 0.5
+        assert service.stock_snapshot(1)[1][0]["available_qty"] == 8.0
+    finally:
+        release.set()
+        slow.join(5)
+
+
+def test_response_predating_a_local_sale_is_not_applied(stub_api, service):
+    release = threading.Event()
+    fetching = threading.Event()
+    replies = []
+
+    def with_stock(req):
+        if replies:
+            fetching.set()
+            release.wait(5)
+        replies.append(req)
+        return Reply(200, [{"sku": "A1", "name": "Rice 5kg", "available_qty": 10.0}])
+
+    stub_api.route("GET", "/products/with_stock", with_stock)
+    service.refresh_stock(1)
+
+    sync = threading.Thread(target=service.refresh_stock, args=(1,))
+    sync.start()
+    assert fetching.wait(2)
+    service.adjust_stock(1, {"A1": -2.0})
+    release.set()
+    sync.join(5)
+
+    # the in-flight response still said 10: the local sale stands until the next sync
+    assert service.peek_stock(1, max_age=None)[1][0]["available_qty"] == 8.0
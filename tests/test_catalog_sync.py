@@ -0,0 +1,106 @@
+# tests/test_catalog_sync.py
+from catalog_sync import StockSnapshot
+from conftest import Reply
+
+ROWS = [
+    {"sku": "A1", "name": "Rice 5kg", "available_qty": 10.0},
+    {"sku": "B2", "name": "Oil 1L", "available_qty": 4.0},
+]
+
+
+def delta_backend(stub_api, replies):
+    # replies: one Reply per expected GET /products/with_stock, in order
+    queue = list(replies)
+    stub_api.route("GET", "/products/with_stock", lambda req: queue.pop(0))
+
+
+def test_full_list_then_304(stub_api):
+    delta_backend(
+        stub_api,
+        [
+            Reply(200, ROWS, {"ETag": '"v1"', "X-Catalog-Version": "1"}),
+            Reply(304),
+        ],
+    )
+    snap = StockSnapshot(1)
+
+    assert snap.sync() is True
+    assert [r["sku"] for r in snap.as_list()] == ["A1", "B2"]
+    assert snap.version == "1" and snap.etag == '"v1"'
+
+    assert snap.sync() is False
+    second = stub_api.calls("GET", "/products/with_stock")[1]
+    assert second.params == {"location_id": "1", "since": "1"}
+    assert second.headers["if-none-match"] == '"v1"'
+    assert snap.not_modified == 1
+
+
+def test_delta_applies_changes_and_deletes(stub_api):
+    delta_backend(
+        stub_api,
+        [
+            Reply(200, {"version": 1, "changed": ROWS, "full": True}),
+            Reply(200, {"version": 2, "changed": [{"sku": "A1", "available_qty": 7.0}], "deleted": ["B2"]}),
+            Reply(200, {"version": 2, "changed": [], "deleted": []}),
+        ],
+    )
+    snap = StockSnapshot(1)
+    snap.sync()
+
+    assert snap.sync() is True
+    assert snap.as_list() == [{"sku": "A1", "name": "Rice 5kg", "available_qty": 7.0}]
+    assert snap.version == "2" and snap.delta_syncs == 1
+
+    before = snap.as_list()
+    assert snap.sync() is False
+    assert snap.as_list() is before
+
+
+def test_same_full_list_keeps_row_objects(stub_api):
+    delta_backend(stub_api, [Reply(200, ROWS), Reply(200, [dict(r) for r in ROWS])])
+    snap = StockSnapshot(1)
+    snap.sync()
+    before = snap.as_list()
+
+    assert snap.sync() is False
+    assert snap.as_list() is before
+    # no version header: the client never sends `since`
+    assert "since" not in stub_api.calls("GET", "/products/with_stock")[1].params
+
+
+def test_adjust_then_resync_ignores_since_and_etag(stub_api):
+    delta_backend(
+        stub_api,
+        [
+            Reply(200, ROWS, {"ETag": '"v1"', "X-Catalog-Version": "1"}),
+            Reply(200, ROWS, {"ETag": '"v1"', "X-Catalog-Version": "1"}),
+            Reply(304),
+        ],
+    )
+    snap = StockSnapshot(1)
+    snap.sync()
+    old_rows = snap.as_list()
+
+    assert snap.adjust({"A1": -3, "ZZ": -1}) is True
+    assert snap.rows["A1"]["available_qty"] == 7.0
+    assert old_rows[0]["available_qty"] == 10.0  # copy-on-write
+
+    # the server's numbers win on the next sync
+    assert snap.sync() is True
+    resync = stub_api.calls("GET", "/products/with_stock")[1]
+    assert "since" not in resync.params and "if-none-match" not in resync.headers
+    assert snap.rows["A1"]["available_qty"] == 10.0
+
+    # and the one after that is a normal conditional request again
+    assert snap.sync() is False
+    assert stub_api.calls("GET", "/products/with_stock")[2].headers["if-none-match"] == '"v1"'
+
+
+def test_adjust_without_resync_keeps_conditional_requests(stub_api):
+    delta_backend(stub_api, [Reply(200, ROWS, {"ETag": '"v1"', "X-Catalog-Version": "1"}), Reply(304)])
+    snap = StockSnapshot(1)
+    snap.sync()
+
+    assert snap.adjust({"B2": -1}, resync=False) is True
+    assert snap.sync() is False
+    assert snap.rows["B2"]["available_qty"] == 3.0
@@ -0,0 +1,40 @@
+# tests/test_day_buckets.py
+from datetime import date, timedelta
+
+import day_buckets
+from day_buckets import DayBuckets, _runs
+
+D = date(2026, 3, 1)
+
+
+def day(n: int) -> date:
+    return D + timedelta(days=n)
+
+
+def test_runs():
+    assert _runs([]) == []
+    assert _runs([day(0), day(1), day(2), day(5), day(7), day(8)]) == [
+        (day(0), day(2)),
+        (day(5), day(5)),
+        (day(7), day(8)),
+    ]
+
+
+def test_daily_fetches_each_run_of_missing_days(tmp_path, monkeypatch):
+    calls = []
+
+    def load_days(start, end, location_id, method):
+        calls.append((start, end))
+        return {start + timedelta(days=i): 1.0 for i in range((end - start).days + 1)}, set()
+
+    monkeypatch.setattr(day_buckets, "_load_days", load_days)
+    monkeypatch.setattr(day_buckets, "last_closed_day", lambda: day(30))
+    buckets = DayBuckets(path=str(tmp_path / "buckets.db"))
+    buckets._store({day(3): 2.0, day(4): 2.0, day(8): 2.0}, 0, "")
+
+    df = buckets.daily(day(0), day(9))
+
+    assert calls == [(day(0), day(2)), (day(5), day(7)), (day(9), day(9))]
+    assert df["total"].sum() == 7 * 1.0 + 3 * 2.0
+    buckets.daily(day(0), day(9))
+    assert len(calls) == 3
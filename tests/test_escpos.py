@@ -0,0 +1,58 @@
+# tests/test_escpos.py
+import socket
+import threading
+
+import pytest
+
+import escpos
+
+COMPANY = {"company_name": "Marvenixx", "address": "Accra", "phone": "020 000 0000", "footer": "Thanks"}
+LINES = [
+    {"product_name": "Jasmine Rice 5kg", "qty": 2, "unit_price": 85.0, "line_total": 170.0},
+    {"product_name": "Cooking Oil", "qty": 1, "unit_price": 30.0},
+]
+
+
+@pytest.fixture
+def fake_printer():
+    """Raw-socket listener standing in for a port-9100 printer; collects each job."""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+    jobs: list[bytes] = []
+
+    def serve():
+        conn, _ = srv.accept()
+        with conn:
+            buf = bytearray()
+            while chunk := conn.recv(4096):
+                buf += chunk
+            jobs.append(bytes(buf))
+
+    t = threading.Thread(target=serve, daemon=True)
+    t.start()
+    yield f"tcp://127.0.0.1:{srv.getsockname()[1]}", jobs, t
+    srv.close()
+
+
+def test_receipt_reaches_printer_as_one_escpos_job(fake_printer):
+    target, jobs, t = fake_printer
+    data = escpos.render_escpos(
+        COMPANY, "Receipt", 42, "2026-10-01T09:30:00", "Ama", "Store", LINES, 200.0,
+        receipt_no="R0042", payment_method="CASH", cash_received=250.0, change_due=50.0,
+    )
+    escpos.send(data, target=target)
+    t.join(timeout=5)
+
+    assert jobs == [data]
+    assert data.startswith(escpos.INIT)  # ESC @
+    assert data.endswith(escpos.FEED_CUT) and data[-4:-2] == b"\x1dV"  # GS V
+    assert b"R0042" in data and b"GHS 200.00" in data
+
+
+def test_unreachable_printer_raises_oserror():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    with pytest.raises(OSError):
+        escpos.send(b"\x1b@", target=f"tcp://127.0.0.1:{port}", timeout=1)
@@ -0,0 +1,110 @@
+# tests/test_idempotency.py
+import threading
+import time
+
+import pytest
+import requests
+
+import journal
+from api_client import api_post_idempotent, inflight_key
+from conftest import Reply
+
+PAYLOAD = {"customer_name": None, "location_id": 1, "payment_method": "CASH", "lines": [{"sku": "A1", "qty": 2.0}]}
+
+
+class SalesBackend:
+    """POST /sales that records each Idempotency-Key once and answers repeats with the first sale."""
+
+    def __init__(self, stub_api, delays=(), status=200):
+        self.sales: dict[str, dict] = {}
+        self.delays = list(delays)  # seconds to stall before answering, per request
+        self.status = status
+        self._lock = threading.Lock()
+        stub_api.route("POST", "/sales", self.handle)
+
+    def handle(self, req) -> Reply:
+        if self.status >= 500:
+            return Reply(self.status, {"detail": "boom"})
+        key = req.headers.get("idempotency-key")
+        with self._lock:
+            if key not in self.sales:
+                n = len(self.sales) + 1
+                self.sales[key] = {"sale_id": n, "receipt_no": f"R{n:04d}", "total": 10.0}
+            sale = self.sales[key]
+            delay = self.delays.pop(0) if self.delays else 0
+        # the sale is committed before the reply stalls: the client times out on a write that happened
+        time.sleep(delay)
+        return Reply(200, sale)
+
+
+class UpHealth:
+    def is_available(self) -> bool:
+        return True
+
+    def record_failure(self, error: str):
+        pass
+
+
+@pytest.fixture
+def sale_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "get_health_monitor", lambda: UpHealth())
+    # a long interval keeps the background replay out of the way; tests call replay()
+    return journal.SaleJournal(path=str(tmp_path / "journal.db"), interval=3600)
+
+
+def test_retry_after_timed_out_first_attempt(stub_api, session_state):
+    backend = SalesBackend(stub_api, delays=[1.0])
+    key = inflight_key("/sales", PAYLOAD)
+
+    r = api_post_idempotent("/sales", PAYLOAD, key, timeout=(1, 0.3), deadline=5)
+
+    assert r.status_code == 200
+    assert r.json()["sale_id"] == 1
+    posts = stub_api.calls("POST", "/sales")
+    assert len(posts) == 2
+    assert {p.headers["idempotency-key"] for p in posts} == {key}
+    assert len(backend.sales) == 1
+    # a rerun with the same cart reuses the key
+    assert inflight_key("/sales", PAYLOAD) == key
+
+
+def test_deadline_bounds_every_attempt(stub_api):
+    SalesBackend(stub_api, delays=[3.0, 3.0, 3.0])
+
+    t = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        api_post_idempotent("/sales", PAYLOAD, "k-slow", timeout=(1, 8), attempts=3, deadline=1.0)
+    assert time.monotonic() - t < 2.0
+
+
+def test_journal_replay_after_timed_out_post(stub_api, sale_journal):
+    backend = SalesBackend(stub_api, delays=[1.0])
+    with pytest.raises(requests.Timeout):
+        api_post_idempotent("/sales", PAYLOAD, "k-1", timeout=(1, 0.3), attempts=1)
+
+    # the till journals the sale under the key of the live attempt
+    entry = sale_journal.append(PAYLOAD, 10.0, "k-1")
+    assert sale_journal.append(PAYLOAD, 10.0, "k-1").id == entry.id
+    assert sale_journal.replay() is True
+    assert sale_journal.replay() is True
+
+    [row] = sale_journal.entries()
+    assert row["status"] == journal.SYNCED
+    assert row["sale_id"] == 1
+    assert len(backend.sales) == 1
+    assert len(stub_api.calls("POST", "/sales")) == 2
+
+
+def test_journal_rejects_after_repeated_server_errors(stub_api, sale_journal, monkeypatch):
+    monkeypatch.setattr(journal, "MAX_SERVER_ERRORS", 2)
+    SalesBackend(stub_api, status=500)
+    entry = sale_journal.append(PAYLOAD, 10.0)
+
+    assert sale_journal.replay() is False
+    assert sale_journal.entries()[0]["status"] == journal.PENDING
+    assert sale_journal.replay() is True
+    assert sale_journal.entries()[0]["status"] == journal.REJECTED
+
+    sale_journal.retry(entry.id)
+    row = sale_journal.entries()[0]
+    assert (row["status"], row["attempts"]) == (journal.PENDING, 0)
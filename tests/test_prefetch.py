@@ -0,0 +1,28 @@
+# tests/test_prefetch.py
+import threading
+import time
+
+from prefetch import prefetch
+
+
+def test_ready_reads_skip_the_pool():
+    ran = []
+    out = prefetch(
+        {"cached": lambda: ran.append("cached"), "fetched": lambda: ran.append("fetched") or 2},
+        ready={"cached": lambda: 1, "fetched": lambda: None},
+    )
+    assert out["cached"].value == 1
+    assert out["fetched"].value == 2
+    assert ran == ["fetched"]
+
+
+def test_ready_read_answers_while_pool_is_busy():
+    release = threading.Event()
+    started = time.monotonic()
+    slow = prefetch({"slow": release.wait}, deadline=0.2)
+    assert not slow["slow"].ok
+
+    out = prefetch({"rows": lambda: release.wait() and [1]}, deadline=0.2, ready={"rows": lambda: [1]})
+    release.set()
+    assert out["rows"].value == [1]
+    assert time.monotonic() - started < 1.0
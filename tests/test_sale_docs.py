@@ -0,0 +1,17 @@
+# tests/test_sale_docs.py
+from sale_docs import SaleDocs
+
+
+def test_forget_reloads_and_drops_rendered():
+    docs = SaleDocs()
+    docs.put(7, {"id": 7, "total": 10.0}, [{"sku": "A1"}])
+    assert docs.render((7, "Receipt"), lambda: "old") == "old"
+
+    loads = []
+    docs.forget(7)
+    sale, lines = docs.get(7, lambda sid: loads.append(sid) or {"id": sid, "total": 15.0, "lines": [{"sku": "A1"}, {"sku": "B2"}]})
+
+    assert loads == [7]
+    assert sale["total"] == 15.0 and len(lines) == 2
+    assert docs.render((7, "Receipt"), lambda: "new") == "new"
+    docs.forget(99)  # unknown ids are fine
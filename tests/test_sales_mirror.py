@@ -0,0 +1,79 @@
+# tests/test_sales_mirror.py
+from datetime import date
+
+import pytest
+
+import sales_mirror
+from conftest import Reply
+
+
+class DownHealth:
+    # keeps the mirror's background thread idle; the tests call sync() themselves
+    def is_available(self) -> bool:
+        return False
+
+
+def history_backend(stub_api, sales):
+    def handle(req) -> Reply:
+        rows = sorted(sales, key=lambda s: (s["created_at"], s["id"]), reverse=True)
+        if "before_created_at" in req.params:
+            cursor = (req.params["before_created_at"], int(req.params["before_id"]))
+            rows = [s for s in rows if (s["created_at"], s["id"]) < cursor]
+        return Reply(200, rows[: int(req.params["limit"])])
+
+    stub_api.route("GET", "/sales/history", handle)
+
+
+def sale(sale_id: int, total: float = 10.0) -> dict:
+    return {
+        "id": sale_id,
+        "created_at": f"{date.today().isoformat()}T10:00:{sale_id:02d}",
+        "location_id": 1,
+        "payment_method": "CASH",
+        "receipt_no": f"R{sale_id:04d}",
+        "total": total,
+    }
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    monkeypatch.setattr(sales_mirror, "get_health_monitor", lambda: DownHealth())
+    return sales_mirror.SalesMirror(path=str(tmp_path / "mirror.db"), interval=3600)
+
+
+def test_idle_sync_keeps_version(stub_api, mirror):
+    sales = [sale(1), sale(2)]
+    history_backend(stub_api, sales)
+
+    assert mirror.sync() == 2
+    version = mirror.version
+    assert mirror.sync() == 0
+    assert mirror.version == version
+
+    sales.append(sale(3))
+    assert mirror.sync() == 1
+    assert mirror.version == version + 1
+    assert mirror.totals(date.today(), date.today()) == (3, 30.0)
+
+
+def test_upsert_of_unchanged_rows_is_not_a_change(mirror):
+    assert mirror._upsert([sale(1)]) == 1
+    version = mirror.version
+    assert mirror._upsert([sale(1)]) == 0
+    assert mirror.version == version
+    assert mirror._upsert([sale(1, total=12.0)]) == 1
+    assert mirror.version == version + 1
+
+
+def test_late_sale_below_the_watermark_is_mirrored(stub_api, mirror):
+    sales = [sale(1), sale(3)]
+    history_backend(stub_api, sales)
+    mirror.sync()
+    version = mirror.version
+
+    # committed by another till in the same second as sale 3, visible only now
+    late = {**sale(2), "created_at": sales[1]["created_at"]}
+    sales.append(late)
+    assert mirror.sync() == 1
+    assert mirror.version == version + 1
+    assert mirror.totals(date.today(), date.today()) == (3, 30.0)
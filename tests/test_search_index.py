@@ -0,0 +1,24 @@
+# tests/test_search_index.py
+from search_index import SearchIndex
+
+PRODUCTS = [
+    {"sku": "AB12", "name": "Sugar 1kg", "barcode": "6001234"},
+    {"sku": "X9", "name": "Jasmine Rice 5kg"},
+    {"sku": "K1", "name": "Kgari Bread"},
+]
+
+
+def test_short_queries_match_substrings():
+    ix = SearchIndex(PRODUCTS)
+    assert set(ix.search("kg")) == {"AB12", "X9", "K1"}
+    assert ix.search("kg")[0] == "K1"  # word prefix ranks first
+    assert ix.search("12") == ["AB12"]
+    assert ix.search("b1") == ["AB12"]
+
+
+def test_exact_prefix_and_fuzzy():
+    ix = SearchIndex(PRODUCTS)
+    assert ix.search("ab12") == ["AB12"]
+    assert ix.lookup("6001234") == "AB12"
+    assert ix.search("jasm") == ["X9"]
+    assert ix.search("jasmin rice") == ["X9"]
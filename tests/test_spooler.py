@@ -0,0 +1,30 @@
+# tests/test_spooler.py
+import time
+
+from spooler import FAILED, QUEUED, PrintSpooler
+
+
+def wait_for(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_bad_printer_target_requeues_instead_of_killing_the_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr("spooler.MAX_ATTEMPTS", 2)
+    monkeypatch.setattr("spooler.BACKOFF_BASE", 0.05)
+    spool = PrintSpooler(str(tmp_path / "spool.db"))
+    job = spool.submit("tcp://127.0.0.1:abc", b"\x1b@", sale_id=7)
+
+    assert wait_for(lambda: spool.jobs(sale_id=7)[0]["attempts"] >= 1)
+    first = spool.jobs(sale_id=7)[0]
+    assert first["id"] == job and first["status"] in (QUEUED, FAILED)
+    assert "invalid literal" in first["last_error"]
+
+    # the worker is still alive: it retries and finally gives the job up
+    assert wait_for(lambda: spool.jobs(sale_id=7)[0]["status"] == FAILED)
+    assert spool.jobs(sale_id=7)[0]["attempts"] == 2
+    assert spool.pending() == 0